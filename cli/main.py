@@ -12,6 +12,7 @@ VITA QA Agent CLI - Enhanced Test Case Generation Tool (v2 consolidated)
 
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from dotenv import load_dotenv
@@ -24,12 +25,20 @@ from rich import print as rprint
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.models.model_factory import get_default_client
+from src.models.model_factory import create_agent_clients
+from src.models.base import BaseModelClient
+from src.models.batching import BatchingModelClient
+from src.models.ollama_client import OllamaClient
+from src.models.router import RoutingModelClient
+from src.models.single_flight import SingleFlightModelClient
+from src.models.budget import BudgetAccountant, BudgetedModelClient, TimeBudget
+from src.models.concurrency import governor_metrics
 from src.agents.requirement_parser import RequirementParser, ParsedRequirement
 from src.agents.rule_generator import RuleGenerator
-from src.agents.testcase_generator import TestCaseGenerator
+from src.agents.testcase_generator import GenerationPlan, TestCaseGenerator
 from src.agents.es_similarity_agent import ESSimilarityAgent
-from src.entities import MaterializedBundle, materialize_generation_outputs
+from src.entities import FanoutSink, JsonlSink, stream_materialize
+from src.storage import ESBulkIndexer, ESSyncEngine, SegmentStore, SQLiteCaseStore
 from src.utils.logger import setup_logger
 from src.utils.file_utils import (
     write_json_file,
@@ -38,8 +47,9 @@ from src.utils.file_utils import (
     generate_output_filename,
     read_json_file,
 )
-from src.utils.file_loader import load_multiple_prds, load_content_from_uri, merge_prd_contents
-from src.utils.config_loader import get_config_loader
+from src.utils.file_loader import load_multiple_prds, load_uris_concurrently, merge_prd_contents
+from src.utils.call_stats import get_latency_stats
+from src.utils.config_loader import get_config, get_config_loader
 from src.utils.exceptions import QAAgentError, FileOperationError, ConfigurationError
 
 app = typer.Typer(help="VITA QA Agent - 自动化测试用例生成工具 (v2 consolidated)")
@@ -81,32 +91,36 @@ def _load_documents(
     merge_prds: bool,
 ):
     """Load PRDs/metric/principles and return normalized context."""
+    ref_uris = [uri for uri in (metric, principles) if uri]
     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}")) as progress:
-        task = progress.add_task(f"加载 {len(prd)} 个PRD文档...", total=None)
+        description = f"加载 {len(prd)} 个PRD文档" + (f"及 {len(ref_uris)} 个参考文档..." if ref_uris else "...")
+        progress.add_task(description, total=None)
 
-        try:
-            prds = load_multiple_prds(prd)
-        except FileOperationError as e:
-            console.print(f"\n[bold red]✗ 加载PRD失败: {e}[/bold red]")
-            raise typer.Exit(code=1)
+        # Metric/principles load in the background while the PRDs load concurrently.
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            refs_future = pool.submit(load_uris_concurrently, ref_uris)
+            try:
+                prds = load_multiple_prds(prd)
+            except FileOperationError as e:
+                console.print(f"\n[bold red]✗ 加载PRD失败: {e}[/bold red]")
+                raise typer.Exit(code=1)
+            ref_results = dict(zip(ref_uris, refs_future.result()))
 
         resolved_project_name = project_name or prds[0]["name"]
 
         metric_content = None
         if metric:
-            progress.update(task, description="加载Metric文档...")
-            try:
-                metric_content = load_content_from_uri(metric)
-            except FileOperationError as e:
-                console.print(f"[yellow]![/yellow] 无法加载Metric文档: {e}")
+            metric_content = ref_results[metric]
+            if isinstance(metric_content, FileOperationError):
+                console.print(f"[yellow]![/yellow] 无法加载Metric文档: {metric_content}")
+                metric_content = None
 
         principles_content = None
         if principles:
-            progress.update(task, description="加载拆解原则...")
-            try:
-                principles_content = load_content_from_uri(principles)
-            except FileOperationError as e:
-                console.print(f"[yellow]![/yellow] 无法加载拆解原则: {e}")
+            principles_content = ref_results[principles]
+            if isinstance(principles_content, FileOperationError):
+                console.print(f"[yellow]![/yellow] 无法加载拆解原则: {principles_content}")
+                principles_content = None
 
     console.print(f"\n[green]✓[/green] 成功加载 {len(prds)} 个PRD文档:")
     for i, prd_info in enumerate(prds, 1):
@@ -132,6 +146,137 @@ def _load_documents(
     }
 
 
+AGENTS = ("requirement_parser", "rule_generator", "testcase_generator")
+
+
+def _create_clients(
+    model_provider: str,
+    agents: tuple = AGENTS,
+    max_tokens_total: Optional[int] = None,
+    max_llm_calls: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Create per-agent model clients (global.model_tiers).
+
+    Clients share one budget accountant when limits are given, and
+    identical concurrent requests are coalesced (global.single_flight)
+    before they reach the budget. Providers with a multi-prompt API get
+    concurrent calls micro-batched (global.batching) below the budget.
+    """
+    clients = create_agent_clients(agents, model_provider)
+    accountant = None
+    if max_tokens_total or max_llm_calls:
+        accountant = BudgetAccountant(max_tokens_total=max_tokens_total, max_llm_calls=max_llm_calls)
+        limits = []
+        if max_tokens_total:
+            limits.append(f"tokens ≤ {max_tokens_total}")
+        if max_llm_calls:
+            limits.append(f"调用 ≤ {max_llm_calls}")
+        console.print(f"[green]✓[/green] LLM预算: {', '.join(limits)}")
+    single_flight = bool(get_config("single_flight", True))
+    batching = get_config("batching", {}) or {}
+
+    wrapped: Dict[int, Any] = {}
+    for agent, client in clients.items():
+        if id(client) not in wrapped:
+            stack = client
+            if batching.get("enabled", True) and getattr(client, "native_batching", False):
+                stack = BatchingModelClient(
+                    stack,
+                    max_batch_size=int(batching.get("max_batch_size", 8)),
+                    max_wait_seconds=float(batching.get("max_wait_seconds", 0.05)),
+                )
+            if accountant is not None:
+                stack = BudgetedModelClient(stack, accountant)
+            if single_flight:
+                stack = SingleFlightModelClient(stack)
+            wrapped[id(client)] = stack
+        clients[agent] = wrapped[id(client)]
+    return clients
+
+
+def _unwrap_client(client):
+    """Innermost client below budget/single-flight wrappers."""
+    while isinstance(getattr(client, "client", None), BaseModelClient):
+        client = client.client
+    return client
+
+
+def _preload_models(clients: Dict[str, Any]) -> None:
+    """Start loading local Ollama models in the background (global.ollama.preload)."""
+    if not (get_config("ollama", {}) or {}).get("preload", True):
+        return
+    preloaded = set()
+    for client in map(_unwrap_client, clients.values()):
+        backends = client.backends.values() if isinstance(client, RoutingModelClient) else [client]
+        for backend in backends:
+            key = (getattr(backend, "host", None), getattr(backend, "default_model", None))
+            if isinstance(backend, OllamaClient) and key not in preloaded:
+                preloaded.add(key)
+                backend.preload_async()
+
+
+def _print_budget_usage(model_client) -> None:
+    accountant = getattr(model_client, "accountant", None)
+    if not isinstance(accountant, BudgetAccountant):
+        return
+    usage = accountant.summary()
+    console.print(
+        f"  - LLM用量: {usage['calls']} 次调用, {usage['total_tokens']} tokens"
+        + (f", 拒绝 {usage['refused_calls']} 次" if usage["refused_calls"] else "")
+    )
+
+
+def _print_concurrency(clients: Dict[str, Any]) -> None:
+    """Show the adaptive concurrency window of each model used, and router health."""
+    for name, stats in governor_metrics().items():
+        console.print(
+            f"  - {name} 并发窗口: {stats['limit']}"
+            + (f", 过载 {stats['overloads']} 次" if stats["overloads"] else "")
+        )
+    coalesced = sum(
+        c.stats()["coalesced"] for c in {id(c): c for c in clients.values()}.values()
+        if isinstance(c, SingleFlightModelClient)
+    )
+    if coalesced:
+        console.print(f"  - 合并重复请求: {coalesced} 次")
+    for client in {id(c): c for c in clients.values()}.values():
+        while isinstance(getattr(client, "client", None), BaseModelClient) and not isinstance(
+            client, BatchingModelClient
+        ):
+            client = client.client
+        if isinstance(client, BatchingModelClient) and client.batches:
+            stats = client.stats()
+            console.print(f"  - 批量请求: {stats['calls']} 次调用合并为 {stats['batches']} 个请求")
+    routers = {id(r): r for r in map(_unwrap_client, clients.values()) if isinstance(r, RoutingModelClient)}
+    for router in routers.values():
+        for name, health in router.stats().items():
+            console.print(
+                f"  - {name} 路由: 成功 {health['successes']} 次, 失败 {health['failures']} 次, "
+                f"对冲胜出 {health['hedge_wins']} 次" + ("" if health["healthy"] else " [yellow](不健康)[/yellow]")
+            )
+
+
+def _print_generation_plan(plan: GenerationPlan) -> None:
+    """Show projected calls, tokens and wall time of case generation."""
+    latency = get_latency_stats()
+    concurrency = int(get_config("llm_concurrency", 1))
+    labels = {"testcase_steps": "步骤生成", "expected_result": "期望结果生成"}
+
+    console.print(f"\n[bold]用例生成预估[/bold]")
+    console.print(f"  - 用例数量: {plan.cases}")
+    for shape, count in plan.calls.items():
+        history = latency.count(shape)
+        console.print(
+            f"  - {labels.get(shape, shape)}: {count} 次调用, "
+            f"提示词约 {plan.prompt_tokens[shape]} tokens, 输出至多 {plan.completion_tokens[shape]} tokens, "
+            f"平均耗时 {latency.mean(shape):.1f}s" + ("" if history else " (无历史数据，使用默认值)")
+        )
+    minutes = plan.wall_seconds(latency, concurrency) / 60
+    console.print(f"  - 合计: {plan.total_calls} 次调用, 约 {plan.total_tokens} tokens")
+    console.print(f"  - 预计耗时: 约 {minutes:.1f} 分钟 (并发 {concurrency})")
+
+
 def _save_outputs(
     project_name: str,
     parsed_req,
@@ -140,9 +285,12 @@ def _save_outputs(
     scene_mappings: list,
     prds: list,
     output_dir: str,
-    bundle: Optional[MaterializedBundle] = None,
+    relations: Optional[list] = None,
+    materialize: bool = False,
+    text_storage: str = "files",
+    db_path: Optional[str] = None,
 ):
-    """Persist generation outputs to disk."""
+    """Persist generation outputs to disk (and optionally to the SQLite store)."""
     console.print(f"\n[bold]保存输出文件...[/bold]")
 
     output_path = Path(output_dir)
@@ -182,62 +330,46 @@ def _save_outputs(
         write_jsonl_file(str(mappings_jsonl), scene_mappings)
         console.print(f"[green]✓[/green] 场景映射JSONL: {mappings_jsonl}")
 
-    # Save DB entities and ES docs
-    if bundle:
-        db_cases_jsonl = output_path / "testcases" / generate_output_filename(
-            prefix="db_testcases",
-            suffix="jsonl",
-            project_name=project_name,
-        )
-        write_jsonl_file(
-            str(db_cases_jsonl),
-            [case.model_dump() for case in bundle.test_cases],
-        )
-        console.print(f"[green]✓[/green] DB用例JSONL: {db_cases_jsonl}")
-
-        db_scenes_jsonl = output_path / "testcases" / generate_output_filename(
-            prefix="db_scenes",
-            suffix="jsonl",
-            project_name=project_name,
-        )
-        write_jsonl_file(
-            str(db_scenes_jsonl),
-            [scene.model_dump() for scene in bundle.scenes],
-        )
-        console.print(f"[green]✓[/green] DB场景JSONL: {db_scenes_jsonl}")
-
-        db_scene_mappings_jsonl = output_path / "testcases" / generate_output_filename(
-            prefix="db_scene_mappings",
-            suffix="jsonl",
-            project_name=project_name,
-        )
-        write_jsonl_file(
-            str(db_scene_mappings_jsonl),
-            [mapping.model_dump() for mapping in bundle.scene_mappings],
-        )
-        console.print(f"[green]✓[/green] DB场景映射JSONL: {db_scene_mappings_jsonl}")
-
-        db_relations_jsonl = output_path / "testcases" / generate_output_filename(
-            prefix="db_relations",
-            suffix="jsonl",
-            project_name=project_name,
-        )
-        write_jsonl_file(
-            str(db_relations_jsonl),
-            [relation.model_dump() for relation in bundle.relations],
-        )
-        console.print(f"[green]✓[/green] DB关系JSONL: {db_relations_jsonl}")
-
-        es_docs_jsonl = output_path / "testcases" / generate_output_filename(
-            prefix="es_docs",
-            suffix="jsonl",
-            project_name=project_name,
-        )
-        write_jsonl_file(
-            str(es_docs_jsonl),
-            [doc.model_dump() for doc in bundle.index_docs],
-        )
-        console.print(f"[green]✓[/green] ES文档JSONL: {es_docs_jsonl}")
+    # Materialize DB entities and ES docs in a single streaming pass
+    if materialize:
+        def _entity_path(prefix: str) -> str:
+            return str(output_path / "testcases" / generate_output_filename(
+                prefix=prefix,
+                suffix="jsonl",
+                project_name=project_name,
+            ))
+
+        jsonl_paths = {
+            "test_cases": _entity_path("db_testcases"),
+            "scenes": _entity_path("db_scenes"),
+            "scene_mappings": _entity_path("db_scene_mappings"),
+            "relations": _entity_path("db_relations"),
+            "index_docs": _entity_path("es_docs"),
+        }
+        store = SQLiteCaseStore(db_path) if db_path else None
+        try:
+            stats = stream_materialize(
+                testcases,
+                FanoutSink(JsonlSink(jsonl_paths), store.sink() if store else None),
+                scenes=scenes,
+                scene_mappings=scene_mappings,
+                relations=relations or [],
+                output_dir=str(output_path / "testcases"),
+                storage_mode=text_storage,
+            )
+        finally:
+            if store:
+                store.close()
+
+        console.print(f"  - 已实体化: {stats.test_cases} 条DB用例, {stats.index_docs} 条ES文档")
+        console.print(f"[green]✓[/green] DB用例JSONL: {jsonl_paths['test_cases']}")
+        console.print(f"[green]✓[/green] DB场景JSONL: {jsonl_paths['scenes']}")
+        console.print(f"[green]✓[/green] DB场景映射JSONL: {jsonl_paths['scene_mappings']}")
+        console.print(f"[green]✓[/green] DB关系JSONL: {jsonl_paths['relations']}")
+        SegmentStore(str(output_path / "testcases")).register_segment(jsonl_paths["index_docs"], project_name=project_name)
+        console.print(f"[green]✓[/green] ES文档JSONL: {jsonl_paths['index_docs']}")
+        if db_path:
+            console.print(f"[green]✓[/green] 已写入数据库 {db_path}: {stats.test_cases} 条用例")
 
     # Save Markdown summary
     md_content = generate_markdown_summary(
@@ -266,10 +398,16 @@ def generate(
     metric: Optional[str] = typer.Option(None, "--metric", "-m", help="Metric文档路径或URL (可选)"),
     principles: Optional[str] = typer.Option(None, "--principles", help="用例拆解原则文档路径或URL (可选)"),
     prompts_config: Optional[str] = typer.Option(None, "--prompts-config", help="自定义提示词配置文件路径"),
-    model_provider: str = typer.Option("auto", "--provider", help="模型提供商 (auto/doubao/g2m)"),
+    model_provider: str = typer.Option("auto", "--provider", help="模型提供商 (auto/doubao/g2m/ollama/openai_compat/router)"),
     save_rule: bool = typer.Option(True, "--save-rule", help="是否保存生成的walkthrough rule"),
     merge_prds: bool = typer.Option(True, "--merge-prds", help="是否合并多个PRD为单一文档"),
     materialize: bool = typer.Option(True, "--materialize/--no-materialize", help="是否将输出实体化为DB/ES对象并落盘"),
+    db_path: Optional[str] = typer.Option(None, "--db", help="SQLite数据库路径，实体化结果写入关系库 (供sync同步ES)"),
+    text_storage: str = typer.Option("files", "--text-storage", help="步骤/期望文本存储方式: files(每用例单文件) / pack(去重打包分段)"),
+    plan: bool = typer.Option(False, "--plan", help="仅预估: 解析需求并生成规则后，估算用例生成的调用次数、token与耗时，不生成用例"),
+    max_tokens_total: Optional[int] = typer.Option(None, "--max-tokens-total", help="本次运行LLM总token上限，接近上限时逐级降级并保存已生成用例"),
+    max_llm_calls: Optional[int] = typer.Option(None, "--max-llm-calls", help="本次运行LLM调用次数上限"),
+    time_budget: Optional[float] = typer.Option(None, "--time-budget", help="本次运行时间上限(分钟)，按优先级生成，来不及的用例改用模板步骤/期望，按时保存"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="详细输出"),
 ):
     """
@@ -294,6 +432,7 @@ def generate(
     # Setup logger
     log_level = "DEBUG" if verbose else "INFO"
     logger = setup_logger(level=log_level)
+    deadline = TimeBudget(time_budget * 60) if time_budget else None
 
     console.print("\n[bold cyan]VITA QA Agent - 增强版测试用例生成[/bold cyan]\n")
 
@@ -306,6 +445,17 @@ def generate(
             except Exception as e:
                 console.print(f"[yellow]![/yellow] 无法加载自定义配置，使用默认配置: {e}")
 
+        # Step 1: Initialize model clients first so local models load while the documents do
+        console.print(f"\n[bold]初始化模型客户端 ({model_provider})...[/bold]")
+        try:
+            clients = _create_clients(model_provider, max_tokens_total=max_tokens_total, max_llm_calls=max_llm_calls)
+            console.print(f"[green]✓[/green] 模型客户端初始化完成")
+        except Exception as e:
+            console.print(f"\n[bold red]✗ 模型客户端初始化失败: {e}[/bold red]")
+            raise typer.Exit(code=1)
+        _preload_models(clients)
+
+        # Step 2: Load documents
         docs_ctx = _load_documents(
             prd=prd,
             project_name=project_name,
@@ -319,18 +469,9 @@ def generate(
         metric_content = docs_ctx["metric_content"]
         principles_content = docs_ctx["principles_content"]
 
-        # Step 2: Initialize model client
-        console.print(f"\n[bold]初始化模型客户端 ({model_provider})...[/bold]")
-        try:
-            model_client = get_default_client()
-            console.print(f"[green]✓[/green] 模型客户端初始化完成")
-        except Exception as e:
-            console.print(f"\n[bold red]✗ 模型客户端初始化失败: {e}[/bold red]")
-            raise typer.Exit(code=1)
-
         # Step 3: Parse requirements
         console.print(f"\n[bold]解析需求文档...[/bold]")
-        parser = RequirementParser(model_client)
+        parser = RequirementParser(clients["requirement_parser"])
 
         with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}")) as progress:
             task = progress.add_task("分析PRD内容...", total=None)
@@ -354,7 +495,7 @@ def generate(
 
         # Step 4: Generate walkthrough rule
         console.print(f"\n[bold]生成Walkthrough Rule...[/bold]")
-        rule_gen = RuleGenerator(model_client)
+        rule_gen = RuleGenerator(clients["rule_generator"])
 
         with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}")) as progress:
             task = progress.add_task("生成用例生成规则...", total=None)
@@ -385,9 +526,19 @@ def generate(
             write_json_file(str(rule_file), walkthrough_rule)
             console.print(f"[green]✓[/green] Rule已保存: {rule_file}")
 
+        case_gen = TestCaseGenerator(clients["testcase_generator"], time_budget=deadline)
+        if plan:
+            _print_generation_plan(case_gen.plan_testcases(
+                parsed_requirement=parsed_req,
+                walkthrough_rule=walkthrough_rule,
+                metric_content=metric_content,
+                prd_content=prd_content,
+            ))
+            get_latency_stats().save()
+            return
+
         # Step 5: Generate test cases
         console.print(f"\n[bold]生成测试用例...[/bold]")
-        case_gen = TestCaseGenerator(model_client)
 
         with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}")) as progress:
             task = progress.add_task("生成测试用例...", total=None)
@@ -409,19 +560,17 @@ def generate(
         scenes = result["scenes"]
         scene_mappings = result["scene_mappings"]
 
-        bundle: Optional[MaterializedBundle] = None
-        if materialize:
-            bundle = materialize_generation_outputs(
-                result,
-                output_dir=str(Path(output_dir) / "testcases"),
-            )
-
-        if bundle:
-            console.print(f"  - 已实体化: {len(bundle.test_cases)} 条DB用例, {len(bundle.index_docs)} 条ES文档")
-
         console.print(f"[green]✓[/green] 测试用例生成完成")
         console.print(f"  - 用例数量: {len(testcases)}")
         console.print(f"  - 场景数量: {len(scenes)}")
+        _print_budget_usage(clients["testcase_generator"])
+        _print_concurrency(clients)
+        if result.get("stopped_early"):
+            console.print("[yellow]![/yellow] LLM预算已耗尽，提前停止；已生成的用例将被保存")
+        if deadline and result.get("degraded_cases"):
+            console.print(
+                f"[yellow]![/yellow] 时间预算内无法完成全部LLM调用，{result['degraded_cases']} 个用例使用了模板步骤/期望"
+            )
 
         _save_outputs(
             project_name=project_name,
@@ -431,9 +580,14 @@ def generate(
             scene_mappings=scene_mappings,
             prds=prds,
             output_dir=output_dir,
-            bundle=bundle,
+            relations=result.get("relations"),
+            materialize=materialize,
+            text_storage=text_storage,
+            db_path=db_path,
         )
 
+        get_latency_stats().save()
+
         # Success message
         console.print(f"\n[bold green]✓ 测试用例生成成功！[/bold green]")
         output_path = Path(output_dir)
@@ -457,7 +611,7 @@ def parse(
     metric: Optional[str] = typer.Option(None, "--metric", "-m", help="Metric文档路径或URL (可选)"),
     principles: Optional[str] = typer.Option(None, "--principles", help="用例拆解原则文档路径或URL (可选)"),
     prompts_config: Optional[str] = typer.Option(None, "--prompts-config", help="自定义提示词配置文件路径"),
-    model_provider: str = typer.Option("auto", "--provider", help="模型提供商 (auto/doubao/g2m)"),
+    model_provider: str = typer.Option("auto", "--provider", help="模型提供商 (auto/doubao/g2m/ollama/openai_compat/router)"),
     merge_prds: bool = typer.Option(True, "--merge-prds", help="是否合并多个PRD为单一文档"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="详细输出"),
 ):
@@ -477,6 +631,11 @@ def parse(
             except Exception as e:
                 console.print(f"[yellow]![/yellow] 无法加载自定义配置，使用默认配置: {e}")
 
+        console.print(f"\n[bold]初始化模型客户端 ({model_provider})...[/bold]")
+        clients = _create_clients(model_provider, agents=("requirement_parser",))
+        console.print(f"[green]✓[/green] 模型客户端初始化完成")
+        _preload_models(clients)
+
         docs_ctx = _load_documents(
             prd=prd,
             project_name=project_name,
@@ -489,11 +648,7 @@ def parse(
         prd_content = docs_ctx["prd_content"]
         metric_content = docs_ctx["metric_content"]
 
-        console.print(f"\n[bold]初始化模型客户端 ({model_provider})...[/bold]")
-        model_client = get_default_client()
-        console.print(f"[green]✓[/green] 模型客户端初始化完成")
-
-        parser = RequirementParser(model_client)
+        parser = RequirementParser(clients["requirement_parser"])
         parsed_req = parser.parse(
             prd_content=prd_content,
             metric_content=metric_content,
@@ -536,9 +691,11 @@ def rule(
     metric: Optional[str] = typer.Option(None, "--metric", "-m", help="Metric文档路径或URL (可选)"),
     principles: Optional[str] = typer.Option(None, "--principles", help="用例拆解原则文档路径或URL (可选)"),
     prompts_config: Optional[str] = typer.Option(None, "--prompts-config", help="自定义提示词配置文件路径"),
-    model_provider: str = typer.Option("auto", "--provider", help="模型提供商 (auto/doubao/g2m)"),
+    model_provider: str = typer.Option("auto", "--provider", help="模型提供商 (auto/doubao/g2m/ollama/openai_compat/router)"),
     merge_prds: bool = typer.Option(True, "--merge-prds", help="是否合并多个PRD为单一文档"),
     save_rule: bool = typer.Option(True, "--save-rule", help="是否保存生成的walkthrough rule"),
+    max_tokens_total: Optional[int] = typer.Option(None, "--max-tokens-total", help="本次运行LLM总token上限"),
+    max_llm_calls: Optional[int] = typer.Option(None, "--max-llm-calls", help="本次运行LLM调用次数上限"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="详细输出"),
 ):
     """仅执行规则生成(agent)。"""
@@ -561,8 +718,14 @@ def rule(
             except Exception as e:
                 console.print(f"[yellow]![/yellow] 无法加载自定义配置，使用默认配置: {e}")
 
-        model_client = get_default_client()
+        clients = _create_clients(
+            model_provider,
+            agents=("requirement_parser", "rule_generator"),
+            max_tokens_total=max_tokens_total,
+            max_llm_calls=max_llm_calls,
+        )
         console.print(f"[green]✓[/green] 模型客户端初始化完成")
+        _preload_models(clients)
 
         parsed_req = None
         prds = []
@@ -587,7 +750,7 @@ def rule(
             metric_content = docs_ctx["metric_content"]
             principles_content = docs_ctx["principles_content"]
 
-            parser = RequirementParser(model_client)
+            parser = RequirementParser(clients["requirement_parser"])
             parsed_req = parser.parse(
                 prd_content=prd_content,
                 metric_content=metric_content,
@@ -596,7 +759,7 @@ def rule(
 
         console.print(f"[green]✓[/green] 需求已就绪，开始生成规则")
 
-        rule_gen = RuleGenerator(model_client)
+        rule_gen = RuleGenerator(clients["rule_generator"])
         walkthrough_rule = rule_gen.generate_rule(
             parsed_requirement=parsed_req,
             decomposition_principles=principles_content,
@@ -640,10 +803,16 @@ def cases(
     metric: Optional[str] = typer.Option(None, "--metric", "-m", help="Metric文档路径或URL (可选，用于重新解析需求)"),
     principles: Optional[str] = typer.Option(None, "--principles", help="用例拆解原则文档路径或URL (可选，用于重新解析需求)"),
     prompts_config: Optional[str] = typer.Option(None, "--prompts-config", help="自定义提示词配置文件路径"),
-    model_provider: str = typer.Option("auto", "--provider", help="模型提供商 (auto/doubao/g2m)"),
+    model_provider: str = typer.Option("auto", "--provider", help="模型提供商 (auto/doubao/g2m/ollama/openai_compat/router)"),
     merge_prds: bool = typer.Option(True, "--merge-prds", help="是否合并多个PRD为单一文档"),
     materialize: bool = typer.Option(True, "--materialize/--no-materialize", help="是否将输出实体化为DB/ES对象并落盘"),
+    db_path: Optional[str] = typer.Option(None, "--db", help="SQLite数据库路径，实体化结果写入关系库 (供sync同步ES)"),
+    text_storage: str = typer.Option("files", "--text-storage", help="步骤/期望文本存储方式: files(每用例单文件) / pack(去重打包分段)"),
     save_rule: bool = typer.Option(True, "--save-rule", help="当自动生成rule时是否保存"),
+    plan: bool = typer.Option(False, "--plan", help="仅预估用例生成的调用次数、token与耗时，不生成用例"),
+    max_tokens_total: Optional[int] = typer.Option(None, "--max-tokens-total", help="本次运行LLM总token上限，接近上限时逐级降级并保存已生成用例"),
+    max_llm_calls: Optional[int] = typer.Option(None, "--max-llm-calls", help="本次运行LLM调用次数上限"),
+    time_budget: Optional[float] = typer.Option(None, "--time-budget", help="本次运行时间上限(分钟)，按优先级生成，来不及的用例改用模板步骤/期望，按时保存"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="详细输出"),
 ):
     """仅执行用例生成(agent)，可复用已有解析结果或规则。"""
@@ -655,6 +824,7 @@ def cases(
 
     log_level = "DEBUG" if verbose else "INFO"
     setup_logger(level=log_level)
+    deadline = TimeBudget(time_budget * 60) if time_budget else None
 
     console.print("\n[bold cyan]VITA QA Agent - 用例生成[/bold cyan]\n")
 
@@ -666,11 +836,13 @@ def cases(
             except Exception as e:
                 console.print(f"[yellow]![/yellow] 无法加载自定义配置，使用默认配置: {e}")
 
-        model_client = get_default_client()
+        clients = _create_clients(model_provider, max_tokens_total=max_tokens_total, max_llm_calls=max_llm_calls)
         console.print(f"[green]✓[/green] 模型客户端初始化完成")
+        _preload_models(clients)
 
         parsed_req = None
         prds = []
+        prd_content = None
         metric_content = None
         principles_content = None
 
@@ -692,7 +864,7 @@ def cases(
             metric_content = docs_ctx["metric_content"]
             principles_content = docs_ctx["principles_content"]
 
-            parser = RequirementParser(model_client)
+            parser = RequirementParser(clients["requirement_parser"])
             parsed_req = parser.parse(
                 prd_content=prd_content,
                 metric_content=metric_content,
@@ -703,7 +875,7 @@ def cases(
             walkthrough_rule = read_json_file(rule_file)
             console.print(f"[green]✓[/green] 已加载Rule: {rule_file}")
         else:
-            rule_gen = RuleGenerator(model_client)
+            rule_gen = RuleGenerator(clients["rule_generator"])
             walkthrough_rule = rule_gen.generate_rule(
                 parsed_requirement=parsed_req,
                 decomposition_principles=principles_content,
@@ -719,29 +891,39 @@ def cases(
                 write_json_file(str(rule_path), walkthrough_rule)
                 console.print(f"[green]✓[/green] Rule已保存: {rule_path}")
 
-        case_gen = TestCaseGenerator(model_client)
+        case_gen = TestCaseGenerator(clients["testcase_generator"], time_budget=deadline)
+        if plan:
+            _print_generation_plan(case_gen.plan_testcases(
+                parsed_requirement=parsed_req,
+                walkthrough_rule=walkthrough_rule,
+                metric_content=metric_content,
+                prd_content=prd_content,
+            ))
+            get_latency_stats().save()
+            return
+
         result = case_gen.generate_testcases(
             parsed_requirement=parsed_req,
             walkthrough_rule=walkthrough_rule,
+            metric_content=metric_content,
+            prd_content=prd_content,
         )
 
         testcases = result["testcases"]
         scenes = result["scenes"]
         scene_mappings = result["scene_mappings"]
 
-        bundle: Optional[MaterializedBundle] = None
-        if materialize:
-            bundle = materialize_generation_outputs(
-                result,
-                output_dir=str(Path(output_dir) / "testcases"),
-            )
-
-        if bundle:
-            console.print(f"  - 已实体化: {len(bundle.test_cases)} 条DB用例, {len(bundle.index_docs)} 条ES文档")
-
         console.print(f"[green]✓[/green] 测试用例生成完成")
         console.print(f"  - 用例数量: {len(testcases)}")
         console.print(f"  - 场景数量: {len(scenes)}")
+        _print_budget_usage(clients["testcase_generator"])
+        _print_concurrency(clients)
+        if result.get("stopped_early"):
+            console.print("[yellow]![/yellow] LLM预算已耗尽，提前停止；已生成的用例将被保存")
+        if deadline and result.get("degraded_cases"):
+            console.print(
+                f"[yellow]![/yellow] 时间预算内无法完成全部LLM调用，{result['degraded_cases']} 个用例使用了模板步骤/期望"
+            )
 
         _save_outputs(
             project_name=project_name,
@@ -751,9 +933,14 @@ def cases(
             scene_mappings=scene_mappings,
             prds=prds,
             output_dir=output_dir,
-            bundle=bundle,
+            relations=result.get("relations"),
+            materialize=materialize,
+            text_storage=text_storage,
+            db_path=db_path,
         )
 
+        get_latency_stats().save()
+
         console.print(f"\n[bold green]✓ 用例生成完成！[/bold green]")
         output_path = Path(output_dir)
         console.print(f"\n输出目录: [cyan]{output_path.absolute()}[/cyan]")
@@ -852,6 +1039,11 @@ def search(
     project_name: Optional[str] = typer.Option(None, "--project", help="用于本地fallback定位es_docs"),
     output_dir: str = typer.Option("outputs", "--output", "-o", help="输出目录，用于保存搜索报告"),
     top_k: int = typer.Option(5, "--top-k", help="返回TopK相似用例"),
+    min_similarity: float = typer.Option(0.0, "--min-similarity", help="文本相似度阈值(0-1，按标题/步骤/预期加权)，低于阈值的结果被过滤"),
+    no_diff: bool = typer.Option(False, "--no-diff", help="仅返回相似度，不生成逐行差异"),
+    sort: Optional[List[str]] = typer.Option(None, "--sort", help="ES排序字段，如 _score / create_time:desc (可重复)"),
+    fragment_size: int = typer.Option(200, "--fragment-size", help="ES高亮片段长度 (0表示不返回高亮)"),
+    exclude_fields: Optional[List[str]] = typer.Option(None, "--exclude-field", help="ES返回时排除的_source字段 (可重复)"),
 ):
     """在ES中检索相似用例并对比差异；无ES时使用本地es_docs回退。"""
     load_env()
@@ -862,10 +1054,21 @@ def search(
 
     console.print("\n[bold cyan]VITA QA Agent - 相似用例检索[/bold cyan]\n")
 
-    agent = ESSimilarityAgent(project_name=project_name)
+    agent = ESSimilarityAgent(
+        project_name=project_name,
+        source_excludes=exclude_fields or None,
+        fragment_size=fragment_size,
+        sort=sort or None,
+    )
 
     try:
-        result = agent.search_similar(query_text=query, case_id=case_id, top_k=top_k)
+        result = agent.search_similar(
+            query_text=query,
+            case_id=case_id,
+            top_k=top_k,
+            min_similarity=min_similarity,
+            include_diff=not no_diff,
+        )
     except Exception as e:
         console.print(f"\n[bold red]✗ 检索失败: {e}[/bold red]")
         raise typer.Exit(code=1)
@@ -903,6 +1106,129 @@ def search(
     console.print(f"[green]✓[/green] 详细结果: {json_path}")
 
 
+@app.command()
+def compact(
+    project_name: Optional[str] = typer.Option(None, "--project", help="仅压缩指定项目的es_docs分段 (默认全部项目)"),
+    output_dir: str = typer.Option("outputs", "--output", "-o", help="输出目录 (es_docs位于其下的testcases目录)"),
+    keep_old: bool = typer.Option(False, "--keep-old", help="保留已合并的旧分段文件"),
+):
+    """合并本地es_docs分段为去重后的单一分段，并重建索引。"""
+    docs_dir = Path(output_dir) / "testcases"
+    store = SegmentStore(str(docs_dir), project_name=project_name)
+
+    before = len(store.segments())
+    try:
+        written = store.compact(keep_old=keep_old)
+    except Exception as e:
+        console.print(f"\n[bold red]✗ 压缩失败: {e}[/bold red]")
+        raise typer.Exit(code=1)
+
+    if not written:
+        console.print(f"[yellow]![/yellow] 无需压缩 (当前分段数: {before})")
+        return
+
+    console.print(f"[green]✓[/green] 已压缩 {before} 个分段 -> {len(written)} 个")
+    for entry in written:
+        console.print(f"  - {entry['file']} ({entry['records']} 条用例)")
+
+
+@app.command()
+def index(
+    es_docs_file: Optional[str] = typer.Option(None, "--file", "-f", help="es_docs JSONL文件 (默认索引本地全部分段的最新版本)"),
+    project_name: Optional[str] = typer.Option(None, "--project", help="仅索引指定项目的本地es_docs分段"),
+    output_dir: str = typer.Option("outputs", "--output", "-o", help="输出目录 (es_docs位于其下的testcases目录)"),
+    chunk_size: int = typer.Option(500, "--chunk-size", help="每个bulk请求的文档数"),
+    workers: int = typer.Option(4, "--workers", help="并发bulk请求数"),
+    bulk_settings: bool = typer.Option(True, "--bulk-settings/--no-bulk-settings", help="导入期间临时关闭refresh并将副本数置0"),
+):
+    """将es_docs通过bulk API批量写入Elasticsearch (case_id作为_id)。"""
+    load_env()
+
+    try:
+        indexer = ESBulkIndexer(chunk_size=chunk_size, max_workers=workers)
+    except ValueError as e:
+        console.print(f"[bold red]✗[/bold red] {e}")
+        raise typer.Exit(code=1)
+
+    console.print(f"\n[bold cyan]VITA QA Agent - ES批量索引[/bold cyan] ({indexer.es_host}/{indexer.es_index})\n")
+
+    def _run():
+        if es_docs_file:
+            return indexer.index_jsonl(es_docs_file)
+        store = SegmentStore(str(Path(output_dir) / "testcases"), project_name=project_name)
+        return indexer.index_documents(store.iter_docs())
+
+    try:
+        if bulk_settings:
+            with indexer.bulk_load_settings():
+                result = _run()
+        else:
+            result = _run()
+    except Exception as e:
+        console.print(f"\n[bold red]✗ 索引失败: {e}[/bold red]")
+        raise typer.Exit(code=1)
+
+    console.print(f"[green]✓[/green] 已索引 {result.indexed} 条文档, 失败 {result.failed} 条, 耗时 {result.elapsed:.2f}s")
+    for err in result.errors[:10]:
+        console.print(f"  [red]-[/red] {err}")
+    if result.failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def sync(
+    db_path: str = typer.Option("outputs/qa_agent.db", "--db", help="SQLite数据库路径"),
+    full: bool = typer.Option(False, "--full", help="全量重建索引并删除ES中多余文档"),
+    reconcile: bool = typer.Option(False, "--reconcile", help="仅对比两侧主键并修复差异"),
+    interval: Optional[float] = typer.Option(None, "--interval", help="定时同步间隔(分钟)，设置后常驻运行 (每24小时全量对比一次)"),
+    chunk_size: int = typer.Option(500, "--chunk-size", help="每个bulk请求的文档数"),
+):
+    """将关系库中的用例增量同步到Elasticsearch。"""
+    load_env()
+
+    try:
+        # The sync engine retries failed items itself.
+        indexer = ESBulkIndexer(chunk_size=chunk_size, max_retries=0)
+    except ValueError as e:
+        console.print(f"[bold red]✗[/bold red] {e}")
+        raise typer.Exit(code=1)
+
+    console.print(f"\n[bold cyan]VITA QA Agent - ES同步[/bold cyan] ({db_path} -> {indexer.es_host}/{indexer.es_index})\n")
+
+    with SQLiteCaseStore(db_path) as store:
+        engine = ESSyncEngine(store, indexer, batch_size=chunk_size)
+        if interval:
+            console.print(f"[cyan]定时同步已启动，每 {interval} 分钟执行一次 (Ctrl+C 退出)[/cyan]")
+            try:
+                engine.run_forever(interval_minutes=interval)
+            except KeyboardInterrupt:
+                console.print("\n[yellow]![/yellow] 已停止定时同步")
+            return
+
+        try:
+            if reconcile:
+                report = engine.reconcile()
+            elif full:
+                report = engine.run_full()
+            else:
+                report = engine.run_incremental()
+        except Exception as e:
+            console.print(f"\n[bold red]✗ 同步失败: {e}[/bold red]")
+            raise typer.Exit(code=1)
+
+    console.print(
+        f"[green]✓[/green] 同步完成 ({report.mode}): 更新 {report.upserted} 条, 删除 {report.deleted} 条, "
+        f"失败 {report.failed} 条, 耗时 {report.elapsed:.2f}s"
+    )
+    if report.missing_in_es or report.extra_in_es:
+        console.print(f"  - ES缺失 {report.missing_in_es} 条, ES多余 {report.extra_in_es} 条")
+    console.print(f"  - 水位线: {report.watermark}")
+    if report.failed:
+        for case_id in report.failed_ids[:10]:
+            console.print(f"  [red]-[/red] {case_id}")
+        raise typer.Exit(code=1)
+
+
 @app.command()
 def version():
     """显示版本信息"""
@@ -0,0 +1,91 @@
+"""Microbenchmarks for entity construction and JSONL serialization.
+
+Compares rows/sec of the current path (validated construction,
+`datetime.strptime`, `json.dumps(model.model_dump())`) with the codec
+(`EntityCodec` trusted mode, cached datetime parser, `model_dump_json`).
+
+Usage:
+    python scripts/bench_codec.py --rows 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.entities import DATETIME_FMT, EntityCodec, TestCase, parse_datetime  # noqa: E402
+from src.utils.file_utils import dumps_json_line  # noqa: E402
+
+
+def _rows(n: int) -> List[dict]:
+    return [
+        {
+            "case_id": f"case_{i:06d}",
+            "project_name": "bench",
+            "module": f"module_{i % 20}",
+            "feature": "feature_x",
+            "title": f"用例标题 {i}",
+            "precondition": None,
+            "steps_path": f"outputs/testcases/steps/case_{i:06d}_steps.txt",
+            "expected_result_path": f"outputs/testcases/expected/case_{i:06d}_expected.txt",
+            "level": "P1",
+            "status": "NA",
+            "create_time": f"2025-01-02 03:04:{i % 60:02d}",
+            "update_time": f"2025-01-02 03:04:{i % 60:02d}",
+            "executor": "agent",
+        }
+        for i in range(n)
+    ]
+
+
+def _bench(name: str, n: int, fn: Callable[[], None]) -> float:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    rate = n / elapsed if elapsed else float("inf")
+    print(f"  {name:<40} {rate:>14,.0f} rows/s  ({elapsed:.3f}s)")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark entity codec against the validated path.")
+    parser.add_argument("--rows", type=int, default=50000, help="Number of rows per benchmark")
+    args = parser.parse_args()
+
+    rows = _rows(args.rows)
+    timestamps = [row["create_time"] for row in rows]
+    validated = EntityCodec(TestCase, trusted=False)
+    trusted = EntityCodec(TestCase, trusted=True)
+    entities = [trusted.decode(row) for row in rows]
+
+    print(f"Rows: {args.rows}\n")
+    print("Datetime parsing")
+    base = _bench("datetime.strptime", args.rows, lambda: [datetime.strptime(t, DATETIME_FMT) for t in timestamps])
+    fast = _bench("parse_datetime (cached)", args.rows, lambda: [parse_datetime(t) for t in timestamps])
+    print(f"  speedup: {fast / base:.1f}x\n")
+
+    print("Construction")
+    base = _bench("validated TestCase(**row)", args.rows, lambda: [validated.decode(row) for row in rows])
+    fast = _bench("trusted EntityCodec.decode", args.rows, lambda: [trusted.decode(row) for row in rows])
+    print(f"  speedup: {fast / base:.1f}x\n")
+
+    print("Serialization")
+    base = _bench(
+        "json.dumps(model_dump())",
+        args.rows,
+        lambda: [json.dumps(e.model_dump(), ensure_ascii=False) for e in entities],
+    )
+    fast = _bench("model_dump_json()", args.rows, lambda: [trusted.encode_line(e) for e in entities])
+    _bench("dumps_json_line(model_dump())", args.rows, lambda: [dumps_json_line(e.model_dump()) for e in entities])
+    print(f"  speedup (model_dump_json): {fast / base:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
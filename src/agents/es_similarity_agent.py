@@ -1,17 +1,24 @@
 import os
-import glob
+import heapq
+import logging
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 
 from difflib import SequenceMatcher, unified_diff
 
-from src.utils.file_utils import read_jsonl_file
+from src.storage.segments import SegmentStore
 
 try:
     from elasticsearch import Elasticsearch
 except Exception:
     Elasticsearch = None  # Optional dependency; fallback to local search
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRAGMENT_SIZE = 200
+MAX_PAGE_SIZE = 100
+SEARCH_FIELDS = ["title", "steps", "expected_result"]
+
 
 class ESSimilarityAgent:
     """Agent for searching similar test cases in Elasticsearch and diffing results.
@@ -26,7 +33,11 @@ class ESSimilarityAgent:
                  es_username: Optional[str] = None,
                  es_password: Optional[str] = None,
                  default_docs_dir: Optional[str] = None,
-                 project_name: Optional[str] = None):
+                 project_name: Optional[str] = None,
+                 source_includes: Optional[List[str]] = None,
+                 source_excludes: Optional[List[str]] = None,
+                 fragment_size: int = DEFAULT_FRAGMENT_SIZE,
+                 sort: Optional[List[str]] = None):
         self.es_host = es_host or os.getenv("ES_HOST")
         self.es_index = es_index or os.getenv("ES_INDEX")
         self.es_api_key = es_api_key or os.getenv("ES_API_KEY")
@@ -34,6 +45,11 @@ class ESSimilarityAgent:
         self.es_password = es_password or os.getenv("ES_PASSWORD")
         self.project_name = project_name
         self.default_docs_dir = default_docs_dir or str(Path(__file__).parent.parent.parent / "outputs" / "testcases")
+        # ES response shaping: trimmed _source, highlight fragments and sort order.
+        self.source_includes = source_includes
+        self.source_excludes = source_excludes
+        self.fragment_size = fragment_size
+        self.sort = sort
 
         self.client = None
         if self.es_host and Elasticsearch:
@@ -52,9 +68,17 @@ class ESSimilarityAgent:
     def search_similar(self,
                        query_text: Optional[str] = None,
                        case_id: Optional[str] = None,
-                       top_k: int = 5) -> Dict[str, Any]:
+                       top_k: int = 5,
+                       min_similarity: float = 0.0,
+                       include_diff: bool = True) -> Dict[str, Any]:
         """Search similar cases by `query_text` or an existing `case_id`.
 
+        `min_similarity` is the weighted per-field text similarity to the base
+        doc on both the ES and the local path; ES relevance only picks the
+        candidates. Cheap `quick_ratio` bounds drop most weak hits before the
+        full comparison. Unified diffs are only built for the remaining hits,
+        and skipped entirely when `include_diff` is False.
+
         Returns a dict with `query`, `results` (list of hits with scores), and `diffs` per result.
         """
         if not query_text and not case_id:
@@ -62,42 +86,195 @@ class ESSimilarityAgent:
 
         if self.client and self.es_index:
             hits = self._search_es(query_text=query_text, case_id=case_id, top_k=top_k)
-            base_doc = self._get_base_doc_es(case_id) if case_id else {"title": query_text or "", "steps": "", "expected_result": ""}
+            base_doc = self._get_base_doc_es(case_id) if case_id else self._query_base_doc(query_text)
         else:
             docs = self._load_local_es_docs()
-            base_doc = self._find_local_doc_by_id(docs, case_id) if case_id else {"title": query_text or "", "steps": "", "expected_result": ""}
-            hits = self._search_local(docs, query_text=query_text, base_doc=base_doc, top_k=top_k)
+            base_doc = self._find_local_doc_by_id(docs, case_id) if case_id else self._query_base_doc(query_text)
+            hits = self._search_local(docs, query_text=query_text, base_doc=base_doc, top_k=top_k,
+                                      min_similarity=min_similarity)
+
+        return self._build_result(query_text or case_id, base_doc, hits, min_similarity, include_diff)
+
+    def search_batch(self,
+                     query_texts: Optional[List[str]] = None,
+                     case_ids: Optional[List[str]] = None,
+                     top_k: int = 5,
+                     min_similarity: float = 0.0,
+                     include_diff: bool = True) -> List[Dict[str, Any]]:
+        """Run several searches at once; one `_msearch` round-trip when ES is configured.
+
+        Base docs for `case_ids` are fetched with a single `_mget`. Without ES
+        the local corpus is loaded once and reused for every query.
+
+        Returns one `search_similar`-shaped dict per query, texts first then ids.
+        A query that failed inside the `_msearch` has no results and carries
+        the ES error under `error`.
+        """
+        queries = [(q, None) for q in (query_texts or [])] + [(None, c) for c in (case_ids or [])]
+        if not queries:
+            raise ValueError("either query_texts or case_ids must be provided")
+
+        if not (self.client and self.es_index):
+            docs = self._load_local_es_docs()
+            results = []
+            for query_text, case_id in queries:
+                base_doc = self._find_local_doc_by_id(docs, case_id) if case_id else self._query_base_doc(query_text)
+                hits = self._search_local(docs, query_text=query_text, base_doc=base_doc, top_k=top_k,
+                                          min_similarity=min_similarity)
+                results.append(self._build_result(query_text or case_id, base_doc, hits, min_similarity, include_diff))
+            return results
+
+        searches: List[Dict[str, Any]] = []
+        for query_text, case_id in queries:
+            searches.append({"index": self.es_index})
+            searches.append({**self._build_search_body(query_text, case_id), "size": top_k})
+        res = self.client.msearch(searches=searches)
+
+        base_docs: Dict[str, Dict[str, Any]] = {}
+        if case_ids:
+            mget = self.client.mget(index=self.es_index, ids=list(case_ids))
+            for doc in mget.get("docs", []):
+                if doc.get("found"):
+                    base_docs[doc["_id"]] = doc.get("_source", {})
+
+        results = []
+        for (query_text, case_id), response in zip(queries, res.get("responses", [])):
+            base_doc = base_docs.get(case_id, {}) if case_id else self._query_base_doc(query_text)
+            error = response.get("error")
+            if error:
+                logger.warning(f"ES msearch query failed for {query_text or case_id!r}: {error}")
+                result = self._build_result(query_text or case_id, base_doc, [], min_similarity, include_diff)
+                result["error"] = error
+            else:
+                hits = self._hits_from_response(response)
+                result = self._build_result(query_text or case_id, base_doc, hits, min_similarity, include_diff)
+            results.append(result)
+        return results
+
+    def search_page(self,
+                    query_text: Optional[str] = None,
+                    case_id: Optional[str] = None,
+                    page_size: int = 20,
+                    search_after: Optional[List[Any]] = None,
+                    pit_id: Optional[str] = None,
+                    keep_alive: str = "1m") -> Dict[str, Any]:
+        """Fetch one page of ES hits using `search_after`, optionally inside a PIT.
+
+        Returns a dict with `hits`, `search_after` (cursor for the next page,
+        None when exhausted) and `pit_id` (refreshed id when paging a PIT).
+        """
+        if not (self.client and self.es_index):
+            raise RuntimeError("search_page requires a configured Elasticsearch client and index")
+        if not query_text and not case_id:
+            raise ValueError("either query_text or case_id must be provided")
+
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        body = {**self._build_search_body(query_text, case_id), "size": page_size}
+        # search_after needs a total order; PIT searches get _shard_doc for free.
+        body["sort"] = (body.get("sort") or ["_score"]) + ([] if pit_id else [{"case_id": "asc"}])
+        if search_after:
+            body["search_after"] = search_after
 
-        # Build diffs
+        if pit_id:
+            body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+            res = self.client.search(body=body)
+        else:
+            res = self.client.search(index=self.es_index, body=body)
+
+        raw_hits = res.get("hits", {}).get("hits", [])
+        hits = self._hits_from_response(res)
+        next_cursor = raw_hits[-1].get("sort") if len(raw_hits) == page_size else None
+        return {
+            "hits": hits,
+            "search_after": next_cursor,
+            "pit_id": res.get("pit_id", pit_id),
+        }
+
+    def iter_search_pages(self,
+                          query_text: Optional[str] = None,
+                          case_id: Optional[str] = None,
+                          page_size: int = 20,
+                          keep_alive: str = "1m"):
+        """Iterate all pages of a query over a consistent point-in-time view."""
+        pit = self.client.open_point_in_time(index=self.es_index, keep_alive=keep_alive)
+        pit_id = pit.get("id")
+        cursor = None
+        try:
+            while True:
+                page = self.search_page(query_text=query_text, case_id=case_id, page_size=page_size,
+                                        search_after=cursor, pit_id=pit_id, keep_alive=keep_alive)
+                pit_id = page["pit_id"]
+                if page["hits"]:
+                    yield page["hits"]
+                cursor = page["search_after"]
+                if not cursor:
+                    break
+        finally:
+            try:
+                self.client.close_point_in_time(id=pit_id)
+            except Exception:
+                pass
+
+    def _build_result(self,
+                      query: Optional[str],
+                      base_doc: Dict[str, Any],
+                      hits: List[Dict[str, Any]],
+                      min_similarity: float,
+                      include_diff: bool) -> Dict[str, Any]:
+        # Local hits arrive scored; ES hits are compared here, pruned by the
+        # quick_ratio bounds so weak candidates skip the full ratio().
+        matcher = _BaseDocMatcher(base_doc)
+        kept = []
         diffs = []
         for h in hits:
-            diffs.append({
+            h.pop("_similarity", None)
+            field_sims = h.pop("_field_similarity", None)
+            if field_sims is None:
+                field_sims = matcher.ratios(h, floor=min_similarity)
+                if field_sims is None or _combined(field_sims) < min_similarity:
+                    continue
+            kept.append(h)
+            entry = {
                 "case_id": h.get("case_id"),
-                "title_similarity": self._text_similarity(base_doc.get("title", ""), h.get("title", "")),
-                "steps_similarity": self._text_similarity(base_doc.get("steps", ""), h.get("steps", "")),
-                "expected_similarity": self._text_similarity(base_doc.get("expected_result", ""), h.get("expected_result", "")),
-                "title_diff": self._diff_text(base_doc.get("title", ""), h.get("title", "")),
-                "steps_diff": self._diff_text(base_doc.get("steps", ""), h.get("steps", "")),
-                "expected_diff": self._diff_text(base_doc.get("expected_result", ""), h.get("expected_result", "")),
+                "title_similarity": field_sims["title"],
+                "steps_similarity": field_sims["steps"],
+                "expected_similarity": field_sims["expected_result"],
                 "score": h.get("_score"),
                 "title": h.get("title"),
-            })
+            }
+            if h.get("_highlight"):
+                entry["highlight"] = h["_highlight"]
+            if include_diff:
+                entry["title_diff"] = self._diff_text(base_doc.get("title", ""), h.get("title", ""))
+                entry["steps_diff"] = self._diff_text(base_doc.get("steps", ""), h.get("steps", ""))
+                entry["expected_diff"] = self._diff_text(base_doc.get("expected_result", ""), h.get("expected_result", ""))
+            diffs.append(entry)
 
         return {
-            "query": query_text or case_id,
-            "results": hits,
+            "query": query,
+            "results": kept,
             "diffs": diffs,
         }
 
+    @staticmethod
+    def _query_base_doc(query_text: Optional[str]) -> Dict[str, Any]:
+        return {"title": query_text or "", "steps": "", "expected_result": ""}
+
     # ---------------------- ES helpers ----------------------
     def _search_es(self, query_text: Optional[str], case_id: Optional[str], top_k: int) -> List[Dict[str, Any]]:
         assert self.client is not None and self.es_index is not None
 
+        body = self._build_search_body(query_text, case_id)
+        res = self.client.search(index=self.es_index, body=body, size=top_k)
+        return self._hits_from_response(res)
+
+    def _build_search_body(self, query_text: Optional[str], case_id: Optional[str]) -> Dict[str, Any]:
+        """Query body shared by single, batched and paged searches."""
         if case_id:
-            body = {
+            body: Dict[str, Any] = {
                 "query": {
                     "more_like_this": {
-                        "fields": ["title", "steps", "expected_result"],
+                        "fields": SEARCH_FIELDS,
                         "like": [{"_id": case_id}],
                         "min_term_freq": 1,
                         "min_doc_freq": 1,
@@ -115,11 +292,40 @@ class ESSimilarityAgent:
                 }
             }
 
-        res = self.client.search(index=self.es_index, body=body, size=top_k)
+        if self.source_includes or self.source_excludes:
+            source: Dict[str, Any] = {}
+            if self.source_includes:
+                source["includes"] = list(self.source_includes)
+            if self.source_excludes:
+                source["excludes"] = list(self.source_excludes)
+            body["_source"] = source
+
+        if self.fragment_size:
+            body["highlight"] = {
+                "fields": {field: {} for field in SEARCH_FIELDS},
+                "fragment_size": self.fragment_size,
+                "number_of_fragments": 1,
+            }
+
+        if self.sort:
+            body["sort"] = [_parse_sort(item) for item in self.sort]
+            if any(clause != "_score" for clause in body["sort"]):
+                # ES drops _score when sorting by a field; keep it for the reported score.
+                body["track_scores"] = True
+
+        return body
+
+    @staticmethod
+    def _hits_from_response(res: Dict[str, Any]) -> List[Dict[str, Any]]:
         hits = []
         for hit in res.get("hits", {}).get("hits", []):
-            src = hit.get("_source", {})
+            src = dict(hit.get("_source", {}))
+            src.setdefault("case_id", hit.get("_id"))
             src["_score"] = hit.get("_score")
+            if hit.get("highlight"):
+                src["_highlight"] = hit["highlight"]
+            if hit.get("sort") is not None:
+                src["_sort"] = hit["sort"]
             hits.append(src)
         return hits
 
@@ -132,14 +338,13 @@ class ESSimilarityAgent:
 
     # ---------------------- Local helpers ----------------------
     def _load_local_es_docs(self) -> List[Dict[str, Any]]:
-        pattern = "*es_docs_*.jsonl"
+        """Load the newest version of every case across all local es_docs segments."""
         base_dir = Path(self.default_docs_dir)
-        if self.project_name:
-            pattern = f"{self.project_name}_es_docs_*.jsonl"
-        files = sorted(glob.glob(str(base_dir / pattern)))
-        if not files:
+        store = SegmentStore(str(base_dir), project_name=self.project_name)
+        if not store.segments():
+            pattern = f"{self.project_name}_es_docs_*.jsonl" if self.project_name else "*es_docs_*.jsonl"
             raise FileNotFoundError(f"No local es_docs JSONL found under {base_dir} with pattern {pattern}")
-        return read_jsonl_file(files[-1])
+        return list(store.iter_docs())
 
     def _find_local_doc_by_id(self, docs: List[Dict[str, Any]], case_id: Optional[str]) -> Dict[str, Any]:
         if not case_id:
@@ -150,21 +355,43 @@ class ESSimilarityAgent:
         return {}
 
     def _search_local(self,
-                       docs: List[Dict[str, Any]],
-                       query_text: Optional[str],
-                       base_doc: Dict[str, Any],
-                       top_k: int) -> List[Dict[str, Any]]:
+                      docs: List[Dict[str, Any]],
+                      query_text: Optional[str],
+                      base_doc: Dict[str, Any],
+                      top_k: int,
+                      min_similarity: float = 0.0) -> List[Dict[str, Any]]:
+        """Rank local docs against the base doc, pruning with cheap upper bounds.
+
+        A doc is only scored with the full `ratio()` when its `real_quick_ratio`
+        and `quick_ratio` bounds can still beat both `min_similarity` and the
+        current k-th best score.
+        """
+        matcher = _BaseDocMatcher({**base_doc, "title": query_text or base_doc.get("title", "")})
+        heap: List[tuple] = []  # (score, seq, doc, field_sims); min-heap of current top_k
+        for seq, d in enumerate(docs):
+            floor = min_similarity
+            if len(heap) >= top_k:
+                floor = max(floor, heap[0][0])
+            field_sims = matcher.ratios(d, floor=floor)
+            if field_sims is None:
+                continue
+            score = round(_combined(field_sims), 4)
+            if score < min_similarity:
+                continue
+            item = (score, -seq, d, field_sims)
+            if len(heap) < top_k:
+                heapq.heappush(heap, item)
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
         scored: List[Dict[str, Any]] = []
-        for d in docs:
-            title_sim = self._text_similarity((query_text or base_doc.get("title", "")), d.get("title", ""))
-            steps_sim = self._text_similarity(base_doc.get("steps", ""), d.get("steps", ""))
-            expected_sim = self._text_similarity(base_doc.get("expected_result", ""), d.get("expected_result", ""))
-            score = (2 * title_sim + steps_sim + expected_sim) / 4.0
+        for score, _, d, field_sims in sorted(heap, key=lambda x: (x[0], x[1]), reverse=True):
             dd = d.copy()
-            dd["_score"] = round(score, 4)
+            dd["_score"] = score
+            dd["_similarity"] = score
+            dd["_field_similarity"] = field_sims
             scored.append(dd)
-        scored.sort(key=lambda x: x.get("_score", 0), reverse=True)
-        return scored[:top_k]
+        return scored
 
     # ---------------------- Text utils ----------------------
     @staticmethod
@@ -176,3 +403,54 @@ class ESSimilarityAgent:
         a_lines = (a or "").splitlines()
         b_lines = (b or "").splitlines()
         return list(unified_diff(a_lines, b_lines, lineterm=""))
+
+
+_FIELDS = ("title", "steps", "expected_result")
+_WEIGHTS = {"title": 2.0, "steps": 1.0, "expected_result": 1.0}
+
+
+def _parse_sort(item: str) -> Any:
+    """Turn `field` / `field:asc|desc` into an ES sort clause."""
+    field, _, order = item.partition(":")
+    if field == "_score" and not order:
+        return "_score"
+    return {field: order or ("desc" if field in ("_score", "create_time") else "asc")}
+
+
+def _combined(field_sims: Dict[str, Optional[float]]) -> float:
+    """Weighted mean over the fields that have a ratio (missing fields are skipped)."""
+    fields = [f for f in _FIELDS if field_sims.get(f) is not None]
+    if not fields:
+        return 0.0
+    return sum(_WEIGHTS[f] * field_sims[f] for f in fields) / sum(_WEIGHTS[f] for f in fields)
+
+
+class _BaseDocMatcher:
+    """Compare many hits against one base doc without re-indexing the base text.
+
+    `SequenceMatcher` caches its analysis of the second sequence, so the base
+    doc is set once per field and each hit only replaces the first sequence.
+    """
+
+    def __init__(self, base_doc: Dict[str, Any]):
+        self._matchers = {}
+        for field in _FIELDS:
+            m = SequenceMatcher(None)
+            m.set_seq2(base_doc.get(field, "") or "")
+            self._matchers[field] = m
+
+    def ratios(self, doc: Dict[str, Any], floor: float = 0.0) -> Optional[Dict[str, Optional[float]]]:
+        """Return per-field ratios, or None if the doc cannot reach `floor`.
+
+        Fields missing from `doc` (e.g. excluded via `_source` filtering) get a
+        None ratio instead of being compared as empty text.
+        """
+        present = [f for f in _FIELDS if f in doc]
+        for field in present:
+            self._matchers[field].set_seq1(doc.get(field) or "")
+        if floor > 0:
+            for bound in ("real_quick_ratio", "quick_ratio"):
+                upper = {f: getattr(self._matchers[f], bound)() for f in present}
+                if _combined(upper) < floor:
+                    return None
+        return {f: round(self._matchers[f].ratio(), 4) if f in present else None for f in _FIELDS}
@@ -2,10 +2,22 @@
 
 import logging
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel
 
 from ..models.base import BaseModelClient
+from ..utils.markdown_index import MarkdownIndex, get_markdown_index
+from ..utils.token_estimator import (
+    OUTPUT_SHAPES,
+    WINDOW_SAFETY_MARGIN,
+    budgeted_completion,
+    desired_output_tokens,
+    estimate_messages_tokens,
+    estimate_tokens,
+    get_context_window,
+    get_max_output_tokens,
+    trim_to_tokens,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -74,31 +86,23 @@ class RequirementParser:
         """
         logger.info(f"Parsing requirements for project: {project_name}")
 
-        # Build prompt for LLM
-        prompt = self._build_parse_prompt(prd_content, metric_content)
+        # Built once per document; the generator reuses it for context retrieval.
+        prd_index = get_markdown_index(prd_content)
+        logger.info(
+            f"PRD structure: {len(prd_index.headings())} sections, ~{prd_index.root.tokens} tokens"
+        )
 
-        messages = [
-            {
-                "role": "system",
-                "content": "你是一个专业的测试工程师，擅长分析需求文档并提取模块、功能和流程信息。"
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
+        window = get_context_window()
+        if metric_content:
+            metric_content = trim_to_tokens(metric_content, window // 4)
 
-        # Call LLM
-        response = self.model_client.chat_completion(
-            messages=messages,
-            temperature=0.3,  # Lower temperature for more consistent parsing
-            max_tokens=4000,
-        )
+        parts = self._split_for_window(prd_index, metric_content, window)
+        if len(parts) > 1:
+            logger.info(f"PRD exceeds the {window}-token window; parsing {len(parts)} parts")
+        parsed_parts = [self._parse_part(part, metric_content) for part in parts]
+        parsed_data = parsed_parts[0] if len(parsed_parts) == 1 else self._merge_parsed_parts(parsed_parts)
 
-        # Parse LLM response
         try:
-            parsed_data = self._extract_json_from_response(response.content)
-
             # Build ParsedRequirement
             modules = []
             for mod_data in parsed_data.get("modules", []):
@@ -129,11 +133,103 @@ class RequirementParser:
             logger.info(f"Successfully parsed {len(modules)} modules")
             return result
 
+        except Exception as e:
+            logger.error(f"Error building parsed requirement: {e}")
+            raise
+
+    def _build_messages(self, prd_content: str, metric_content: Optional[str]) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": "system",
+                "content": "你是一个专业的测试工程师，擅长分析需求文档并提取模块、功能和流程信息。"
+            },
+            {
+                "role": "user",
+                "content": self._build_parse_prompt(prd_content, metric_content)
+            }
+        ]
+
+    def _split_for_window(
+        self,
+        prd_index: MarkdownIndex,
+        metric_content: Optional[str],
+        window: int,
+    ) -> List[str]:
+        """Split the PRD at section boundaries so each parse call fits the window."""
+        fixed = estimate_messages_tokens(self._build_messages("", metric_content))
+        available = window - fixed - WINDOW_SAFETY_MARGIN
+        prd_tokens = prd_index.root.tokens
+        if prd_tokens + desired_output_tokens("parsed_requirement", prd_tokens) <= available:
+            return [prd_index.content]
+
+        # Leave room for the completion the chunk itself will need, within the output limit.
+        shape = OUTPUT_SHAPES["parsed_requirement"]
+        chunk_tokens = (available - shape.base) / (1 + shape.per_unit)
+        if shape.per_unit:
+            output_limit = min(shape.cap, get_max_output_tokens())
+            chunk_tokens = min(chunk_tokens, (output_limit - shape.base) / shape.per_unit)
+        chunk_tokens = max(500, int(chunk_tokens))
+        return [prd_index.content[c.start:c.end] for c in prd_index.chunks(chunk_tokens)]
+
+    def _parse_part(self, prd_content: str, metric_content: Optional[str]) -> Dict[str, Any]:
+        """Run one parse call and return the raw JSON structure."""
+        prd_tokens = estimate_tokens(prd_content)
+        response = budgeted_completion(
+            self.model_client,
+            self._build_messages(prd_content, metric_content),
+            "parsed_requirement",
+            units=prd_tokens,
+            temperature=0.3,  # Lower temperature for more consistent parsing
+        )
+
+        try:
+            return self._extract_json_from_response(response.content)
         except Exception as e:
             logger.error(f"Error parsing LLM response: {e}")
             logger.error(f"Response content: {response.content}")
             raise
 
+    @staticmethod
+    def _merge_parsed_parts(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge per-part parse results in part order.
+
+        Ids are only unique within one parse call. A module or feature whose
+        id and name both match one from an earlier part continues it; any
+        other id collision is re-keyed as `<id>_p<part>`. Flows are always
+        appended, re-keyed the same way when their id is taken.
+        """
+        modules: Dict[str, Dict[str, Any]] = {}
+        features_by_module: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for part_no, part in enumerate(parts, 1):
+            for mod_data in part.get("modules", []):
+                mod_key, module = _claim(modules, mod_data, part_no, continues=True)
+                if module is None:
+                    module = {**mod_data, "id": mod_key, "features": []}
+                    modules[mod_key] = module
+                features = features_by_module.setdefault(mod_key, {})
+                for feat_data in mod_data.get("features", []):
+                    feat_key, feature = _claim(features, feat_data, part_no, continues=True)
+                    if feature is None:
+                        feature = {**feat_data, "id": feat_key, "flows": []}
+                        features[feat_key] = feature
+                        module["features"].append(feature)
+                    flows = {flow.get("id"): flow for flow in feature["flows"]}
+                    for flow_data in feat_data.get("flows", []):
+                        flow_key, _ = _claim(flows, flow_data, part_no, continues=False)
+                        flow = {**flow_data, "id": flow_key}
+                        flows[flow_key] = flow
+                        feature["flows"].append(flow)
+
+        merged_modules = list(modules.values())
+        metadata: Dict[str, Any] = {}
+        for part in parts:
+            metadata.update(part.get("metadata", {}))
+        metadata["total_modules"] = len(merged_modules)
+        metadata["total_features"] = sum(len(m.get("features", [])) for m in merged_modules)
+        metadata["parse_parts"] = len(parts)
+        return {"modules": merged_modules, "metadata": metadata}
+
     def _build_parse_prompt(
         self,
         prd_content: str,
@@ -244,3 +340,29 @@ class RequirementParser:
             logger.error(f"Original JSON string: {json_str}")
             logger.error(f"Repaired JSON string: {repaired}")
             raise
+
+
+def _claim(
+    nodes: Dict[str, Dict[str, Any]],
+    data: Dict[str, Any],
+    part_no: int,
+    continues: bool,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Key a parsed node among those merged so far.
+
+    Returns:
+        (key, existing node it continues) or (free key, None)
+    """
+    key = data.get("id") or data.get("name", "")
+    existing = nodes.get(key)
+    if existing is None:
+        return key, None
+    if continues and existing.get("name") == data.get("name"):
+        return key, existing
+    base = f"{key}_p{part_no}"
+    key, n = base, 1
+    while key in nodes:
+        n += 1
+        key = f"{base}_{n}"
+    return key, None
@@ -5,6 +5,7 @@ import json
 from typing import Dict, Any, Optional
 
 from ..models.base import BaseModelClient
+from ..utils.token_estimator import budgeted_completion, get_context_window, trim_to_tokens
 from .requirement_parser import ParsedRequirement
 
 logger = logging.getLogger(__name__)
@@ -41,6 +42,13 @@ class RuleGenerator:
         """
         logger.info("Generating walkthrough rule...")
 
+        # Reference documents may not crowd out the requirement summary.
+        context_limit = get_context_window() // 4
+        if decomposition_principles:
+            decomposition_principles = trim_to_tokens(decomposition_principles, context_limit)
+        if metric_definitions:
+            metric_definitions = trim_to_tokens(metric_definitions, context_limit)
+
         # Build prompt
         prompt = self._build_rule_prompt(
             parsed_requirement,
@@ -60,10 +68,13 @@ class RuleGenerator:
         ]
 
         # Call LLM
-        response = self.model_client.chat_completion(
-            messages=messages,
+        feature_count = sum(len(module.features) for module in parsed_requirement.modules)
+        response = budgeted_completion(
+            self.model_client,
+            messages,
+            "walkthrough_rule",
+            units=feature_count,
             temperature=0.3,
-            max_tokens=6000,
         )
 
         # Parse response
@@ -2,29 +2,89 @@
 
 import logging
 import json
+import math
 import uuid
-from typing import Dict, Any, List, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 from ..models.base import BaseModelClient
+from ..models.budget import BudgetAccountant, DegradeLevel, TimeBudget
 from .requirement_parser import ParsedRequirement, Module, Feature, Flow
 from ..utils.config_loader import get_config_loader
+from ..utils.markdown_index import get_markdown_index
+from ..utils.section_retriever import SectionRetriever
+from ..utils.call_stats import LatencyStats
+from ..utils.token_estimator import budgeted_completion, desired_output_tokens, estimate_messages_tokens
 
 logger = logging.getLogger(__name__)
 
+# Work order under a budget: happy paths first, then exceptions, boundaries, the rest.
+FLOW_TYPE_PRIORITY = {"happy": 0, "exception": 1, "boundary": 2}
+
+
+@dataclass
+class GenerationPlan:
+    """Projected LLM work of a test case generation run."""
+
+    cases: int = 0
+    calls: Dict[str, int] = field(default_factory=dict)
+    prompt_tokens: Dict[str, int] = field(default_factory=dict)
+    completion_tokens: Dict[str, int] = field(default_factory=dict)
+
+    def add_call(self, shape: str, prompt_tokens: int) -> None:
+        self.calls[shape] = self.calls.get(shape, 0) + 1
+        self.prompt_tokens[shape] = self.prompt_tokens.get(shape, 0) + prompt_tokens
+        # Completions are bounded by the shape's budget; use it as the estimate.
+        self.completion_tokens[shape] = self.completion_tokens.get(shape, 0) + desired_output_tokens(shape)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.prompt_tokens.values()) + sum(self.completion_tokens.values())
+
+    def wall_seconds(self, latency: LatencyStats, concurrency: int = 1) -> float:
+        """Projected wall time from per-shape mean latency at a given concurrency."""
+        serial = sum(count * latency.mean(shape) for shape, count in self.calls.items())
+        if not self.total_calls:
+            return 0.0
+        lanes = max(1, min(concurrency, self.total_calls))
+        # Calls are spread over the lanes; the slowest lane sets the wall time.
+        per_call = serial / self.total_calls
+        return math.ceil(self.total_calls / lanes) * per_call
+
 
 class TestCaseGenerator:
     """Agent for generating test cases from requirements and rules."""
 
-    def __init__(self, model_client: BaseModelClient):
+    def __init__(
+        self,
+        model_client: BaseModelClient,
+        time_budget: Optional[TimeBudget] = None,
+        max_workers: Optional[int] = None,
+    ):
         """
         Initialize test case generator.
 
         Args:
             model_client: Model client for LLM calls
+            time_budget: Optional run deadline; cases that no longer fit use fallbacks
+            max_workers: Cases generated in parallel (default: global.llm_concurrency);
+                the provider's concurrency governor still caps in-flight calls
         """
         self.model_client = model_client
+        self.time_budget = time_budget
         self.config_loader = get_config_loader()
+        if max_workers is None:
+            max_workers = int(self.config_loader.get_global_config("llm_concurrency", 1))
+        self.max_workers = max(1, max_workers)
+        # Set when the client is wrapped in a BudgetedModelClient.
+        accountant = getattr(model_client, "accountant", None)
+        self.budget: Optional[BudgetAccountant] = accountant if isinstance(accountant, BudgetAccountant) else None
 
     def generate_testcases(
         self,
@@ -49,56 +109,74 @@ class TestCaseGenerator:
         """
         logger.info("Generating test cases...")
 
-        testcases = []
         scenes = []
         scene_mappings = []
         relations = []
 
-        # Extract scenario dimensions and template from rule
-        raw_dimensions = walkthrough_rule.get("scenario_dimensions", [])
-        scenario_dimensions = []
-        for dim in raw_dimensions:
-            if isinstance(dim, dict):
-                name = dim.get("name") or dim.get("dimension") or dim.get("id") or str(dim)
-                dim_id = dim.get("dimension_id") or dim.get("id") or dim.get("dimension") or name
-                norm = {**dim}
-                norm.setdefault("name", name)
-                norm.setdefault("dimension_id", dim_id)
-                scenario_dimensions.append(norm)
-            else:
-                scenario_dimensions.append({"name": str(dim), "dimension_id": str(dim)})
+        scenario_dimensions = self._normalize_dimensions(walkthrough_rule)
         testcase_template = walkthrough_rule.get("testcase_template", {})
-        raw_scene_rules = walkthrough_rule.get("scene_rules", [])
-        if isinstance(raw_scene_rules, dict):
-            scene_rules = raw_scene_rules.get("rules", []) if isinstance(raw_scene_rules.get("rules", []), list) else []
-        elif isinstance(raw_scene_rules, list):
-            scene_rules = raw_scene_rules
-        else:
-            scene_rules = []
+        scene_rules = self._normalize_scene_rules(walkthrough_rule)
         module_mapping = walkthrough_rule.get("module_mapping", {})
 
         metric_ctx = self._trim_context(metric_content, limit=1200)
-        prd_ctx = self._trim_context(prd_content, limit=1500)
-
-        # Generate test cases for each module/feature/flow
-        for module in parsed_requirement.modules:
-            for feature in module.features:
-                for flow in feature.flows:
-                    # Generate cases for applicable scenario dimensions
-                    for dimension in scenario_dimensions:
-                        if self._is_dimension_applicable(flow, dimension):
-                            case = self._generate_single_testcase(
-                                module=module,
-                                feature=feature,
-                                flow=flow,
-                                dimension=dimension,
-                                template=testcase_template,
-                                module_mapping=module_mapping,
-                                project_name=parsed_requirement.project_name,
-                                metric_context=metric_ctx,
-                                prd_context=prd_ctx
-                            )
-                            testcases.append(case)
+        prd_retriever = SectionRetriever(get_markdown_index(prd_content)) if prd_content else None
+        prd_ctx_cache: Dict[tuple, Optional[str]] = {}
+
+        steps_strategy = self._template_fields(testcase_template).get("steps", {}).get("strategy")
+
+        # Generate test cases for each applicable module/feature/flow/dimension.
+        # Under a budget the most important cases are worked on first; output
+        # keeps the matrix order.
+        work = list(self._iter_case_matrix(parsed_requirement, scenario_dimensions))
+        order = range(len(work))
+        if self.budget is not None or self.time_budget is not None:
+            order = sorted(order, key=lambda i: self._work_priority(work[i][2], work[i][3]))
+
+        generated: Dict[int, Dict[str, Any]] = {}
+        pending: Dict[Future, int] = {}
+        stopped_early = False
+        degraded_cases = 0
+
+        def _collect(futures) -> None:
+            for future in futures:
+                generated[pending.pop(future)] = future.result()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for i in order:
+                # Bounded submission: budget and deadline levels are judged
+                # with at most max_workers cases still in flight.
+                if len(pending) >= self.max_workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    _collect(done)
+                module, feature, flow, dimension = work[i]
+                level = self._degrade_level()
+                if level >= DegradeLevel.STOP:
+                    # Budget spent: keep what was generated instead of failing the run.
+                    logger.warning(f"LLM budget exhausted; stopping after {len(generated) + len(pending)} test cases")
+                    stopped_early = True
+                    break
+                level = max(level, self._deadline_level(flow, steps_strategy))
+                if level > DegradeLevel.NORMAL:
+                    degraded_cases += 1
+                key = (module.id, feature.id, flow.id)
+                if key not in prd_ctx_cache:
+                    prd_ctx_cache[key] = self._retrieve_prd_context(prd_retriever, module, feature, flow)
+                future = pool.submit(
+                    self._generate_single_testcase,
+                    module=module,
+                    feature=feature,
+                    flow=flow,
+                    dimension=dimension,
+                    template=testcase_template,
+                    module_mapping=module_mapping,
+                    project_name=parsed_requirement.project_name,
+                    metric_context=metric_ctx,
+                    prd_context=prd_ctx_cache[key],
+                    level=level,
+                )
+                pending[future] = i
+            _collect(list(pending))
+        testcases = [generated[i] for i in sorted(generated)]
 
         # Generate scenes based on scene_rules
         if scene_rules:
@@ -116,8 +194,125 @@ class TestCaseGenerator:
             "scenes": scenes,
             "scene_mappings": scene_mappings,
             "relations": relations,
+            "stopped_early": stopped_early,
+            "degraded_cases": degraded_cases,
         }
 
+    def plan_testcases(
+        self,
+        parsed_requirement: ParsedRequirement,
+        walkthrough_rule: Dict[str, Any],
+        metric_content: Optional[str] = None,
+        prd_content: Optional[str] = None,
+    ) -> "GenerationPlan":
+        """
+        Estimate the LLM work of generate_testcases without calling the model.
+
+        Enumerates the same module x feature x flow x dimension matrix
+        (applicability rules included) and builds each prompt to estimate
+        its tokens.
+
+        Args:
+            parsed_requirement: Parsed requirement structure
+            walkthrough_rule: Walkthrough rule
+            metric_content: Optional metric content
+            prd_content: Optional PRD content
+
+        Returns:
+            GenerationPlan with per-shape call and token counts
+        """
+        scenario_dimensions = self._normalize_dimensions(walkthrough_rule)
+        fields = self._template_fields(walkthrough_rule.get("testcase_template", {}))
+        steps_strategy = fields.get("steps", {}).get("strategy")
+        expected_strategy = fields.get("expected_result", {}).get("strategy") or "llm_generate_text"
+
+        metric_ctx = self._trim_context(metric_content, limit=1200)
+        prd_retriever = SectionRetriever(get_markdown_index(prd_content)) if prd_content else None
+        prd_ctx_cache: Dict[tuple, Optional[str]] = {}
+
+        plan = GenerationPlan()
+        for module, feature, flow, dimension in self._iter_case_matrix(parsed_requirement, scenario_dimensions):
+            plan.cases += 1
+            steps = flow.steps
+            if steps_strategy == "llm_generate_list" and not flow.steps:
+                prompt = self._build_steps_prompt(feature, flow, dimension)
+                plan.add_call("testcase_steps", estimate_messages_tokens([{"role": "user", "content": prompt}]))
+                steps = [f"执行{feature.name}的{flow.name}操作"]
+            if expected_strategy == "llm_generate_text":
+                key = (module.id, feature.id, flow.id)
+                if key not in prd_ctx_cache:
+                    prd_ctx_cache[key] = self._retrieve_prd_context(prd_retriever, module, feature, flow)
+                prompt = self._build_expected_prompt(feature, flow, dimension, steps, metric_ctx, prd_ctx_cache[key])
+                plan.add_call("expected_result", estimate_messages_tokens([{"role": "user", "content": prompt}]))
+        return plan
+
+    @staticmethod
+    def _normalize_dimensions(walkthrough_rule: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Scenario dimensions as dicts with name and dimension_id."""
+        scenario_dimensions = []
+        for dim in walkthrough_rule.get("scenario_dimensions", []):
+            if isinstance(dim, dict):
+                name = dim.get("name") or dim.get("dimension") or dim.get("id") or str(dim)
+                dim_id = dim.get("dimension_id") or dim.get("id") or dim.get("dimension") or name
+                norm = {**dim}
+                norm.setdefault("name", name)
+                norm.setdefault("dimension_id", dim_id)
+                scenario_dimensions.append(norm)
+            else:
+                scenario_dimensions.append({"name": str(dim), "dimension_id": str(dim)})
+        return scenario_dimensions
+
+    @staticmethod
+    def _normalize_scene_rules(walkthrough_rule: Dict[str, Any]) -> List[Dict[str, Any]]:
+        raw_scene_rules = walkthrough_rule.get("scene_rules", [])
+        if isinstance(raw_scene_rules, dict):
+            rules = raw_scene_rules.get("rules", [])
+            return rules if isinstance(rules, list) else []
+        if isinstance(raw_scene_rules, list):
+            return raw_scene_rules
+        return []
+
+    @staticmethod
+    def _template_fields(template: Any) -> Dict[str, Any]:
+        fields_conf = template.get("fields", {}) if isinstance(template, dict) else {}
+        # Some rule generations return a descriptive list; fall back to defaults when not dict
+        return fields_conf if isinstance(fields_conf, dict) else {}
+
+    def _iter_case_matrix(
+        self,
+        parsed_requirement: ParsedRequirement,
+        scenario_dimensions: List[Dict[str, Any]],
+    ) -> Iterator[Tuple[Module, Feature, Flow, Dict[str, Any]]]:
+        """Yield every (module, feature, flow, dimension) that produces a case."""
+        for module in parsed_requirement.modules:
+            for feature in module.features:
+                for flow in feature.flows:
+                    for dimension in scenario_dimensions:
+                        if self._is_dimension_applicable(flow, dimension):
+                            yield module, feature, flow, dimension
+
+    def _degrade_level(self) -> DegradeLevel:
+        if self.budget is None:
+            return DegradeLevel.NORMAL
+        return self.budget.level()
+
+    def _deadline_level(self, flow: Flow, steps_strategy: Optional[str]) -> DegradeLevel:
+        """Cheapest degradation that keeps this case's LLM calls inside the deadline."""
+        if self.time_budget is None:
+            return DegradeLevel.NORMAL
+        needs_steps = steps_strategy == "llm_generate_list" and not flow.steps
+        if self.time_budget.can_afford(["testcase_steps", "expected_result"] if needs_steps else ["expected_result"]):
+            return DegradeLevel.NORMAL
+        if needs_steps and self.time_budget.can_afford(["expected_result"]):
+            return DegradeLevel.REUSE_STEPS
+        return DegradeLevel.TEMPLATE_EXPECTED
+
+    @staticmethod
+    def _work_priority(flow: Flow, dimension: Dict[str, Any]) -> Tuple[int, int]:
+        """Sort key: required dimensions first, then by flow type."""
+        required = bool(dimension.get("required"))
+        return (0 if required else 1, FLOW_TYPE_PRIORITY.get(flow.type, len(FLOW_TYPE_PRIORITY)))
+
     def _is_dimension_applicable(
         self,
         flow: Flow,
@@ -139,15 +334,14 @@ class TestCaseGenerator:
         module_mapping: Dict[str, Any],
         project_name: str,
         metric_context: Optional[str] = None,
-        prd_context: Optional[str] = None
+        prd_context: Optional[str] = None,
+        level: Optional[DegradeLevel] = None,
     ) -> Dict[str, Any]:
-        """Generate a single test case."""
+        """Generate a single test case (level: budget degradation, default from the accountant)."""
         # Build basic case structure
         case = {}
 
-        fields_conf = template.get("fields", {}) if isinstance(template, dict) else {}
-        # Some rule generations return a descriptive list; fall back to defaults when not dict
-        fields = fields_conf if isinstance(fields_conf, dict) else {}
+        fields = self._template_fields(template)
 
         # Generate case_id
         case_id_config = fields.get("case_id", {})
@@ -191,14 +385,20 @@ class TestCaseGenerator:
         if not expected_config.get("strategy"):
             expected_config = {**expected_config, "strategy": "llm_generate_text"}
 
-        if steps_config.get("strategy") == "llm_generate_list":
+        if level is None:
+            level = self._degrade_level()
+        if steps_config.get("strategy") == "llm_generate_list" and level < DegradeLevel.REUSE_STEPS:
             case["steps"] = self._generate_steps_with_llm(
                 feature, flow, dimension
             )
+        elif steps_config.get("strategy") == "llm_generate_list":
+            case["steps"] = flow.steps or [f"执行{feature.name}的{flow.name}操作"]
         else:
             case["steps"] = flow.steps
 
-        if expected_config.get("strategy") == "llm_generate_text":
+        if level >= DegradeLevel.TEMPLATE_EXPECTED:
+            case["expected_result"] = self._fallback_expected_result(feature)
+        elif expected_config.get("strategy") == "llm_generate_text":
             case["expected_result"] = self._generate_expected_result_with_llm(
                 feature,
                 flow,
@@ -255,7 +455,34 @@ class TestCaseGenerator:
             return flow.steps
 
         # Otherwise, generate with LLM
-        prompt = f"""请为以下测试场景生成详细的测试步骤。
+        prompt = self._build_steps_prompt(feature, flow, dimension)
+
+        try:
+            response = budgeted_completion(
+                self.model_client,
+                [{"role": "user", "content": prompt}],
+                "testcase_steps",
+                temperature=0.5,
+            )
+
+            # Extract JSON array
+            content = response.content.strip()
+            if "```" in content:
+                start = content.find("[")
+                end = content.rfind("]") + 1
+                content = content[start:end]
+
+            steps = json.loads(content)
+            return steps if isinstance(steps, list) else [str(steps)]
+
+        except Exception as e:
+            logger.warning(f"Failed to generate steps with LLM: {e}")
+            return [f"执行{feature.name}的{flow.name}操作"]
+
+    @staticmethod
+    def _build_steps_prompt(feature: Feature, flow: Flow, dimension: Dict[str, Any]) -> str:
+        """Prompt asking for test steps of one flow/dimension."""
+        return f"""请为以下测试场景生成详细的测试步骤。
 
 功能：{feature.name}
 描述：{feature.description}
@@ -274,28 +501,38 @@ class TestCaseGenerator:
 请直接输出JSON数组，不要包含其他说明。
 """
 
+    def _generate_expected_result_with_llm(
+        self,
+        feature: Feature,
+        flow: Flow,
+        dimension: Dict[str, Any],
+        steps: List[str],
+        metric_context: Optional[str] = None,
+        prd_context: Optional[str] = None
+    ) -> str:
+        """Generate expected result using LLM."""
+        prompt = self._build_expected_prompt(feature, flow, dimension, steps, metric_context, prd_context)
+
         try:
-            response = self.model_client.chat_completion(
-                messages=[{"role": "user", "content": prompt}],
+            response = budgeted_completion(
+                self.model_client,
+                [{"role": "user", "content": prompt}],
+                "expected_result",
                 temperature=0.5,
-                max_tokens=800
             )
 
-            # Extract JSON array
-            content = response.content.strip()
-            if "```" in content:
-                start = content.find("[")
-                end = content.rfind("]") + 1
-                content = content[start:end]
-
-            steps = json.loads(content)
-            return steps if isinstance(steps, list) else [str(steps)]
+            return response.content.strip()
 
         except Exception as e:
-            logger.warning(f"Failed to generate steps with LLM: {e}")
-            return [f"执行{feature.name}的{flow.name}操作"]
+            logger.warning(f"Failed to generate expected result with LLM: {e}")
+            return self._fallback_expected_result(feature)
 
-    def _generate_expected_result_with_llm(
+    @staticmethod
+    def _fallback_expected_result(feature: Feature) -> str:
+        """Template expected result used when the LLM is unavailable or out of budget."""
+        return f"{feature.name}功能正常执行，达到预期效果"
+
+    def _build_expected_prompt(
         self,
         feature: Feature,
         flow: Flow,
@@ -304,7 +541,7 @@ class TestCaseGenerator:
         metric_context: Optional[str] = None,
         prd_context: Optional[str] = None
     ) -> str:
-        """Generate expected result using LLM."""
+        """Prompt asking for the expected result of one case."""
         steps_formatted = chr(10).join(f"{i+1}. {step}" for i, step in enumerate(steps))
         prompt = self.config_loader.get_prompt(
             "testcase_generator",
@@ -322,19 +559,26 @@ class TestCaseGenerator:
             extras.append(f"需求片段：\n{prd_context}")
         if extras:
             prompt = f"{prompt}\n\n" + "\n\n".join(extras)
+        return prompt
 
-        try:
-            response = self.model_client.chat_completion(
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.5,
-                max_tokens=300
-            )
-
-            return response.content.strip()
-
-        except Exception as e:
-            logger.warning(f"Failed to generate expected result with LLM: {e}")
-            return f"{feature.name}功能正常执行，达到预期效果"
+    def _retrieve_prd_context(
+        self,
+        retriever: Optional[SectionRetriever],
+        module: Module,
+        feature: Feature,
+        flow: Flow,
+    ) -> Optional[str]:
+        """Select the PRD sections most relevant to a flow within the token budget."""
+        if retriever is None:
+            return None
+        query = " ".join(
+            [module.name, feature.name, feature.description, flow.name, *flow.steps]
+        )
+        return retriever.context(
+            query,
+            token_budget=int(self.config_loader.get_global_config("prd_context_tokens", 600)),
+            max_sections=int(self.config_loader.get_global_config("prd_context_max_sections", 3)),
+        )
 
     @staticmethod
     def _trim_context(text: Optional[str], limit: int = 1200) -> Optional[str]:
@@ -10,7 +10,10 @@ from .db_models import (
     RelationType,
     TestCase,
     TestCaseIndexDocument,
+    format_datetime,
+    parse_datetime,
 )
+from .codec import EntityCodec
 from .converters import (
     normalize_relations,
     normalize_scene_mappings,
@@ -20,7 +23,16 @@ from .converters import (
     to_test_case,
     to_test_case_index_document,
 )
-from .materializer import MaterializedBundle, materialize_generation_outputs
+from .materializer import (
+    BundleSink,
+    FanoutSink,
+    JsonlSink,
+    MaterializedBundle,
+    MaterializeSink,
+    MaterializeStats,
+    materialize_generation_outputs,
+    stream_materialize,
+)
 
 __all__ = [
     "DATETIME_FMT",
@@ -32,6 +44,9 @@ __all__ = [
     "RelationType",
     "TestCase",
     "TestCaseIndexDocument",
+    "format_datetime",
+    "parse_datetime",
+    "EntityCodec",
     "normalize_relations",
     "normalize_scene_mappings",
     "to_case_relation",
@@ -39,6 +54,12 @@ __all__ = [
     "to_case_scene_mapping",
     "to_test_case",
     "to_test_case_index_document",
+    "BundleSink",
+    "FanoutSink",
+    "JsonlSink",
     "MaterializedBundle",
+    "MaterializeSink",
+    "MaterializeStats",
     "materialize_generation_outputs",
+    "stream_materialize",
 ]
@@ -0,0 +1,115 @@
+"""Fast construction and serialization of entities for bulk paths.
+
+`EntityCodec` wraps one entity class with two decoding modes:
+
+- validated (default): full pydantic validation, as for generator output;
+- trusted: `model_construct`-style construction with only the datetime
+  fields parsed, for rows that were produced from validated entities (our
+  own DB rows, JSONL files).
+
+The mode is chosen per codec, or globally via the `ENTITY_CODEC_MODE`
+environment variable ("validated" / "trusted"). Encoding emits JSON lines
+with `model_dump_json` instead of `json.dumps(model.model_dump())`.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Generic, Iterable, Iterator, Tuple, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+from ..utils.file_utils import loads_json_line
+from .db_models import parse_datetime
+
+M = TypeVar("M", bound=BaseModel)
+
+CODEC_MODES = ("validated", "trusted")
+
+
+def default_trusted() -> bool:
+    """Whether codecs decode in trusted mode unless told otherwise."""
+    mode = os.getenv("ENTITY_CODEC_MODE", "validated").lower()
+    if mode not in CODEC_MODES:
+        raise ValueError(f"ENTITY_CODEC_MODE must be one of {CODEC_MODES}, got '{mode}'")
+    return mode == "trusted"
+
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=None)
+def _field_plan(model: Type[BaseModel]) -> Tuple[Tuple[Tuple[str, Any, Any], ...], Tuple[str, ...]]:
+    """Per-field (name, default, default_factory) in declaration order, plus datetime fields."""
+    fields = []
+    for name, info in model.model_fields.items():
+        if info.is_required():
+            fields.append((name, _MISSING, None))
+        else:
+            fields.append((name, info.default, info.default_factory))
+    datetimes = tuple(name for name, info in model.model_fields.items() if info.annotation is datetime)
+    return tuple(fields), datetimes
+
+
+class EntityCodec(Generic[M]):
+    """Decode dicts/JSON lines into one entity class and encode them back."""
+
+    def __init__(self, model: Type[M], trusted: bool | None = None):
+        """
+        Initialize codec.
+
+        Args:
+            model: Entity class (e.g. TestCase)
+            trusted: Skip validation; defaults to the ENTITY_CODEC_MODE switch
+        """
+        self.model = model
+        self.trusted = default_trusted() if trusted is None else trusted
+        self._fields, self._datetime_fields = _field_plan(model)
+
+    def decode(self, data: Dict[str, Any]) -> M:
+        if not self.trusted:
+            return self.model(**data)
+
+        # Equivalent to model_construct, minus its per-call introspection.
+        values: Dict[str, Any] = {}
+        fields_set = set()
+        for name, default, factory in self._fields:
+            if name in data:
+                values[name] = data[name]
+                fields_set.add(name)
+            elif factory is not None:
+                values[name] = factory()
+            elif default is _MISSING:
+                # Incomplete input is not trustworthy; let validation report it.
+                return self.model(**data)
+            else:
+                values[name] = default
+        for name in self._datetime_fields:
+            value = values[name]
+            if isinstance(value, str):
+                values[name] = parse_datetime(value)
+
+        entity = self.model.__new__(self.model)
+        object.__setattr__(entity, "__dict__", values)
+        object.__setattr__(entity, "__pydantic_fields_set__", fields_set)
+        object.__setattr__(entity, "__pydantic_extra__", None)
+        object.__setattr__(entity, "__pydantic_private__", None)
+        return entity
+
+    def decode_many(self, rows: Iterable[Dict[str, Any]]) -> Iterator[M]:
+        decode = self.decode
+        for row in rows:
+            yield decode(row)
+
+    def decode_line(self, line: Union[str, bytes]) -> M:
+        return self.decode(loads_json_line(line))
+
+    def encode(self, entity: M) -> Dict[str, Any]:
+        return entity.model_dump()
+
+    def encode_line(self, entity: M) -> str:
+        """Serialize to a single JSON line (without the trailing newline)."""
+        return entity.model_dump_json()
+
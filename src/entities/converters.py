@@ -6,7 +6,6 @@ from datetime import datetime
 from typing import Iterable, Optional, Sequence
 
 from .db_models import (
-    DATETIME_FMT,
     CaseRelation,
     CaseScene,
     CaseSceneMapping,
@@ -14,6 +13,7 @@ from .db_models import (
     RelationType,
     TestCase,
     TestCaseIndexDocument,
+    parse_datetime,
 )
 
 
@@ -22,7 +22,7 @@ def _coerce_datetime(value: Optional[object]) -> datetime:
     if isinstance(value, datetime):
         return value
     if isinstance(value, str):
-        return datetime.strptime(value, DATETIME_FMT)
+        return parse_datetime(value)
     return datetime.now()
 
 
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
 from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator, model_validator
@@ -12,6 +13,34 @@ from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_valid
 DATETIME_FMT = "%Y-%m-%d %H:%M:%S"
 
 
+@lru_cache(maxsize=4096)
+def parse_datetime(value: str) -> datetime:
+    """Parse a DATETIME_FMT string.
+
+    Bulk rows share few distinct timestamps, so results are cached; strings
+    shaped exactly like the format go through the C `fromisoformat` fast path.
+    """
+    if len(value) == 19 and value[4] == "-" and value[7] == "-" and value[10] == " " and value[13] == ":" and value[16] == ":":
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, DATETIME_FMT)
+
+
+def format_datetime(value: datetime) -> str:
+    """Format a datetime as DATETIME_FMT.
+
+    Naive values from year 1000 on take the faster `isoformat` path, which
+    matches strftime for them. Aware values (isoformat appends the offset,
+    which parse_datetime rejects) and earlier years (padded differently)
+    go through strftime.
+    """
+    if value.tzinfo is None and value.year >= 1000:
+        return value.isoformat(sep=" ", timespec="seconds")
+    return value.strftime(DATETIME_FMT)
+
+
 class CaseLevel(str, Enum):
     """Allowed test case levels."""
 
@@ -69,12 +98,12 @@ class TestCase(BaseModel):
         if isinstance(value, datetime):
             return value
         if isinstance(value, str):
-            return datetime.strptime(value, DATETIME_FMT)
+            return parse_datetime(value)
         raise ValueError("Datetime must be str or datetime instance")
 
     @field_serializer("create_time", "update_time")
     def _serialize_datetime(self, value: datetime) -> str:
-        return value.strftime(DATETIME_FMT)
+        return format_datetime(value)
 
 
 class CaseRelation(BaseModel):
@@ -95,12 +124,12 @@ class CaseRelation(BaseModel):
         if isinstance(value, datetime):
             return value
         if isinstance(value, str):
-            return datetime.strptime(value, DATETIME_FMT)
+            return parse_datetime(value)
         raise ValueError("Datetime must be str or datetime instance")
 
     @field_serializer("create_time")
     def _serialize_datetime(self, value: datetime) -> str:
-        return value.strftime(DATETIME_FMT)
+        return format_datetime(value)
 
 
 class CaseScene(BaseModel):
@@ -119,12 +148,12 @@ class CaseScene(BaseModel):
         if isinstance(value, datetime):
             return value
         if isinstance(value, str):
-            return datetime.strptime(value, DATETIME_FMT)
+            return parse_datetime(value)
         raise ValueError("Datetime must be str or datetime instance")
 
     @field_serializer("create_time")
     def _serialize_datetime(self, value: datetime) -> str:
-        return value.strftime(DATETIME_FMT)
+        return format_datetime(value)
 
 
 class CaseSceneMapping(BaseModel):
@@ -143,12 +172,12 @@ class CaseSceneMapping(BaseModel):
         if isinstance(value, datetime):
             return value
         if isinstance(value, str):
-            return datetime.strptime(value, DATETIME_FMT)
+            return parse_datetime(value)
         raise ValueError("Datetime must be str or datetime instance")
 
     @field_serializer("create_time")
     def _serialize_datetime(self, value: datetime) -> str:
-        return value.strftime(DATETIME_FMT)
+        return format_datetime(value)
 
 
 class TestCaseIndexDocument(BaseModel):
@@ -174,9 +203,9 @@ class TestCaseIndexDocument(BaseModel):
         if isinstance(value, datetime):
             return value
         if isinstance(value, str):
-            return datetime.strptime(value, DATETIME_FMT)
+            return parse_datetime(value)
         raise ValueError("Datetime must be str or datetime instance")
 
     @field_serializer("create_time")
     def _serialize_datetime(self, value: datetime) -> str:
-        return value.strftime(DATETIME_FMT)
+        return format_datetime(value)
@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
 
+from ..storage.text_pack import TextPackStore
+from ..utils.file_utils import JsonlWriter
 from .converters import (
     normalize_relations,
     normalize_scene_mappings,
@@ -21,6 +25,8 @@ from .db_models import (
     TestCaseIndexDocument,
 )
 
+STORAGE_MODES = ("files", "pack")
+
 
 @dataclass
 class MaterializedBundle:
@@ -33,6 +39,130 @@ class MaterializedBundle:
     index_docs: List[TestCaseIndexDocument]
 
 
+@dataclass
+class MaterializeStats:
+    """Entity counts emitted by a streaming materialization run."""
+
+    test_cases: int = 0
+    scenes: int = 0
+    scene_mappings: int = 0
+    relations: int = 0
+    index_docs: int = 0
+
+
+class MaterializeSink:
+    """Receiver of materialized entities; subclasses override what they need.
+
+    Sinks are called from a single thread, in input order.
+    """
+
+    def add_scene(self, scene: CaseScene) -> None:
+        pass
+
+    def add_scene_mapping(self, mapping: CaseSceneMapping) -> None:
+        pass
+
+    def add_relation(self, relation: CaseRelation) -> None:
+        pass
+
+    def add_case(self, case: TestCase, doc: TestCaseIndexDocument) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class BundleSink(MaterializeSink):
+    """Collect everything in memory as a MaterializedBundle."""
+
+    def __init__(self):
+        self.bundle = MaterializedBundle([], [], [], [], [])
+
+    def add_scene(self, scene: CaseScene) -> None:
+        self.bundle.scenes.append(scene)
+
+    def add_scene_mapping(self, mapping: CaseSceneMapping) -> None:
+        self.bundle.scene_mappings.append(mapping)
+
+    def add_relation(self, relation: CaseRelation) -> None:
+        self.bundle.relations.append(relation)
+
+    def add_case(self, case: TestCase, doc: TestCaseIndexDocument) -> None:
+        self.bundle.test_cases.append(case)
+        self.bundle.index_docs.append(doc)
+
+
+class JsonlSink(MaterializeSink):
+    """Write each entity kind to its own JSONL file as it arrives.
+
+    Args:
+        paths: Mapping of "test_cases" / "scenes" / "scene_mappings" /
+            "relations" / "index_docs" to output files; missing kinds are skipped.
+    """
+
+    def __init__(self, paths: Dict[str, str]):
+        self.paths = dict(paths)
+        self._writers: Dict[str, JsonlWriter] = {}
+
+    def add_scene(self, scene: CaseScene) -> None:
+        self._write("scenes", scene)
+
+    def add_scene_mapping(self, mapping: CaseSceneMapping) -> None:
+        self._write("scene_mappings", mapping)
+
+    def add_relation(self, relation: CaseRelation) -> None:
+        self._write("relations", relation)
+
+    def add_case(self, case: TestCase, doc: TestCaseIndexDocument) -> None:
+        self._write("test_cases", case)
+        self._write("index_docs", doc)
+
+    def close(self) -> None:
+        # Create files for kinds that received no records so every run yields the same set.
+        for kind in self.paths:
+            self._writer(kind)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def _writer(self, kind: str) -> JsonlWriter:
+        writer = self._writers.get(kind)
+        if writer is None:
+            writer = self._writers[kind] = JsonlWriter(self.paths[kind])
+        return writer
+
+    def _write(self, kind: str, entity: Any) -> None:
+        if kind in self.paths:
+            self._writer(kind).write_line(entity.model_dump_json())
+
+
+class FanoutSink(MaterializeSink):
+    """Forward every entity to several sinks."""
+
+    def __init__(self, *sinks: Any):
+        self.sinks = [sink for sink in sinks if sink is not None]
+
+    def add_scene(self, scene: CaseScene) -> None:
+        for sink in self.sinks:
+            sink.add_scene(scene)
+
+    def add_scene_mapping(self, mapping: CaseSceneMapping) -> None:
+        for sink in self.sinks:
+            sink.add_scene_mapping(mapping)
+
+    def add_relation(self, relation: CaseRelation) -> None:
+        for sink in self.sinks:
+            sink.add_relation(relation)
+
+    def add_case(self, case: TestCase, doc: TestCaseIndexDocument) -> None:
+        for sink in self.sinks:
+            sink.add_case(case, doc)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
 def materialize_generation_outputs(
     generated: Dict[str, Any],
     *,
@@ -41,104 +171,208 @@ def materialize_generation_outputs(
     default_source: str = "需求",
     default_owner: str | None = None,
     default_executor: str | None = "agent",
+    storage_mode: str = "files",
+    pack_dir: Optional[str] = None,
 ) -> MaterializedBundle:
     """Convert generator outputs to entity bundle and write text artifacts.
 
     Steps content and expected results are saved to disk to satisfy the
     relational schema (path-based storage) while full text is preserved for
-    ES indexing.
+    ES indexing. With `storage_mode="files"` each text gets its own file;
+    with `"pack"` texts are deduplicated into append-only segments under the
+    pack root (`pack_dir`, default `global.text_pack_root`) and the stored
+    paths are `pack://segment#offset:len` URIs.
+
+    Large runs should prefer `stream_materialize` with a streaming sink.
+    """
+    sink = BundleSink()
+    stream_materialize(
+        generated.get("testcases", []) or [],
+        sink,
+        scenes=generated.get("scenes", []) or [],
+        scene_mappings=generated.get("scene_mappings", []) or [],
+        relations=generated.get("relations", []) or [],
+        output_dir=output_dir,
+        default_env=default_env,
+        default_source=default_source,
+        default_owner=default_owner,
+        default_executor=default_executor,
+        storage_mode=storage_mode,
+        pack_dir=pack_dir,
+    )
+    return sink.bundle
+
+
+def stream_materialize(
+    raw_cases: Iterable[Dict[str, Any]],
+    sink: MaterializeSink,
+    *,
+    scenes: Iterable[Dict[str, Any]] = (),
+    scene_mappings: Iterable[Dict[str, Any]] = (),
+    relations: Iterable[Dict[str, Any]] = (),
+    output_dir: str = "outputs/testcases",
+    default_env: str = "台架",
+    default_source: str = "需求",
+    default_owner: str | None = None,
+    default_executor: str | None = "agent",
+    storage_mode: str = "files",
+    pack_dir: Optional[str] = None,
+    max_workers: int = 4,
+    max_pending: Optional[int] = None,
+) -> MaterializeStats:
+    """Materialize a stream of raw cases in one pass with bounded memory.
+
+    Scenes, mappings and relations (small, and needed for the ES scene
+    fields) are emitted first. Cases are then validated and their text
+    artifacts written on a thread pool with at most `max_pending` cases in
+    flight; results reach `sink.add_case(case, doc)` in input order. The
+    sink is closed when the run finishes.
+
+    Args:
+        raw_cases: Iterable of generator testcase dicts (may be a generator)
+        sink: Receiver for entities (see MaterializeSink)
+        scenes: Raw scene dicts
+        scene_mappings: Raw scene mapping dicts
+        relations: Raw relation dicts
+        output_dir: Base directory for text artifacts
+        storage_mode: "files" or "pack"
+        pack_dir: Pack root for "pack" mode (default: global.text_pack_root)
+        max_workers: Worker threads for validation and text writes
+        max_pending: Cases in flight (default 4 * max_workers)
+
+    Returns:
+        Counts of emitted entities
     """
+    if storage_mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage_mode '{storage_mode}', expected one of {STORAGE_MODES}")
 
     base_dir = Path(output_dir)
     steps_dir = base_dir / "steps"
     expected_dir = base_dir / "expected"
     scenes_dir = base_dir / "scenes"
-    for folder in (steps_dir, expected_dir, scenes_dir):
-        folder.mkdir(parents=True, exist_ok=True)
-
-    scenes_raw: List[Dict[str, Any]] = generated.get("scenes", []) or []
-    mappings_raw: List[Dict[str, Any]] = generated.get("scene_mappings", []) or []
-    relations_raw: List[Dict[str, Any]] = generated.get("relations", []) or []
-
-    # Persist scene descriptions (if any) to files and build entities.
-    scene_lookup: Dict[str, Dict[str, Any]] = {}
-    scenes: List[CaseScene] = []
-    for raw_scene in scenes_raw:
-        scene_id = raw_scene["scene_id"]
-        desc_content = raw_scene.get("scene_desc")
-        if desc_content:
-            desc_path = scenes_dir / f"{scene_id}.md"
-            _write_text(desc_path, desc_content)
-            raw_scene = {**raw_scene, "scene_desc_path": desc_path.as_posix()}
-        scenes.append(to_case_scene(raw_scene))
-        scene_lookup[scene_id] = raw_scene
-
-    scene_mappings: List[CaseSceneMapping] = normalize_scene_mappings(mappings_raw)
-    relations: List[CaseRelation] = normalize_relations(relations_raw)
-
-    # Build per-case scene lists for ES docs.
-    case_to_scene_ids: Dict[str, List[str]] = {}
-    for mapping in scene_mappings:
-        case_to_scene_ids.setdefault(mapping.case_id, []).append(mapping.scene_id)
-
-    test_cases: List[TestCase] = []
-    index_docs: List[TestCaseIndexDocument] = []
-
-    for raw_case in generated.get("testcases", []) or []:
-        case_id = raw_case["case_id"]
-        steps_field = raw_case.get("steps", [])
-        if isinstance(steps_field, list):
-            steps_content = "\n".join(str(step) for step in steps_field)
-        else:
-            steps_content = str(steps_field)
-
-        expected_result_content = str(raw_case.get("expected_result", ""))
-
-        steps_path = steps_dir / f"{case_id}_steps.txt"
-        expected_path = expected_dir / f"{case_id}_expected.txt"
-        _write_text(steps_path, steps_content)
-        _write_text(expected_path, expected_result_content)
-
-        test_case = to_test_case(
-            raw_case,
-            steps_path=steps_path.as_posix(),
-            expected_result_path=expected_path.as_posix(),
-            default_env=default_env,
-            default_source=default_source,
-            default_owner=default_owner,
-            default_executor=default_executor,
-        )
-        test_cases.append(test_case)
-
-        scene_ids = case_to_scene_ids.get(case_id, [])
-        scene_names = [scene_lookup.get(scene_id, {}).get("scene_name", scene_id) for scene_id in scene_ids]
-
-        metadata = raw_case.get("_metadata", {}) if isinstance(raw_case, dict) else {}
-        module_id = metadata.get("module_id") or raw_case.get("module")
-        module_name = raw_case.get("module")
-
-        index_docs.append(
-            to_test_case_index_document(
-                test_case,
-                steps_content=steps_content,
-                expected_result_content=expected_result_content,
-                scene_ids=scene_ids,
+
+    pack = None
+    if storage_mode == "pack":
+        pack = TextPackStore(pack_dir)
+        store_text: Callable[[Path, str], str] = lambda _path, content: pack.put(content)
+    else:
+        for folder in (steps_dir, expected_dir, scenes_dir):
+            folder.mkdir(parents=True, exist_ok=True)
+        store_text = _write_text
+
+    stats = MaterializeStats()
+    try:
+        # Persist scene descriptions (if any) and build entities.
+        scene_names: Dict[str, str] = {}
+        for raw_scene in scenes:
+            scene_id = raw_scene["scene_id"]
+            desc_content = raw_scene.get("scene_desc")
+            if desc_content:
+                desc_path = store_text(scenes_dir / f"{scene_id}.md", desc_content)
+                raw_scene = {**raw_scene, "scene_desc_path": desc_path}
+            scene_names[scene_id] = raw_scene.get("scene_name", scene_id)
+            sink.add_scene(to_case_scene(raw_scene))
+            stats.scenes += 1
+
+        # Build per-case scene lists for ES docs.
+        case_to_scene_ids: Dict[str, List[str]] = {}
+        for mapping in normalize_scene_mappings(scene_mappings):
+            case_to_scene_ids.setdefault(mapping.case_id, []).append(mapping.scene_id)
+            sink.add_scene_mapping(mapping)
+            stats.scene_mappings += 1
+
+        for relation in normalize_relations(relations):
+            sink.add_relation(relation)
+            stats.relations += 1
+
+        def build(raw_case: Dict[str, Any]) -> Tuple[TestCase, TestCaseIndexDocument]:
+            return _build_case(
+                raw_case,
+                steps_dir=steps_dir,
+                expected_dir=expected_dir,
+                store_text=store_text,
+                case_to_scene_ids=case_to_scene_ids,
                 scene_names=scene_names,
-                module_id=module_id,
-                module_name=module_name,
+                default_env=default_env,
+                default_source=default_source,
+                default_owner=default_owner,
+                default_executor=default_executor,
             )
-        )
-
-    return MaterializedBundle(
-        test_cases=test_cases,
-        scenes=scenes,
-        scene_mappings=scene_mappings,
-        relations=relations,
-        index_docs=index_docs,
+
+        limit = max_pending or max(1, max_workers) * 4
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            pending: Deque[Future] = deque()
+            for raw_case in raw_cases:
+                if len(pending) >= limit:
+                    _emit(pending.popleft(), sink, stats)
+                pending.append(pool.submit(build, raw_case))
+            while pending:
+                _emit(pending.popleft(), sink, stats)
+    finally:
+        if pack:
+            pack.close()
+        sink.close()
+    return stats
+
+
+def _emit(future: Future, sink: MaterializeSink, stats: MaterializeStats) -> None:
+    case, doc = future.result()
+    sink.add_case(case, doc)
+    stats.test_cases += 1
+    stats.index_docs += 1
+
+
+def _build_case(
+    raw_case: Dict[str, Any],
+    *,
+    steps_dir: Path,
+    expected_dir: Path,
+    store_text: Callable[[Path, str], str],
+    case_to_scene_ids: Dict[str, List[str]],
+    scene_names: Dict[str, str],
+    default_env: str,
+    default_source: str,
+    default_owner: str | None,
+    default_executor: str | None,
+) -> Tuple[TestCase, TestCaseIndexDocument]:
+    case_id = raw_case["case_id"]
+    steps_field = raw_case.get("steps", [])
+    if isinstance(steps_field, list):
+        steps_content = "\n".join(str(step) for step in steps_field)
+    else:
+        steps_content = str(steps_field)
+
+    expected_result_content = str(raw_case.get("expected_result", ""))
+
+    steps_path = store_text(steps_dir / f"{case_id}_steps.txt", steps_content)
+    expected_path = store_text(expected_dir / f"{case_id}_expected.txt", expected_result_content)
+
+    test_case = to_test_case(
+        raw_case,
+        steps_path=steps_path,
+        expected_result_path=expected_path,
+        default_env=default_env,
+        default_source=default_source,
+        default_owner=default_owner,
+        default_executor=default_executor,
+    )
+
+    scene_ids = case_to_scene_ids.get(case_id, [])
+    metadata = raw_case.get("_metadata", {}) if isinstance(raw_case, dict) else {}
+
+    doc = to_test_case_index_document(
+        test_case,
+        steps_content=steps_content,
+        expected_result_content=expected_result_content,
+        scene_ids=scene_ids,
+        scene_names=[scene_names.get(scene_id, scene_id) for scene_id in scene_ids],
+        module_id=metadata.get("module_id") or raw_case.get("module"),
+        module_name=raw_case.get("module"),
     )
+    return test_case, doc
 
 
-def _write_text(path: Path, content: str) -> None:
-    """Persist text content to disk."""
-    path.parent.mkdir(parents=True, exist_ok=True)
+def _write_text(path: Path, content: str) -> str:
+    """Persist text content to disk and return its path (folders already exist)."""
     path.write_text(content, encoding="utf-8")
+    return path.as_posix()
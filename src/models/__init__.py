@@ -1,7 +1,9 @@
-"""Model clients for Doubao, G2M and Ollama."""
+"""Model clients for Doubao, G2M, Ollama and OpenAI-compatible servers, and a router across them."""
 
 from .doubao_client import DoubaoClient
 from .g2m_client import G2MClient
 from .ollama_client import OllamaClient
+from .openai_compat_client import OpenAICompatClient
+from .router import RoutingModelClient
 
-__all__ = ["DoubaoClient", "G2MClient", "OllamaClient"]
+__all__ = ["DoubaoClient", "G2MClient", "OllamaClient", "OpenAICompatClient", "RoutingModelClient"]
@@ -1,6 +1,7 @@
 """Base model client interface."""
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
@@ -68,3 +69,42 @@ class BaseModelClient(ABC):
             ModelResponse object
         """
         pass
+
+    def batch_completion(
+        self,
+        messages_list: List[List[Dict[str, str]]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> List[ModelResponse]:
+        """
+        Generate chat completions for several independent conversations.
+
+        Providers with a multi-prompt API override this to send one request;
+        the default sends concurrent single calls (still capped by the
+        provider's concurrency governor).
+
+        Args:
+            messages_list: One list of chat messages per completion
+            model: Model name (optional)
+            temperature: Generation temperature
+            max_tokens: Maximum tokens to generate per completion
+            **kwargs: Additional model-specific parameters
+
+        Returns:
+            ModelResponse objects in input order
+        """
+        if len(messages_list) <= 1:
+            return [
+                self.chat_completion(messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs)
+                for messages in messages_list
+            ]
+        with ThreadPoolExecutor(max_workers=min(len(messages_list), 8)) as pool:
+            futures = [
+                pool.submit(
+                    self.chat_completion, messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+                )
+                for messages in messages_list
+            ]
+            return [future.result() for future in futures]
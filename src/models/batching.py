@@ -0,0 +1,143 @@
+"""Micro-batching of concurrent single calls into batch_completion.
+
+`TestCaseGenerator` issues one small chat call per case from several
+worker threads. `BatchingModelClient` sends a call at once while no batch
+is in flight. Otherwise it collects concurrent calls that share model,
+temperature, max_tokens and parameters until `max_batch_size` calls are
+waiting, `max_wait_seconds` pass or the in-flight batches finish, and
+sends them as one `batch_completion` of the wrapped client, e.g. one
+multi-prompt G2M request.
+
+Wrap it inside a BudgetedModelClient so every call is still reserved and
+charged on its own. If the batch request fails, every call in it fails
+with the same error.
+"""
+
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from .base import BaseModelClient, ModelResponse
+from ..utils.exceptions import ModelAPIError
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    def __init__(self):
+        self.messages: List[List[Dict[str, Any]]] = []
+        self.futures: List[Future] = []
+        self.full = threading.Event()
+        self.closed = False
+
+
+class BatchingModelClient(BaseModelClient):
+    """Model client wrapper that batches concurrent identical-parameter calls."""
+
+    def __init__(self, client: BaseModelClient, max_batch_size: int = 8, max_wait_seconds: float = 0.05):
+        """
+        Wrap a client.
+
+        Args:
+            client: Underlying model client (ideally with a native batch_completion)
+            max_batch_size: Calls per batch
+            max_wait_seconds: How long the first call of a batch waits for others
+                while another batch is in flight
+        """
+        self.client = client
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._open: Dict[str, _Batch] = {}
+        self._in_flight = 0
+        self.batches = 0
+        self.batched_calls = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        key = json.dumps([model, temperature, max_tokens, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+        future: Future = Future()
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._open[key] = batch
+            batch.messages.append(messages)
+            batch.futures.append(future)
+            if leader and self._in_flight == 0:
+                # Nothing to wait behind: waiting would only add latency.
+                self._close(key, batch)
+            elif len(batch.messages) >= self.max_batch_size:
+                self._close(key, batch)
+
+        if leader:
+            batch.full.wait(self.max_wait_seconds)
+            with self._lock:
+                self._close(key, batch)
+            self._dispatch(batch, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs)
+        return future.result()
+
+    def multimodal_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        return self.client.multimodal_completion(
+            messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+
+    def batch_completion(self, messages_list: List[List[Dict[str, str]]], **kwargs) -> List[ModelResponse]:
+        return self.client.batch_completion(messages_list, **kwargs)
+
+    def _close(self, key: str, batch: _Batch) -> None:
+        """Stop a batch taking calls and count it in flight (lock held)."""
+        if batch.closed:
+            return
+        batch.closed = True
+        if self._open.get(key) is batch:
+            del self._open[key]
+        self._in_flight += 1
+        batch.full.set()
+
+    def _dispatch(self, batch: _Batch, **kwargs) -> None:
+        with self._lock:
+            self.batches += 1
+            self.batched_calls += len(batch.messages)
+        if len(batch.messages) > 1:
+            logger.debug(f"Sending {len(batch.messages)} calls as one batch")
+        try:
+            responses = self.client.batch_completion(batch.messages, **kwargs)
+            if len(responses) != len(batch.messages):
+                raise ModelAPIError(f"Batch returned {len(responses)} responses for {len(batch.messages)} calls")
+        except BaseException as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    # The backend is idle: send what has been collected.
+                    for waiting in self._open.values():
+                        waiting.full.set()
+        for future, response in zip(batch.futures, responses):
+            future.set_result(response)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"batches": self.batches, "calls": self.batched_calls}
@@ -0,0 +1,253 @@
+"""Run-wide token and call budgets for model clients.
+
+`BudgetAccountant` tracks LLM calls and tokens spent by a run against
+optional limits (`--max-tokens-total`, `--max-llm-calls`).
+`BudgetedModelClient` wraps any client, refusing calls that would exceed
+a limit with BudgetExceededError and charging each call with the
+provider's reported usage (or the offline estimate when usage is
+missing). Until a call is charged, its prompt + max_tokens stay reserved,
+so concurrent calls cannot overshoot the token limit together.
+
+Agents read `accountant.level()` to degrade before the budget runs out:
+
+1. REUSE_STEPS: reuse flow.steps instead of generating steps;
+2. TEMPLATE_EXPECTED: use the template expected result;
+3. STOP: generate no more cases and return what exists.
+
+`TimeBudget` is the wall-clock counterpart: generation asks it whether a
+case's LLM calls still fit before the deadline and otherwise uses the same
+cheap fallbacks.
+"""
+
+import logging
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional
+
+from .base import BaseModelClient, ModelResponse
+from ..utils.call_stats import LatencyStats, get_latency_stats
+from ..utils.exceptions import BudgetExceededError
+from ..utils.token_estimator import estimate_messages_tokens, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class DegradeLevel(IntEnum):
+    """How far generation has stepped down to save budget."""
+
+    NORMAL = 0
+    REUSE_STEPS = 1
+    TEMPLATE_EXPECTED = 2
+    STOP = 3
+
+
+class BudgetAccountant:
+    """Thread-safe tally of LLM calls and tokens against optional limits."""
+
+    def __init__(
+        self,
+        max_tokens_total: Optional[int] = None,
+        max_llm_calls: Optional[int] = None,
+        reuse_steps_at: float = 0.8,
+        template_expected_at: float = 0.9,
+    ):
+        """
+        Initialize accountant.
+
+        Args:
+            max_tokens_total: Prompt + completion token limit (None = unlimited)
+            max_llm_calls: Call limit (None = unlimited)
+            reuse_steps_at: Used fraction from which steps are no longer generated
+            template_expected_at: Used fraction from which expected results use the template
+        """
+        self.max_tokens_total = max_tokens_total
+        self.max_llm_calls = max_llm_calls
+        self.reuse_steps_at = reuse_steps_at
+        self.template_expected_at = template_expected_at
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.pending_tokens = 0
+        self.refused = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def used_fraction(self) -> float:
+        """Largest fraction used across the configured limits."""
+        with self._lock:
+            fractions = [0.0]
+            if self.max_tokens_total:
+                fractions.append(self.tokens / self.max_tokens_total)
+            if self.max_llm_calls:
+                fractions.append(self.calls / self.max_llm_calls)
+        return max(fractions)
+
+    def level(self) -> DegradeLevel:
+        used = self.used_fraction()
+        if used >= 1.0 or self.refused:
+            return DegradeLevel.STOP
+        if used >= self.template_expected_at:
+            return DegradeLevel.TEMPLATE_EXPECTED
+        if used >= self.reuse_steps_at:
+            return DegradeLevel.REUSE_STEPS
+        return DegradeLevel.NORMAL
+
+    def reserve(self, prompt_tokens: int, max_tokens: Optional[int]) -> int:
+        """
+        Admit one call or refuse it.
+
+        Args:
+            prompt_tokens: Estimated prompt tokens
+            max_tokens: Requested completion limit (counted in full)
+
+        Returns:
+            Tokens reserved for the call; pass them to charge()
+
+        Raises:
+            BudgetExceededError: If the call, with the calls still in flight,
+                would exceed a limit
+        """
+        reserved = prompt_tokens + (max_tokens or 0)
+        with self._lock:
+            limit = None
+            if self.max_llm_calls is not None and self.calls + 1 > self.max_llm_calls:
+                limit = "max_llm_calls"
+            elif (
+                self.max_tokens_total is not None
+                and self.tokens + self.pending_tokens + reserved > self.max_tokens_total
+            ):
+                limit = "max_tokens_total"
+            if limit:
+                self.refused += 1
+                raise BudgetExceededError(
+                    f"LLM budget exhausted ({limit}): {self.calls} calls, {self.tokens} tokens used",
+                    limit=limit,
+                )
+            self.calls += 1
+            self.pending_tokens += reserved
+        return reserved
+
+    def charge(self, prompt_tokens: int, completion_tokens: int, reserved: int = 0) -> None:
+        """Record a finished call's usage and release its reservation."""
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.pending_tokens = max(0, self.pending_tokens - reserved)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.tokens,
+                "refused_calls": self.refused,
+                "max_tokens_total": self.max_tokens_total,
+                "max_llm_calls": self.max_llm_calls,
+            }
+
+
+class BudgetedModelClient(BaseModelClient):
+    """Model client wrapper that enforces a BudgetAccountant."""
+
+    def __init__(self, client: BaseModelClient, accountant: BudgetAccountant):
+        """
+        Wrap a client.
+
+        Args:
+            client: Underlying model client
+            accountant: Shared budget accountant
+        """
+        self.client = client
+        self.accountant = accountant
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        return self._call(
+            self.client.chat_completion, messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+
+    def multimodal_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        return self._call(
+            self.client.multimodal_completion, messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+
+    def _call(self, method, messages, **kwargs) -> ModelResponse:
+        prompt_tokens = estimate_messages_tokens(messages)
+        reserved = self.accountant.reserve(prompt_tokens, kwargs.get("max_tokens"))
+        try:
+            response = method(messages, **kwargs)
+        except BaseException:
+            # The request most likely reached the provider; charge the prompt.
+            self.accountant.charge(prompt_tokens, 0, reserved)
+            raise
+        usage = response.usage or {}
+        if usage.get("prompt_tokens"):
+            self.accountant.charge(int(usage["prompt_tokens"]), int(usage.get("completion_tokens") or 0), reserved)
+        else:
+            self.accountant.charge(prompt_tokens, estimate_tokens(response.content), reserved)
+        return response
+
+
+class TimeBudget:
+    """Wall-clock deadline for a run (`--time-budget`).
+
+    `reserve_seconds` is kept free at the end for saving and
+    materializing outputs. Whether more LLM work fits is judged from the
+    historical per-call latency in LatencyStats, which is updated live as
+    calls complete.
+    """
+
+    def __init__(
+        self,
+        seconds: float,
+        reserve_seconds: Optional[float] = None,
+        latency: Optional[LatencyStats] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Start the clock.
+
+        Args:
+            seconds: Total time allowed for the run
+            reserve_seconds: Time kept for saving (default 10%, at most 60s)
+            latency: Per-shape latency stats (default: process-wide stats)
+            clock: Monotonic clock (for tests)
+        """
+        self.seconds = seconds
+        self.reserve_seconds = min(60.0, seconds * 0.1) if reserve_seconds is None else reserve_seconds
+        self.latency = latency or get_latency_stats()
+        self._clock = clock
+        self.started = clock()
+
+    def elapsed(self) -> float:
+        return self._clock() - self.started
+
+    def remaining(self) -> float:
+        """Seconds left for LLM work (excluding the reserve)."""
+        return self.seconds - self.reserve_seconds - self.elapsed()
+
+    def can_afford(self, shapes: List[str]) -> bool:
+        """Whether calls of these shapes are expected to finish in time."""
+        cost = sum(self.latency.mean(shape) for shape in shapes)
+        return cost <= self.remaining()
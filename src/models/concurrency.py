@@ -0,0 +1,232 @@
+"""Adaptive (AIMD) concurrency control for model API calls.
+
+One `ConcurrencyGovernor` per provider is shared by every client of that
+provider in the process. Each HTTP attempt holds a slot while in flight:
+
+- additive increase: every healthy completion grows the window by
+  1/window, i.e. about one slot per window's worth of successes;
+- multiplicative decrease: HTTP 429/5xx, timeouts, or a p95 latency above
+  the target shrink the window (x0.5 by default), at most once per window
+  so a burst of failures from one wave counts once;
+- other failures (4xx, parse errors, ...) free the slot without moving
+  the window or adding a latency sample.
+
+Each model of a provider gets its own governor (pool). Limits come from
+`global.concurrency` in config/prompts.yaml, with a `default` entry and
+optional per-provider and per-model overrides:
+
+    concurrency:
+      default: {min: 1, max: 8, initial: 2}
+      ollama: {max: 2, models: {"qwen3:32b": {max: 1}}}
+
+A pool of Ollama hosts uses one governor per host instead, with optional
+per-host overrides under `hosts` (e.g. `ollama: {hosts: {"http://box1:11434": {max: 4}}}`).
+
+`governor_metrics()` exposes the current windows.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from ..utils.config_loader import get_config
+from ..utils.exceptions import ModelTimeoutError
+from ..utils.retry_policy import error_status_code
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {"min": 1, "max": 8, "initial": 2}
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """Whether an error means the provider is overloaded (429, 5xx, timeout)."""
+    if isinstance(exc, (ModelTimeoutError, TimeoutError)):
+        return True
+    status = error_status_code(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class ConcurrencyGovernor:
+    """AIMD window over in-flight calls to one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        initial: Optional[int] = None,
+        decrease_factor: float = 0.5,
+        latency_target: Optional[float] = None,
+        latency_window: int = 50,
+    ):
+        """
+        Initialize governor.
+
+        Args:
+            name: Provider name (for logs and metrics)
+            min_limit: Smallest window
+            max_limit: Largest window
+            initial: Starting window (defaults to min_limit)
+            decrease_factor: Multiplier applied on overload
+            latency_target: p95 seconds above which the window shrinks; by
+                default twice the best p95 observed so far
+            latency_window: Completions kept for the p95 estimate
+        """
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial or self.min_limit)))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._best_p95: Optional[float] = None
+        self._seq = 0
+        self._last_cut_seq = 0
+        self.successes = 0
+        self.overloads = 0
+        self.failures = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> int:
+        """Block until a slot is free; returns a ticket for release()."""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+            self._seq += 1
+            return self._seq
+
+    def release(self, ticket: int, latency: float, overloaded: bool = False, completed: bool = True) -> None:
+        """
+        Free a slot and adapt the window.
+
+        Args:
+            ticket: Value returned by acquire()
+            latency: Seconds the call took
+            overloaded: Whether the call failed with an overload error
+            completed: Whether the call succeeded; other failures leave the window as is
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                self.overloads += 1
+                self._decrease(ticket, "overload")
+            elif not completed:
+                self.failures += 1
+            else:
+                self.successes += 1
+                self._latencies.append(latency)
+                p95 = self._p95()
+                if p95 is not None and self._latency_too_high(p95):
+                    self._decrease(ticket, f"p95 latency {p95:.1f}s")
+                elif self._limit < self.max_limit:
+                    self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot around one call attempt."""
+        ticket = self.acquire()
+        started = time.monotonic()
+        overloaded = False
+        completed = False
+        try:
+            yield
+            completed = True
+        except BaseException as e:
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            self.release(ticket, time.monotonic() - started, overloaded=overloaded, completed=completed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current window and counters, for metrics/logging."""
+        with self._cond:
+            return {
+                "provider": self.name,
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "successes": self.successes,
+                "overloads": self.overloads,
+                "failures": self.failures,
+                "p95_seconds": self._p95(),
+            }
+
+    def _decrease(self, ticket: int, reason: str) -> None:
+        # Calls started before the last cut saw the old window; don't cut twice for them.
+        if ticket <= self._last_cut_seq:
+            return
+        self._last_cut_seq = self._seq
+        old = self._limit
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+        # Latencies from the old window would trigger the next cut immediately.
+        self._latencies.clear()
+        logger.info(f"{self.name} concurrency {int(old)} -> {int(self._limit)} ({reason})")
+
+    def _p95(self) -> Optional[float]:
+        if len(self._latencies) < 10:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _latency_too_high(self, p95: float) -> bool:
+        if self.latency_target is not None:
+            return p95 > self.latency_target
+        if self._best_p95 is None or p95 < self._best_p95:
+            self._best_p95 = p95
+            return False
+        return p95 > 2 * self._best_p95
+
+
+_governors: Dict[str, ConcurrencyGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def _limits_for(provider: str, model: str = "", host: str = "") -> Dict[str, Any]:
+    conf = get_config("concurrency", {}) or {}
+    provider_conf = conf.get(provider, {}) or {}
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(conf.get("default", {}) or {})
+    limits.update({k: v for k, v in provider_conf.items() if k not in ("models", "hosts")})
+    limits.update((provider_conf.get("models") or {}).get(model, {}) or {})
+    limits.update((provider_conf.get("hosts") or {}).get(host, {}) or {})
+    return limits
+
+
+def get_governor(provider: str, model: Optional[str] = None, host: Optional[str] = None) -> ConcurrencyGovernor:
+    """Process-wide governor for a provider's model (or host), created from config on first use."""
+    name = f"{provider}@{host}" if host else provider
+    if model:
+        name = f"{name}/{model}"
+    with _governors_lock:
+        governor = _governors.get(name)
+        if governor is None:
+            limits = _limits_for(provider, model or "", host or "")
+            governor = ConcurrencyGovernor(
+                name,
+                min_limit=int(limits["min"]),
+                max_limit=int(limits["max"]),
+                initial=int(limits.get("initial") or limits["min"]),
+                latency_target=limits.get("p95_latency_seconds"),
+            )
+            _governors[name] = governor
+        return governor
+
+
+def governor_metrics() -> Dict[str, Dict[str, Any]]:
+    """Snapshots of all governors created so far."""
+    with _governors_lock:
+        governors = list(_governors.values())
+    return {governor.name: governor.snapshot() for governor in governors}
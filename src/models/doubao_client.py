@@ -3,12 +3,15 @@
 import os
 import logging
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from openai import APITimeoutError, OpenAI
 import requests.exceptions
 
 from .base import BaseModelClient, ModelResponse
 from ..utils.exceptions import ModelAPIError, ModelTimeoutError
 from ..utils.error_handler import safe_model_call
+from ..utils.retry_policy import error_status_code, get_circuit_breaker, get_retry_policy
+from .concurrency import get_governor
+from .rate_limiter import get_rate_limiter, request_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,8 @@ logger = logging.getLogger(__name__)
 class DoubaoClient(BaseModelClient):
     """Client for Doubao models via Volcengine Ark API."""
 
+    provider = "doubao"
+
     def __init__(
         self,
         api_key: Optional[str] = None,
@@ -40,9 +45,11 @@ class DoubaoClient(BaseModelClient):
         # Prefer explicit arg, then env, then a project-safe default endpoint
         self.default_model = default_model or os.getenv("ARK_MODEL_ID") or "ep-20251230165319-6fwz7"
 
+        # Retries are handled by safe_model_call's policy and circuit breaker.
         self.client = OpenAI(
             base_url=self.base_url,
             api_key=self.api_key,
+            max_retries=0,
         )
 
         logger.info(
@@ -111,17 +118,29 @@ class DoubaoClient(BaseModelClient):
                     usage=usage
                 )
 
-            except TimeoutError as e:
-                raise ModelTimeoutError(f"Request timeout: {e}")
-            except requests.exceptions.Timeout as e:
-                raise ModelTimeoutError(f"Request timeout: {e}")
+            except (TimeoutError, APITimeoutError, requests.exceptions.Timeout) as e:
+                raise ModelTimeoutError(f"Request timeout: {e}") from e
             except requests.exceptions.RequestException as e:
-                raise ModelAPIError(f"API request failed: {e}")
+                raise ModelAPIError(f"API request failed: {e}", status_code=error_status_code(e)) from e
+            except ModelAPIError:
+                raise
             except Exception as e:
                 logger.error(f"Unexpected error in Doubao call: {e}")
-                raise ModelAPIError(f"Model call failed: {str(e)}")
-
-        return safe_model_call(_call, max_retries=3, retry_delay=2.0)
+                raise ModelAPIError(f"Model call failed: {str(e)}", status_code=error_status_code(e)) from e
+
+        return self._safe_call(_call, model, messages, max_tokens)
+
+    @staticmethod
+    def _safe_call(call, model: str, messages: List[Dict[str, Any]], max_tokens: Optional[int]) -> ModelResponse:
+        """Run one request under the provider's retry, breaker, rate and concurrency limits."""
+        return safe_model_call(
+            call,
+            policy=get_retry_policy("doubao"),
+            breaker=get_circuit_breaker("doubao"),
+            governor=get_governor("doubao", model),
+            rate_limiter=get_rate_limiter("doubao", model),
+            rate_tokens=request_tokens(messages, max_tokens),
+        )
 
     def multimodal_completion(
         self,
@@ -155,21 +174,26 @@ class DoubaoClient(BaseModelClient):
         """
         model = model or self.default_model
 
-        try:
-            params = {
-                "model": model,
-                "messages": messages,
-                "temperature": temperature,
-            }
+        params = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+        }
 
-            if max_tokens is not None:
-                params["max_tokens"] = max_tokens
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
 
-            params.update(kwargs)
+        params.update(kwargs)
 
-            logger.debug(f"Calling Doubao multimodal completion with model={model}")
+        logger.debug(f"Calling Doubao multimodal completion with model={model}")
 
-            response = self.client.chat.completions.create(**params)
+        def _call():
+            try:
+                response = self.client.chat.completions.create(**params)
+            except (TimeoutError, APITimeoutError) as e:
+                raise ModelTimeoutError(f"Request timeout: {e}") from e
+            except Exception as e:
+                raise ModelAPIError(f"Model call failed: {str(e)}", status_code=error_status_code(e)) from e
 
             content = response.choices[0].message.content
             usage = {
@@ -184,6 +208,8 @@ class DoubaoClient(BaseModelClient):
                 usage=usage
             )
 
+        try:
+            return self._safe_call(_call, model, messages, max_tokens)
         except Exception as e:
             logger.error(f"Error calling Doubao multimodal completion: {e}")
             raise
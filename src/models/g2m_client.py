@@ -8,6 +8,13 @@ from typing import List, Dict, Any, Optional
 import requests
 
 from .base import BaseModelClient, ModelResponse
+from ..utils.config_loader import get_config
+from ..utils.error_handler import safe_model_call
+from ..utils.exceptions import ModelAPIError, ModelTimeoutError
+from ..utils.retry_policy import error_status_code, get_circuit_breaker, get_retry_policy
+from .concurrency import get_governor
+from .rate_limiter import get_rate_limiter, request_tokens
+from ..utils.token_estimator import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +22,10 @@ logger = logging.getLogger(__name__)
 class G2MClient(BaseModelClient):
     """Client for G2M models."""
 
+    provider = "g2m"
+    # /v1/completions accepts a list of prompts (see batch_completion).
+    native_batching = True
+
     def __init__(
         self,
         api_key: Optional[str] = None,
@@ -40,6 +51,7 @@ class G2MClient(BaseModelClient):
         self.base_url = base_url
         self.default_text_model = default_text_model
         self.default_vl_model = default_vl_model
+        self.max_batch_size = max(1, int((get_config("batching", {}) or {}).get("max_batch_size", 8)))
 
         logger.info(f"Initialized G2MClient with base_url={base_url}")
 
@@ -55,13 +67,31 @@ class G2MClient(BaseModelClient):
             "Content-Type": "application/json",
         }
 
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"G2M API request failed: {e}")
-            raise
+        prompts = payload.get("prompt", "")
+        prompts = prompts if isinstance(prompts, list) else [prompts]
+        messages = payload.get("messages") or [{"role": "user", "content": p} for p in prompts]
+        # Each prompt of a batch may generate up to max_tokens.
+        max_tokens = payload["max_tokens"] * len(prompts) if payload.get("max_tokens") else None
+
+        def _post():
+            try:
+                response = requests.post(url, headers=headers, json=payload, timeout=60)
+                response.raise_for_status()
+                return response.json()
+            except requests.exceptions.Timeout as e:
+                raise ModelTimeoutError(f"G2M request timeout: {e}") from e
+            except requests.exceptions.RequestException as e:
+                logger.error(f"G2M API request failed: {e}")
+                raise ModelAPIError(f"G2M API request failed: {e}", status_code=error_status_code(e)) from e
+
+        return safe_model_call(
+            _post,
+            policy=get_retry_policy("g2m"),
+            breaker=get_circuit_breaker("g2m"),
+            governor=get_governor("g2m", payload.get("model")),
+            rate_limiter=get_rate_limiter("g2m", payload.get("model")),
+            rate_tokens=request_tokens(messages, max_tokens),
+        )
 
     def chat_completion(
         self,
@@ -178,6 +208,95 @@ class G2MClient(BaseModelClient):
             logger.error(f"Error calling G2M multimodal completion: {e}")
             raise
 
+    def batch_completion(
+        self,
+        messages_list: List[List[Dict[str, str]]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> List[ModelResponse]:
+        """
+        Generate completions for several conversations with multi-prompt requests.
+
+        Up to `max_batch_size` prompts (global.batching.max_batch_size) are
+        sent per /v1/completions request and the returned choices are
+        matched to prompts by index. The request's usage is split across
+        the prompts in proportion to their estimated sizes.
+
+        Args:
+            messages_list: One list of chat messages per completion
+            model: Model name (uses default if not provided)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate per completion
+            **kwargs: Additional parameters
+
+        Returns:
+            ModelResponse objects in input order
+        """
+        model = model or self.default_text_model
+        results: List[ModelResponse] = []
+        for start in range(0, len(messages_list), self.max_batch_size):
+            chunk = messages_list[start:start + self.max_batch_size]
+            if len(chunk) == 1:
+                results.append(
+                    self.chat_completion(chunk[0], model=model, temperature=temperature, max_tokens=max_tokens, **kwargs)
+                )
+                continue
+
+            prompts = [self._messages_to_prompt(messages) for messages in chunk]
+            payload = {
+                "model": model,
+                "prompt": prompts,
+                "temperature": temperature,
+                "stream": False,
+            }
+            if max_tokens:
+                payload["max_tokens"] = max_tokens
+            payload.update(kwargs)
+
+            logger.debug(f"Calling G2M batch completion with model={model}, prompts={len(prompts)}")
+            response = self._make_request("/v1/completions", payload)
+
+            # With n completions per prompt, choice index = prompt index * n + i; keep the first.
+            n = int(payload.get("n") or 1)
+            texts: List[Optional[str]] = [None] * len(prompts)
+            for choice in response.get("choices", []):
+                index = int(choice.get("index", 0))
+                if index % n == 0 and 0 <= index // n < len(prompts):
+                    texts[index // n] = choice.get("text", "")
+            missing = [i for i, text in enumerate(texts) if text is None]
+            if missing:
+                raise ModelAPIError(f"G2M batch response has no choice for prompts {missing}")
+
+            usages = self._split_usage(response.get("usage"), prompts, texts)
+            results.extend(
+                ModelResponse(content=text, model=model, usage=usage) for text, usage in zip(texts, usages)
+            )
+        return results
+
+    @staticmethod
+    def _split_usage(
+        usage: Optional[Dict[str, int]], prompts: List[str], texts: List[str]
+    ) -> List[Optional[Dict[str, int]]]:
+        """Split a batch request's usage across prompts by estimated token counts."""
+        if not usage or not usage.get("prompt_tokens"):
+            return [None] * len(prompts)
+
+        def _shares(total: int, weights: List[int]) -> List[int]:
+            if not sum(weights):
+                weights = [1] * len(weights)
+            shares = [total * w // sum(weights) for w in weights]
+            shares[-1] += total - sum(shares)
+            return shares
+
+        prompt_shares = _shares(int(usage["prompt_tokens"]), [estimate_tokens(p) for p in prompts])
+        completion_shares = _shares(int(usage.get("completion_tokens") or 0), [estimate_tokens(t) for t in texts])
+        return [
+            {"prompt_tokens": p, "completion_tokens": c, "total_tokens": p + c}
+            for p, c in zip(prompt_shares, completion_shares)
+        ]
+
     @staticmethod
     def _messages_to_prompt(messages: List[Dict[str, str]]) -> str:
         """Convert chat messages to a single prompt string."""
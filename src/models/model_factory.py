@@ -2,16 +2,35 @@
 
 import os
 import logging
-from typing import Optional, Literal
+from typing import Dict, Iterable, List, Optional, Literal, Tuple
 
 from .base import BaseModelClient
 from .doubao_client import DoubaoClient
 from .g2m_client import G2MClient
 from .ollama_client import OllamaClient
+from .openai_compat_client import OpenAICompatClient
+from .router import RoutingModelClient
+from ..utils.config_loader import get_config
 
 logger = logging.getLogger(__name__)
 
-ModelProvider = Literal["doubao", "g2m", "ollama", "auto"]
+ModelProvider = Literal["doubao", "g2m", "ollama", "openai_compat", "auto", "router"]
+
+# Constructor argument holding each provider's default (text) model.
+MODEL_ARG = {
+    "doubao": "default_model",
+    "g2m": "default_text_model",
+    "ollama": "default_model",
+    "openai_compat": "default_model",
+}
+
+# Env vars whose presence means a backend is configured, in "auto" preference order.
+BACKEND_ENV = {
+    "doubao": ("ARK_API_KEY",),
+    "g2m": ("G2M_API_KEY",),
+    "ollama": ("OLLAMA_HOST", "OLLAMA_HOSTS", "OLLAMA_MODEL"),
+    "openai_compat": ("OPENAI_COMPAT_BASE_URL",),
+}
 
 
 class ModelFactory:
@@ -26,8 +45,9 @@ class ModelFactory:
         Create a model client based on provider.
 
         Args:
-            provider: Model provider ("doubao", "g2m", or "auto")
-                     "auto" will try Doubao first, then fall back to G2M
+            provider: Model provider ("doubao", "g2m", "ollama", "openai_compat", "auto" or "router")
+                     "auto" will try Doubao first, then fall back to G2M;
+                     "router" routes and hedges across all configured backends
             **kwargs: Additional arguments to pass to client constructor
 
         Returns:
@@ -44,9 +64,12 @@ class ModelFactory:
             elif os.getenv("G2M_API_KEY"):
                 logger.info("Auto-selecting G2M (G2M_API_KEY found)")
                 return G2MClient(**kwargs)
-            elif os.getenv("OLLAMA_HOST") or os.getenv("OLLAMA_MODEL"):
-                logger.info("Auto-selecting Ollama (OLLAMA_HOST or OLLAMA_MODEL found)")
+            elif os.getenv("OLLAMA_HOST") or os.getenv("OLLAMA_HOSTS") or os.getenv("OLLAMA_MODEL"):
+                logger.info("Auto-selecting Ollama (OLLAMA_HOST(S) or OLLAMA_MODEL found)")
                 return OllamaClient(**kwargs)
+            elif os.getenv("OPENAI_COMPAT_BASE_URL"):
+                logger.info("Auto-selecting OpenAI-compatible server (OPENAI_COMPAT_BASE_URL found)")
+                return OpenAICompatClient(**kwargs)
             else:
                 raise ValueError(
                     "No API keys found. Set ARK_API_KEY or G2M_API_KEY in environment."
@@ -64,8 +87,114 @@ class ModelFactory:
             logger.info("Creating Ollama client")
             return OllamaClient(**kwargs)
 
+        elif provider == "openai_compat":
+            logger.info("Creating OpenAI-compatible client")
+            return OpenAICompatClient(**kwargs)
+
+        elif provider == "router":
+            return ModelFactory.create_router(**kwargs)
+
         else:
-            raise ValueError(f"Invalid provider: {provider}. Use 'doubao', 'g2m', or 'auto'.")
+            raise ValueError(
+                f"Invalid provider: {provider}. Use 'doubao', 'g2m', 'ollama', 'openai_compat', 'auto' or 'router'."
+            )
+
+    @staticmethod
+    def create_router(backends: Optional[List[str]] = None) -> RoutingModelClient:
+        """
+        Create a routing client over the configured backends.
+
+        Args:
+            backends: Provider names in preference order (default:
+                `global.routing.backends`, else every provider whose env vars are set)
+
+        Returns:
+            RoutingModelClient instance
+
+        Raises:
+            ValueError: If no backend can be created
+        """
+        conf = get_config("routing", {}) or {}
+        names = backends or conf.get("backends") or list(BACKEND_ENV)
+        clients = {}
+        for name in names:
+            if not any(os.getenv(var) for var in BACKEND_ENV.get(name, ())):
+                continue
+            try:
+                clients[name] = ModelFactory.create_client(name)
+            except ValueError as e:
+                logger.warning(f"Skipping backend {name}: {e}")
+        if not clients:
+            raise ValueError(f"No model backends configured for routing (tried {', '.join(names)}).")
+        logger.info(f"Routing across backends: {', '.join(clients)}")
+        return RoutingModelClient(
+            clients,
+            hedge=bool(conf.get("hedge", True)) and len(clients) > 1,
+            hedge_after_seconds=float(conf.get("hedge_after_seconds", 30.0)),
+            min_hedge_seconds=float(conf.get("min_hedge_seconds", 1.0)),
+        )
+
+
+def create_agent_clients(
+    agents: Iterable[str],
+    provider: ModelProvider = "auto",
+) -> Dict[str, BaseModelClient]:
+    """
+    Create one client per agent according to `global.model_tiers`.
+
+    An agent tier may set `provider` and/or `model`; unset fields fall back
+    to `provider` (the CLI's --provider) and the provider's default model.
+    Agents that resolve to the same provider and model share one client.
+
+    Args:
+        agents: Agent names (requirement_parser, rule_generator, testcase_generator)
+        provider: Default provider
+
+    Returns:
+        Clients by agent name
+    """
+    tiers = get_config("model_tiers", {}) or {}
+    shared: Dict[Tuple[str, Optional[str]], BaseModelClient] = {}
+    clients: Dict[str, BaseModelClient] = {}
+    for agent in agents:
+        tier = tiers.get(agent) or {}
+        agent_provider = tier.get("provider") or provider
+        model = tier.get("model") or None
+        key = (agent_provider, model)
+        if key not in shared:
+            kwargs = {}
+            if model:
+                if agent_provider not in MODEL_ARG:
+                    raise ValueError(
+                        f"model_tiers.{agent}.model needs an explicit provider (doubao/g2m/ollama/openai_compat)"
+                    )
+                kwargs[MODEL_ARG[agent_provider]] = model
+            shared[key] = ModelFactory.create_client(agent_provider, **kwargs)
+            logger.info(f"Model for {agent}: {agent_provider}/{model or 'default'}")
+        clients[agent] = shared[key]
+    return clients
+
+
+def task_model(model_client: BaseModelClient, shape: str) -> Optional[str]:
+    """
+    Model configured for a call shape in `global.model_tiers`.
+
+    A tier with a provider only applies to clients of that provider, since
+    model names are provider-specific. The router's backends always use
+    their own default models: the router would send one model name to
+    every backend.
+
+    Returns:
+        Model name, or None to use the client's default model
+    """
+    tier = (get_config("model_tiers", {}) or {}).get(shape) or {}
+    client_provider = getattr(model_client, "provider", None)
+    if client_provider == "router":
+        return None
+    provider = tier.get("provider")
+    if provider and provider != client_provider:
+        return None
+    return tier.get("model") or None
 
 
 def get_default_client(**kwargs) -> BaseModelClient:
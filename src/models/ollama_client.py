@@ -1,33 +1,75 @@
-"""Ollama model client using local/remote Ollama HTTP API."""
+"""Ollama model client using the native Ollama chat API (/api/chat).
+
+Requests carry `keep_alive` (global.ollama.keep_alive or OLLAMA_KEEP_ALIVE)
+so the model stays resident between sparse calls, and the same `num_ctx`
+on every call including `preload()`: a model loaded with a different
+context size is reloaded, which also drops the KV cache Ollama reuses for
+prompts that share a prefix (such as the same PRD preamble).
+
+With several hosts (OLLAMA_HOSTS or global.ollama.hosts) calls are spread
+by an `OllamaHostPool`, which keeps same-prefix prompts on one host.
+"""
 
 import os
 import logging
+import threading
 from typing import List, Dict, Any, Optional
 import requests
 
 from .base import BaseModelClient, ModelResponse
 from ..utils.error_handler import safe_model_call
 from ..utils.exceptions import ModelAPIError, ModelTimeoutError
+from ..utils.config_loader import get_config
+from ..utils.retry_policy import error_status_code, get_circuit_breaker, get_retry_policy
+from .concurrency import get_governor
+from .ollama_pool import OllamaHostPool
+from .rate_limiter import get_rate_limiter, request_tokens
 
 logger = logging.getLogger(__name__)
 
+# Generation parameters accepted as keyword arguments and sent as Ollama options.
+OPTION_KWARGS = ("top_p", "top_k", "seed", "stop", "repeat_penalty", "num_ctx")
+
 
 class OllamaClient(BaseModelClient):
     """Client for Ollama models via HTTP API."""
 
+    provider = "ollama"
+
     def __init__(
         self,
         host: Optional[str] = None,
         default_model: Optional[str] = None,
+        hosts: Optional[List[str]] = None,
     ):
-        self.host = host or os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        settings = get_config("ollama", {}) or {}
+        if hosts is None and not host:
+            env_hosts = os.getenv("OLLAMA_HOSTS")
+            hosts = [h.strip() for h in env_hosts.split(",") if h.strip()] if env_hosts else settings.get("hosts")
+        hosts = [h.rstrip("/") for h in hosts or []]
+        self.host = host or (hosts[0] if hosts else os.getenv("OLLAMA_HOST", "http://localhost:11434"))
         self.base = f"{self.host}/api"
         self.default_model = default_model or os.getenv("OLLAMA_MODEL")
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE") or settings.get("keep_alive")
+        self.num_ctx = settings.get("num_ctx")
+        self.pool: Optional[OllamaHostPool] = None
+        if len(hosts) > 1:
+            self.pool = OllamaHostPool(
+                hosts,
+                health_interval=settings.get("health_interval", 30),
+                prefix_chars=settings.get("affinity_prefix_chars", 2000),
+            )
 
-        logger.info("Initialized OllamaClient with host=%s, model=%s", self.host, self.default_model)
+        logger.info(
+            "Initialized OllamaClient with host=%s, model=%s",
+            ", ".join(hosts) if self.pool else self.host,
+            self.default_model,
+        )
 
-    def _post(self, endpoint: str, payload: Dict[str, Any], timeout: int = 60) -> Dict[str, Any]:
-        url = f"{self.base}{endpoint}"
+    def _post(
+        self, endpoint: str, payload: Dict[str, Any], timeout: int = 60, host: Optional[str] = None
+    ) -> Dict[str, Any]:
+        url = f"{host}/api{endpoint}" if host else f"{self.base}{endpoint}"
         try:
             r = requests.post(url, json=payload, timeout=timeout, stream=True)
             r.raise_for_status()
@@ -60,10 +102,96 @@ class OllamaClient(BaseModelClient):
                 text = r.text
                 return {"text": text}
         except requests.exceptions.Timeout as e:
-            raise ModelTimeoutError(f"Ollama request timeout: {e}")
+            raise ModelTimeoutError(f"Ollama request timeout: {e}") from e
         except requests.exceptions.RequestException as e:
             logger.error("Ollama API request failed: %s", e)
-            raise ModelAPIError(f"Ollama API request failed: {e}")
+            raise ModelAPIError(f"Ollama API request failed: {e}", status_code=error_status_code(e)) from e
+
+    def _safe_call(self, call, model: str, messages: List[Dict[str, Any]], max_tokens: Optional[int]) -> ModelResponse:
+        """Run one request under the provider's retry, breaker, rate and concurrency limits."""
+        return safe_model_call(
+            call,
+            policy=get_retry_policy("ollama"),
+            breaker=get_circuit_breaker("ollama"),
+            # A host pool caps concurrency per host instead.
+            governor=None if self.pool else get_governor("ollama", model),
+            rate_limiter=get_rate_limiter("ollama", model),
+            rate_tokens=request_tokens(messages, max_tokens),
+        )
+
+    def _options(self, temperature: float, max_tokens: Optional[int], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Map call parameters to Ollama options (max_tokens is num_predict)."""
+        options: Dict[str, Any] = {"temperature": temperature}
+        if self.num_ctx:
+            options["num_ctx"] = self.num_ctx
+        if max_tokens is not None:
+            options["num_predict"] = max_tokens
+        for key in OPTION_KWARGS:
+            if kwargs.get(key) is not None:
+                options[key] = kwargs[key]
+        options.update(kwargs.get("options", {}))
+        return options
+
+    def _chat_payload(self, model: str, messages: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": model, "messages": messages, "stream": False, "options": options}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def preload(self, model: Optional[str] = None, host: Optional[str] = None) -> bool:
+        """
+        Load the model into memory without generating anything.
+
+        Args:
+            model: Model to load (default model if omitted)
+            host: Host to load it on (the client's host if omitted)
+
+        Returns:
+            Whether the model was loaded; failures are only logged.
+        """
+        model = model or self.default_model
+        if not model:
+            return False
+        options = {"num_ctx": self.num_ctx} if self.num_ctx else {}
+        try:
+            self._post("/chat", self._chat_payload(model, [], options), timeout=300, host=host)
+        except (ModelAPIError, ModelTimeoutError) as e:
+            logger.warning("Ollama preload of %s on %s failed: %s", model, host or self.host, e)
+            return False
+        logger.info("Ollama model %s preloaded on %s (keep_alive=%s)", model, host or self.host, self.keep_alive)
+        return True
+
+    def preload_async(self, model: Optional[str] = None) -> List[threading.Thread]:
+        """Preload the model in background threads, one per host."""
+        hosts = [h.url for h in self.pool.hosts] if self.pool else [None]
+        threads = []
+        for host in hosts:
+            thread = threading.Thread(target=self.preload, args=(model, host), name="ollama-preload", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _chat(self, model: str, messages: List[Dict[str, Any]], options: Dict[str, Any]) -> ModelResponse:
+        """Send one /api/chat request and assemble content and usage."""
+        payload = self._chat_payload(model, messages, options)
+
+        def _call():
+            if self.pool is None:
+                resp = self._post("/chat", payload)
+            else:
+                with self.pool.slot(model, messages) as host:
+                    resp = self._post("/chat", payload, host=host.url)
+            logger.debug("Ollama raw response: %s", resp)
+
+            if isinstance(resp, dict) and "_ndjson_parsed" in resp:
+                chunks = resp["_ndjson_parsed"]
+            else:
+                chunks = [resp]
+            content = "".join(_chunk_content(chunk) for chunk in chunks)
+            final = chunks[-1] if chunks and isinstance(chunks[-1], dict) else {}
+            return ModelResponse(content=content, model=model, usage=_usage(final))
+
+        return self._safe_call(_call, model, messages, options.get("num_predict"))
 
     def chat_completion(
         self,
@@ -78,78 +206,9 @@ class OllamaClient(BaseModelClient):
         if not model:
             raise ValueError("No Ollama model specified. Set OLLAMA_MODEL or pass model parameter.")
 
-        # Convert messages to a prompt if Ollama endpoint expects prompt text
-        # Prefer 'messages' if API accepts chat format; we'll attempt to send messages as-is,
-        # and fall back to joining into a single prompt.
-        payload = {"model": model}
-
-        # Many Ollama deployments use 'prompt' string; build prompt from messages
-        prompt_parts = []
-        for m in messages:
-            role = m.get("role", "user")
-            content = m.get("content", "")
-            prompt_parts.append(f"{role}: {content}")
-        payload["prompt"] = "\n".join(prompt_parts)
-        payload["options"] = {"temperature": temperature}
-        if max_tokens is not None:
-            payload["options"]["max_tokens"] = max_tokens
-        payload["options"].update(kwargs.get("options", {}))
-
         logger.debug("Calling Ollama chat_completion model=%s", model)
-
-        def _call():
-            resp = self._post("/generate", payload)
-            logger.debug("Ollama raw response: %s", resp)
-
-            # Assemble content from possible fields and from NDJSON parsed chunks
-            content_parts = []
-
-            def _extract_from_obj(obj):
-                parts = []
-                if not isinstance(obj, dict):
-                    return parts
-                # Common keys used by different Ollama responses
-                if "response" in obj and obj.get("response"):
-                    parts.append(obj.get("response"))
-                if "text" in obj and obj.get("text"):
-                    parts.append(obj.get("text"))
-                if "content" in obj and obj.get("content"):
-                    parts.append(obj.get("content"))
-                if "generated" in obj:
-                    gen = obj.get("generated")
-                    if isinstance(gen, list):
-                        for g in gen:
-                            if isinstance(g, dict):
-                                parts.extend(_extract_from_obj(g))
-                            else:
-                                parts.append(str(g))
-                    elif gen:
-                        parts.append(str(gen))
-                if "choices" in obj:
-                    choices = obj.get("choices") or []
-                    for c in choices:
-                        if isinstance(c, dict):
-                            if c.get("text"):
-                                parts.append(c.get("text"))
-                            elif isinstance(c.get("message"), dict) and c.get("message").get("content"):
-                                parts.append(c.get("message").get("content"))
-                return parts
-
-            if isinstance(resp, dict) and "_ndjson_parsed" in resp:
-                for chunk in resp.get("_ndjson_parsed", []):
-                    content_parts.extend(_extract_from_obj(chunk))
-            else:
-                content_parts.extend(_extract_from_obj(resp))
-
-            # If caller provided raw text under 'text', include it
-            if isinstance(resp, dict) and resp.get("text"):
-                content_parts.append(resp.get("text"))
-
-            content = "".join([str(p) for p in content_parts if p])
-
-            return ModelResponse(content=content, model=model, usage=None)
-
-        return safe_model_call(_call, max_retries=2, retry_delay=1.0)
+        chat_messages = [{"role": m.get("role", "user"), "content": m.get("content", "")} for m in messages]
+        return self._chat(model, chat_messages, self._options(temperature, max_tokens, kwargs))
 
     def multimodal_completion(
         self,
@@ -159,38 +218,59 @@ class OllamaClient(BaseModelClient):
         max_tokens: Optional[int] = None,
         **kwargs,
     ) -> ModelResponse:
-        # For multimodal, embed image references into prompt or use API-supported input field
         model = model or self.default_model
         if not model:
             raise ValueError("No Ollama model specified. Set OLLAMA_MODEL or pass model parameter.")
 
-        # Build prompt similar to chat_completion
-        prompt_parts = []
+        # Ollama takes images as base64 strings beside the text; other image
+        # references are kept in the text.
+        chat_messages = []
         for m in messages:
-            role = m.get("role", "user")
             content = m.get("content", "")
-            # content may be a list with image entries
+            message: Dict[str, Any] = {"role": m.get("role", "user")}
             if isinstance(content, list):
+                text_parts, images = [], []
                 for item in content:
-                    if isinstance(item, dict) and item.get("type") in ("image_url", "input_image"):
-                        url = item.get("image_url") or item.get("image_url", {}).get("url")
-                        prompt_parts.append(f"[IMAGE:{url}]")
+                    if not isinstance(item, dict):
+                        text_parts.append(str(item))
+                    elif item.get("type") in ("image_url", "input_image"):
+                        image = item.get("image_url")
+                        url = image.get("url") if isinstance(image, dict) else image
+                        if isinstance(url, str) and url.startswith("data:") and "," in url:
+                            images.append(url.split(",", 1)[1])
+                        else:
+                            text_parts.append(f"[IMAGE:{url}]")
                     else:
-                        prompt_parts.append(str(item))
+                        text_parts.append(str(item.get("text", "")))
+                message["content"] = "\n".join(p for p in text_parts if p)
+                if images:
+                    message["images"] = images
             else:
-                prompt_parts.append(str(content))
+                message["content"] = str(content)
+            chat_messages.append(message)
 
-        payload = {"model": model, "prompt": "\n".join(prompt_parts), "options": {"temperature": temperature}}
-        if max_tokens is not None:
-            payload["options"]["max_tokens"] = max_tokens
-        payload["options"].update(kwargs.get("options", {}))
+        return self._chat(model, chat_messages, self._options(temperature, max_tokens, kwargs))
 
-        def _call():
-            resp = self._post("/generate", payload)
-            # parse similar to chat_completion
-            content = ""
-            if isinstance(resp, dict):
-                content = resp.get("content") or resp.get("generated") or ""
-            return ModelResponse(content=str(content), model=model, usage=None)
-
-        return safe_model_call(_call, max_retries=2, retry_delay=1.0)
+
+def _chunk_content(obj: Any) -> str:
+    """Text of one /api/chat response object (or streamed chunk)."""
+    if not isinstance(obj, dict):
+        return ""
+    message = obj.get("message")
+    if isinstance(message, dict) and message.get("content"):
+        return str(message["content"])
+    # /api/generate-style bodies from proxies in front of Ollama
+    return str(obj.get("response") or obj.get("text") or "")
+
+
+def _usage(final: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """Token usage from the final response object's eval counters."""
+    if "prompt_eval_count" not in final and "eval_count" not in final:
+        return None
+    prompt_tokens = int(final.get("prompt_eval_count") or 0)
+    completion_tokens = int(final.get("eval_count") or 0)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
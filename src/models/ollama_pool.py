@@ -0,0 +1,191 @@
+"""Pool of Ollama hosts with least-loaded, prefix-sticky routing.
+
+`OllamaHostPool` spreads calls over several Ollama servers (OLLAMA_HOSTS
+or `global.ollama.hosts`):
+
+- health: a host is checked with `GET /api/tags` before first use and
+  every `health_interval` seconds; connection errors and timeouts mark it
+  down until the next successful check. The tags also tell which models a
+  host has, and hosts known to lack the requested model are skipped;
+- per-host caps: every host has its own adaptive concurrency governor
+  (`global.concurrency.ollama`, overridable per host under `hosts`);
+- sticky routing: prompts that share a prefix (the same PRD preamble)
+  hash to the same preferred host (rendezvous hashing), so Ollama's
+  prefix cache on that host is reused;
+- least-loaded fallback: when the preferred host is full or down, the
+  host with the lowest load x latency score is used.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+import requests
+
+from .concurrency import ConcurrencyGovernor, get_governor
+from ..utils.exceptions import ModelAPIError, ModelTimeoutError
+from ..utils.retry_policy import error_status_code
+
+logger = logging.getLogger(__name__)
+
+
+def prefix_key(messages: List[Dict[str, Any]], prefix_chars: int = 2000) -> str:
+    """Affinity key of a prompt: hash of its first `prefix_chars` characters."""
+    text = "".join(f"{m.get('role', 'user')}:{m.get('content', '')}\n" for m in messages)
+    return hashlib.sha1(text[:prefix_chars].encode("utf-8")).hexdigest()
+
+
+def _model_tag(model: str) -> str:
+    return model if ":" in model else f"{model}:latest"
+
+
+def _is_host_down_error(exc: BaseException) -> bool:
+    """Connection failures and timeouts (not HTTP errors from a live server)."""
+    if isinstance(exc, (ModelTimeoutError, TimeoutError)):
+        return True
+    return isinstance(exc, ModelAPIError) and error_status_code(exc) is None
+
+
+class OllamaHost:
+    """Health, load and latency of one Ollama server."""
+
+    def __init__(self, url: str, governor: ConcurrencyGovernor, alpha: float = 0.2):
+        self.url = url.rstrip("/")
+        self.governor = governor
+        self.alpha = alpha
+        self.healthy = True
+        self.checked_at: Optional[float] = None
+        self.models: Optional[Set[str]] = None
+        self.ewma: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+
+    def has_capacity(self) -> bool:
+        return self.governor.in_flight < self.governor.limit
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or _model_tag(model) in self.models
+
+    def load_score(self, default_latency: float) -> float:
+        """Expected wait: load relative to the window, weighted by latency."""
+        return (self.governor.in_flight + 1) / self.governor.limit * (self.ewma or default_latency)
+
+    def record(self, latency: float) -> None:
+        self.calls += 1
+        self.ewma = latency if self.ewma is None else self.alpha * latency + (1 - self.alpha) * self.ewma
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "limit": self.governor.limit,
+            "in_flight": self.governor.in_flight,
+            "ewma_seconds": self.ewma,
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+class OllamaHostPool:
+    """Routes Ollama calls across several hosts."""
+
+    def __init__(
+        self,
+        hosts: List[str],
+        health_interval: float = 30.0,
+        health_timeout: float = 5.0,
+        prefix_chars: int = 2000,
+        http_get: Callable[..., Any] = requests.get,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize pool.
+
+        Args:
+            hosts: Host base URLs, e.g. http://box1:11434
+            health_interval: Seconds between /api/tags checks of a host
+            health_timeout: Timeout of one health check
+            prefix_chars: Prompt characters that decide the sticky host
+            http_get: GET function (for tests)
+            clock: Monotonic clock (for tests)
+        """
+        if not hosts:
+            raise ValueError("OllamaHostPool needs at least one host")
+        self.hosts = [OllamaHost(url, get_governor("ollama", host=url.rstrip("/"))) for url in hosts]
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.prefix_chars = prefix_chars
+        self._http_get = http_get
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def check(self, host: OllamaHost) -> bool:
+        """Refresh a host's health and model list from /api/tags."""
+        try:
+            r = self._http_get(f"{host.url}/api/tags", timeout=self.health_timeout)
+            r.raise_for_status()
+            models = {m.get("name") or m.get("model") for m in r.json().get("models", [])}
+        except Exception as e:
+            if host.healthy:
+                logger.warning(f"Ollama host {host.url} is down: {e}")
+            host.healthy = False
+            return False
+        if not host.healthy:
+            logger.info(f"Ollama host {host.url} is back")
+        host.healthy = True
+        host.models = {m for m in models if m}
+        return True
+
+    def _refresh(self) -> None:
+        now = self._clock()
+        with self._lock:
+            stale = [h for h in self.hosts if h.checked_at is None or now - h.checked_at >= self.health_interval]
+            for host in stale:
+                host.checked_at = now
+        for host in stale:
+            self.check(host)
+
+    def select(self, model: str, key: Optional[str] = None) -> OllamaHost:
+        """
+        Pick the host for one call.
+
+        The sticky host for `key` is used while it is healthy and has a free
+        slot; otherwise the least-loaded healthy host serving the model.
+        """
+        self._refresh()
+        candidates = [h for h in self.hosts if h.healthy and h.serves(model)]
+        if not candidates:
+            # Nothing known-good: try every host rather than failing outright.
+            candidates = [h for h in self.hosts if h.serves(model)] or list(self.hosts)
+
+        if key is not None:
+            sticky = max(candidates, key=lambda h: hashlib.sha1(f"{key}|{h.url}".encode("utf-8")).digest())
+            if sticky.has_capacity():
+                return sticky
+
+        latencies = [h.ewma for h in candidates if h.ewma is not None]
+        default_latency = sum(latencies) / len(latencies) if latencies else 1.0
+        return min(candidates, key=lambda h: (not h.has_capacity(), h.load_score(default_latency)))
+
+    @contextmanager
+    def slot(self, model: str, messages: Optional[List[Dict[str, Any]]] = None) -> Iterator[OllamaHost]:
+        """Hold a slot on the chosen host around one call attempt."""
+        key = prefix_key(messages, self.prefix_chars) if messages else None
+        host = self.select(model, key)
+        started = time.monotonic()
+        with host.governor.slot():
+            try:
+                yield host
+            except BaseException as e:
+                host.failures += 1
+                if _is_host_down_error(e):
+                    logger.warning(f"Ollama host {host.url} marked down: {e}")
+                    host.healthy = False
+                    host.checked_at = self._clock()
+                raise
+        host.record(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {host.url: host.snapshot() for host in self.hosts}
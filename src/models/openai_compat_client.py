@@ -0,0 +1,240 @@
+"""Client for local OpenAI-compatible inference servers (vLLM, llama.cpp server, ...).
+
+Settings come from constructor arguments, then env vars
+(OPENAI_COMPAT_BASE_URL, OPENAI_COMPAT_API_KEY, OPENAI_COMPAT_MODEL), then
+`global.openai_compat` in config/prompts.yaml. `pool_size` bounds the HTTP
+connection pool; such servers batch concurrent requests, so it should be
+at least `global.concurrency.openai_compat.max`.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from openai import APITimeoutError, OpenAI
+from pydantic import BaseModel
+
+from .base import BaseModelClient, ModelResponse
+from ..utils.config_loader import get_config
+from ..utils.error_handler import safe_model_call
+from ..utils.exceptions import ModelAPIError, ModelTimeoutError
+from ..utils.retry_policy import error_status_code, get_circuit_breaker, get_retry_policy
+from .concurrency import get_governor
+from .rate_limiter import get_rate_limiter, request_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def json_schema_format(schema: Any, name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build a `response_format` for structured output.
+
+    Args:
+        schema: JSON schema dict or pydantic model class
+        name: Schema name (defaults to the model class name)
+
+    Returns:
+        OpenAI-style json_schema response_format
+    """
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        name = name or schema.__name__
+        schema = schema.model_json_schema()
+    return {"type": "json_schema", "json_schema": {"name": name or "response", "schema": schema, "strict": True}}
+
+
+class OpenAICompatClient(BaseModelClient):
+    """Client for any server implementing the OpenAI chat completions API."""
+
+    provider = "openai_compat"
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        default_model: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Initialize OpenAI-compatible client.
+
+        Args:
+            base_url: API base URL, e.g. http://localhost:8000/v1
+            api_key: API key (local servers usually accept any value)
+            default_model: Default model; the server's first model if unset
+            headers: Extra HTTP headers sent with every request
+            pool_size: Maximum HTTP connections kept to the server
+            timeout: Request timeout in seconds
+        """
+        settings = get_config("openai_compat", {}) or {}
+        self.base_url = base_url or os.getenv("OPENAI_COMPAT_BASE_URL") or settings.get("base_url")
+        if not self.base_url:
+            raise ValueError(
+                "OPENAI_COMPAT_BASE_URL not found. Set it in environment, global.openai_compat.base_url "
+                "or pass to constructor."
+            )
+        self.default_model = default_model or os.getenv("OPENAI_COMPAT_MODEL") or settings.get("model")
+        pool_size = int(pool_size or settings.get("pool_size") or 32)
+        timeout = float(timeout or settings.get("timeout") or get_config("default_timeout", 60))
+
+        # Retries are handled by safe_model_call's policy and circuit breaker.
+        self.client = OpenAI(
+            base_url=self.base_url,
+            api_key=api_key or os.getenv("OPENAI_COMPAT_API_KEY") or settings.get("api_key") or "EMPTY",
+            default_headers={**(settings.get("headers") or {}), **(headers or {})},
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                timeout=timeout,
+            ),
+            timeout=timeout,
+            max_retries=0,
+        )
+        self._model_lock = threading.Lock()
+
+        logger.info(
+            "Initialized OpenAICompatClient with base_url=%s, model=%s, pool_size=%s",
+            self.base_url,
+            self.default_model,
+            pool_size,
+        )
+
+    def _resolve_model(self, model: Optional[str]) -> str:
+        """Explicit model, else the default, else the first model the server lists."""
+        if model or self.default_model:
+            return model or self.default_model
+        with self._model_lock:
+            if not self.default_model:
+                try:
+                    models = list(self.client.models.list())
+                except Exception as e:
+                    raise ModelAPIError(f"Could not list models: {e}", status_code=error_status_code(e)) from e
+                if not models:
+                    raise ValueError("No model specified and the server lists none. Set OPENAI_COMPAT_MODEL.")
+                self.default_model = models[0].id
+                logger.info(f"Using server model {self.default_model}")
+        return self.default_model
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        json_schema: Any = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+        **kwargs
+    ) -> ModelResponse:
+        """
+        Generate chat completion.
+
+        Args:
+            messages: List of chat messages with 'role' and 'content'
+            model: Model name (uses default if not provided)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            stream: Stream the response; the full text is still returned
+            json_schema: JSON schema dict or pydantic model for structured output
+            on_delta: Called with each streamed text fragment
+            **kwargs: Additional API parameters (e.g. response_format)
+
+        Returns:
+            ModelResponse with generated content
+        """
+        return self._complete(messages, model, temperature, max_tokens, stream, json_schema, on_delta, kwargs)
+
+    def multimodal_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        """Generate multimodal completion; messages use OpenAI image_url content parts."""
+        stream = kwargs.pop("stream", False)
+        json_schema = kwargs.pop("json_schema", None)
+        on_delta = kwargs.pop("on_delta", None)
+        return self._complete(messages, model, temperature, max_tokens, stream, json_schema, on_delta, kwargs)
+
+    def _complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: Optional[int],
+        stream: bool,
+        json_schema: Any,
+        on_delta: Optional[Callable[[str], None]],
+        kwargs: Dict[str, Any],
+    ) -> ModelResponse:
+        model = self._resolve_model(model)
+        params = {"model": model, "messages": messages, "temperature": temperature}
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+        if json_schema is not None:
+            params["response_format"] = json_schema_format(json_schema)
+        if stream or on_delta is not None:
+            params["stream"] = True
+            params["stream_options"] = {"include_usage": True}
+        params.update(kwargs)
+
+        logger.debug(f"Calling OpenAI-compatible chat completion with model={model}")
+
+        def _call():
+            try:
+                response = self.client.chat.completions.create(**params)
+                if params.get("stream"):
+                    return self._collect_stream(response, model, on_delta)
+            except (TimeoutError, APITimeoutError, httpx.TimeoutException) as e:
+                raise ModelTimeoutError(f"Request timeout: {e}") from e
+            except ModelAPIError:
+                raise
+            except Exception as e:
+                raise ModelAPIError(f"Model call failed: {e}", status_code=error_status_code(e)) from e
+
+            if not response.choices:
+                raise ModelAPIError("No response choices returned from model")
+            return ModelResponse(
+                content=response.choices[0].message.content or "",
+                model=model,
+                usage=_usage(response.usage),
+            )
+
+        return safe_model_call(
+            _call,
+            policy=get_retry_policy(self.provider),
+            breaker=get_circuit_breaker(self.provider),
+            governor=get_governor(self.provider, model),
+            rate_limiter=get_rate_limiter(self.provider, model),
+            rate_tokens=request_tokens(messages, max_tokens),
+        )
+
+    @staticmethod
+    def _collect_stream(chunks, model: str, on_delta: Optional[Callable[[str], None]]) -> ModelResponse:
+        """Join streamed deltas; usage arrives on the final chunk (include_usage)."""
+        parts: List[str] = []
+        usage = None
+        for chunk in chunks:
+            if getattr(chunk, "usage", None):
+                usage = _usage(chunk.usage)
+            for choice in chunk.choices or []:
+                text = getattr(choice.delta, "content", None)
+                if text:
+                    parts.append(text)
+                    if on_delta is not None:
+                        on_delta(text)
+        return ModelResponse(content="".join(parts), model=model, usage=usage)
+
+
+def _usage(usage: Any) -> Optional[Dict[str, int]]:
+    if not usage:
+        return None
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
@@ -0,0 +1,189 @@
+"""Client-side request and token rate limits per provider and model.
+
+Each (provider, model) pair gets a `RateLimiter` with two token buckets:
+requests per minute (RPM) and tokens per minute (TPM). Callers reserve
+one request plus the estimated prompt + max_tokens before sending and
+wait for capacity instead of bursting into 429s. Once the provider reports
+actual usage, `settle()` corrects the TPM bucket by the difference.
+
+Limits come from `global.rate_limits` in config/prompts.yaml:
+
+    rate_limits:
+      default: {rpm: null, tpm: null}
+      doubao: {rpm: 600, tpm: 200000, models: {ep-xxxxxxxx: {tpm: 50000}}}
+
+or from env vars, which take precedence: `QA_AGENT_<PROVIDER>_RPM` and
+`QA_AGENT_<PROVIDER>_TPM` (e.g. QA_AGENT_DOUBAO_TPM). An unset limit means
+unlimited.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..utils.config_loader import get_config
+from ..utils.token_estimator import estimate_messages_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` per second."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize bucket (full).
+
+        Args:
+            rate: Refill per second
+            capacity: Burst size
+            clock: Monotonic clock (for tests)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._level = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` now, going into debt if needed.
+
+        Requests larger than the bucket are clamped to its capacity so they
+        can still be served. Reservations are first come, first served:
+        later callers wait behind the debt of earlier ones.
+
+        Returns:
+            Seconds the caller must wait before using the reservation
+        """
+        with self._lock:
+            now = self._clock()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+            self._updated = now
+            self._level -= min(amount, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Return (or, if negative, additionally take) tokens."""
+        with self._lock:
+            self._level = min(self.capacity, self._level + amount)
+
+
+class RateLimiter:
+    """RPM and TPM limits for one provider/model."""
+
+    def __init__(
+        self,
+        name: str,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize limiter.
+
+        Args:
+            name: "provider/model" (for logs)
+            rpm: Requests per minute (None = unlimited)
+            tpm: Tokens per minute (None = unlimited)
+            clock: Monotonic clock (for tests)
+            sleep: Blocking sleep (for tests)
+        """
+        self.name = name
+        self.requests = TokenBucket(rpm / 60.0, rpm, clock) if rpm else None
+        self.tokens = TokenBucket(tpm / 60.0, tpm, clock) if tpm else None
+        self._sleep = sleep
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def _reserve(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            self.waited_seconds += wait
+            logger.debug(f"Rate limit {self.name}: waiting {wait:.2f}s")
+        return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request of `tokens` estimated tokens may be sent."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        """acquire() for asyncio tasks; shares the same buckets."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, usage: Optional[Dict[str, Any]]) -> None:
+        """Correct the TPM bucket with the usage the provider reported."""
+        if self.tokens is None or not usage:
+            return
+        actual = usage.get("total_tokens") or (
+            (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+        )
+        if actual:
+            self.tokens.refund(estimated - int(actual))
+
+    def cancel(self, estimated: int) -> None:
+        """Return the TPM reservation of a request that failed without usage."""
+        if self.tokens is not None and estimated:
+            self.tokens.refund(estimated)
+
+
+def request_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int]) -> int:
+    """Tokens a request may use against TPM: estimated prompt plus max_tokens."""
+    return estimate_messages_tokens(messages) + (max_tokens or 0)
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _env_limit(provider: str, kind: str) -> Optional[float]:
+    value = os.getenv(f"QA_AGENT_{provider.upper()}_{kind}")
+    return float(value) if value else None
+
+
+def _limits_for(provider: str, model: str) -> Dict[str, Any]:
+    conf = get_config("rate_limits", {}) or {}
+    provider_conf = conf.get(provider, {}) or {}
+    limits: Dict[str, Any] = {}
+    for layer in (conf.get("default", {}), provider_conf, (provider_conf.get("models") or {}).get(model, {})):
+        limits.update({k: v for k, v in (layer or {}).items() if k in ("rpm", "tpm")})
+    for kind in ("rpm", "tpm"):
+        env = _env_limit(provider, kind.upper())
+        if env is not None:
+            limits[kind] = env
+    return limits
+
+
+def get_rate_limiter(provider: str, model: Optional[str] = None) -> RateLimiter:
+    """Process-wide limiter for a provider/model, created from config on first use."""
+    key = (provider, model or "")
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limits = _limits_for(provider, model or "")
+            limiter = RateLimiter(f"{provider}/{model}", rpm=limits.get("rpm"), tpm=limits.get("tpm"))
+            if limiter.enabled:
+                logger.info(f"Rate limit {limiter.name}: rpm={limits.get('rpm')}, tpm={limits.get('tpm')}")
+            _limiters[key] = limiter
+        return limiter
@@ -0,0 +1,223 @@
+"""Multi-backend routing with hedged requests.
+
+`RoutingModelClient` holds several configured backends (doubao, g2m,
+ollama) and for every call:
+
+1. orders the backends by health: backends whose circuit is open or that
+   failed repeatedly go last, then the fastest (EWMA latency) first;
+2. sends the request to the first backend;
+3. if it has not answered within that backend's p95 latency (or
+   `hedge_after_seconds` until enough samples exist), sends a hedged
+   duplicate to the next backend and returns whichever answers first;
+4. on an error, fails over to the next backend.
+
+A losing request that has not started yet is cancelled; one already in
+flight cannot be interrupted and its result is discarded. Hedged
+duplicates cost real tokens that a BudgetAccountant wrapping the router
+does not see, so `hedge_after_seconds` should stay well above typical
+latency.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .base import BaseModelClient, ModelResponse
+from ..utils.retry_policy import CircuitBreaker, get_circuit_breaker
+
+logger = logging.getLogger(__name__)
+
+MIN_LATENCY_SAMPLES = 10
+UNHEALTHY_AFTER_FAILURES = 3
+
+
+class BackendHealth:
+    """Latency and failure tracking for one backend."""
+
+    def __init__(self, name: str, window: int = 50, alpha: float = 0.2):
+        """
+        Initialize health tracker.
+
+        Args:
+            name: Backend (provider) name
+            window: Completions kept for the p95 estimate
+            alpha: EWMA smoothing factor for latency
+        """
+        self.name = name
+        self.alpha = alpha
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.ewma: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.hedge_wins = 0
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self.ewma = latency if self.ewma is None else self.alpha * latency + (1 - self.alpha) * self.ewma
+            self.successes += 1
+            self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    @property
+    def healthy(self) -> bool:
+        if self.consecutive_failures >= UNHEALTHY_AFTER_FAILURES:
+            return False
+        return get_circuit_breaker(self.name).state != CircuitBreaker.OPEN
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "ewma_seconds": self.ewma,
+            "p95_seconds": self.p95(),
+            "successes": self.successes,
+            "failures": self.failures,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class RoutingModelClient(BaseModelClient):
+    """Model client that routes and hedges calls across several backends."""
+
+    provider = "router"
+
+    def __init__(
+        self,
+        backends: Dict[str, BaseModelClient],
+        hedge: bool = True,
+        hedge_after_seconds: float = 30.0,
+        min_hedge_seconds: float = 1.0,
+        max_workers: int = 16,
+    ):
+        """
+        Initialize router.
+
+        Args:
+            backends: Clients by provider name, in preference order
+            hedge: Whether to send hedged duplicates to a second backend
+            hedge_after_seconds: Hedge delay until a backend has a p95 estimate
+            min_hedge_seconds: Lower bound of the hedge delay
+            max_workers: Threads for in-flight backend calls
+        """
+        if not backends:
+            raise ValueError("RoutingModelClient needs at least one backend")
+        self.backends = dict(backends)
+        self.hedge = hedge
+        self.hedge_after_seconds = hedge_after_seconds
+        self.min_hedge_seconds = min_hedge_seconds
+        self.health = {name: BackendHealth(name) for name in self.backends}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-router")
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        """
+        Generate chat completion on the best available backend.
+
+        `model` is passed to every backend; leave it None to use each
+        backend's default model.
+        """
+        return self._route("chat_completion", messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs)
+
+    def multimodal_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        return self._route(
+            "multimodal_completion", messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+
+    def ranked_backends(self) -> List[str]:
+        """Backend names, healthiest and fastest first."""
+        order = list(self.backends)
+
+        def _key(name: str) -> Tuple[int, float, int]:
+            health = self.health[name]
+            # Backends without samples are tried early so they get measured.
+            return (0 if health.healthy else 1, health.ewma or 0.0, order.index(name))
+
+        return sorted(order, key=_key)
+
+    def hedge_delay(self, name: str) -> float:
+        p95 = self.health[name].p95()
+        return max(self.min_hedge_seconds, p95 if p95 is not None else self.hedge_after_seconds)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: health.snapshot() for name, health in self.health.items()}
+
+    def _call_backend(self, name: str, method: str, messages, kwargs) -> ModelResponse:
+        started = time.monotonic()
+        try:
+            response = getattr(self.backends[name], method)(messages, **kwargs)
+        except Exception:
+            self.health[name].record_failure()
+            raise
+        self.health[name].record_success(time.monotonic() - started)
+        return response
+
+    def _route(self, method: str, messages, **kwargs) -> ModelResponse:
+        queue = self.ranked_backends()
+        primary = queue[0]
+        in_flight: Dict[Future, str] = {}
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def _launch() -> None:
+            name = queue.pop(0)
+            in_flight[self._pool.submit(self._call_backend, name, method, messages, kwargs)] = name
+
+        _launch()
+        while in_flight:
+            timeout = None
+            if self.hedge and not hedged and queue and len(in_flight) == 1:
+                timeout = self.hedge_delay(next(iter(in_flight.values())))
+            done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slow primary: hedge to the next backend, keep the primary running.
+                slow = next(iter(in_flight.values()))
+                logger.info(f"{slow} exceeded {timeout:.1f}s; sending hedged request to {queue[0]}")
+                hedged = True
+                _launch()
+                continue
+            for future in done:
+                name = in_flight.pop(future)
+                error = future.exception()
+                if error is None:
+                    if hedged and name != primary:
+                        self.health[name].hedge_wins += 1
+                    for loser in in_flight:
+                        loser.cancel()
+                    return future.result()
+                logger.warning(f"Backend {name} failed: {error}")
+                last_error = error
+            if not in_flight and queue:
+                # Fail over to the next backend.
+                _launch()
+
+        # Every backend failed; surface the last error as-is.
+        raise last_error
@@ -0,0 +1,108 @@
+"""Request coalescing (single-flight) for identical concurrent model calls.
+
+`SingleFlightModelClient` wraps any client. While a request is in flight,
+identical requests (same method, model, messages and parameters) wait for
+its result instead of being sent again; errors are shared the same way.
+Nothing is kept once the first call returns, so this covers only the
+window before a response lands and does not replace caching.
+
+Wrap it outside a BudgetedModelClient so coalesced callers are not
+charged against the budget.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from .base import BaseModelClient, ModelResponse
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(method: str, messages: List[Dict[str, Any]], **params: Any) -> str:
+    """Stable hash of everything that determines a request's response."""
+    payload = json.dumps(
+        {"method": method, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlightModelClient(BaseModelClient):
+    """Model client wrapper that coalesces identical in-flight requests."""
+
+    def __init__(self, client: BaseModelClient):
+        """
+        Wrap a client.
+
+        Args:
+            client: Underlying model client
+        """
+        self.client = client
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        return self._call(
+            "chat_completion", messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+
+    def multimodal_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> ModelResponse:
+        return self._call(
+            "multimodal_completion", messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+
+    def _call(self, method: str, messages, **kwargs) -> ModelResponse:
+        key = request_key(method, messages, **kwargs)
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            logger.debug(f"Coalesced identical {method} request {key[:8]}")
+            return future.result()
+
+        try:
+            response = getattr(self.client, method)(messages, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced}
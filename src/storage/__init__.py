@@ -0,0 +1,19 @@
+"""Persistence backends for generated test case artifacts."""
+
+from .es_indexer import BulkResult, ESBulkIndexer
+from .es_sync import ESSyncEngine, SyncReport
+from .segments import SegmentStore
+from .sqlite_store import SQLiteCaseStore
+from .text_pack import PackReader, TextPackStore, read_text_uri
+
+__all__ = [
+    "BulkResult",
+    "ESBulkIndexer",
+    "ESSyncEngine",
+    "PackReader",
+    "SQLiteCaseStore",
+    "SegmentStore",
+    "SyncReport",
+    "TextPackStore",
+    "read_text_uri",
+]
@@ -0,0 +1,282 @@
+"""Bulk indexing of TestCaseIndexDocument into Elasticsearch.
+
+Documents are streamed in chunks to the `_bulk` REST endpoint with
+`case_id` as `_id`, using a bounded pool of worker threads. Items rejected
+with a retryable status (429/5xx) are re-sent with exponential backoff, and
+`bulk_load_settings()` relaxes `refresh_interval`/replicas for large loads.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..utils.exceptions import IndexingError
+from ..utils.file_utils import dumps_json_line, iter_jsonl
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+@dataclass
+class BulkResult:
+    """Outcome of a bulk run."""
+
+    indexed: int = 0
+    deleted: int = 0
+    not_found: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def merge(self, other: "BulkResult") -> None:
+        self.indexed += other.indexed
+        self.deleted += other.deleted
+        self.not_found += other.not_found
+        self.failed += other.failed
+        self.errors.extend(other.errors)
+
+
+class ESBulkIndexer:
+    """Stream documents into an Elasticsearch index via the bulk API."""
+
+    def __init__(
+        self,
+        es_host: Optional[str] = None,
+        es_index: Optional[str] = None,
+        es_api_key: Optional[str] = None,
+        es_username: Optional[str] = None,
+        es_password: Optional[str] = None,
+        chunk_size: int = 500,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        timeout: int = 60,
+    ):
+        """
+        Initialize bulk indexer.
+
+        Args:
+            es_host: Elasticsearch URL (defaults to ES_HOST env var)
+            es_index: Target index (defaults to ES_INDEX env var)
+            es_api_key: API key (defaults to ES_API_KEY env var)
+            es_username: Basic auth user (defaults to ES_USERNAME env var)
+            es_password: Basic auth password (defaults to ES_PASSWORD env var)
+            chunk_size: Documents per bulk request
+            max_workers: Concurrent bulk requests
+            max_retries: Retries for failed items / requests
+            backoff: Base delay (seconds), doubled on every retry
+            timeout: HTTP timeout per request (seconds)
+        """
+        self.es_host = (es_host or os.getenv("ES_HOST") or "").rstrip("/")
+        self.es_index = es_index or os.getenv("ES_INDEX")
+        if not self.es_host or not self.es_index:
+            raise ValueError("ES_HOST and ES_INDEX must be set to index documents.")
+
+        self.chunk_size = max(1, chunk_size)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        api_key = es_api_key or os.getenv("ES_API_KEY")
+        username = es_username or os.getenv("ES_USERNAME")
+        password = es_password or os.getenv("ES_PASSWORD")
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"ApiKey {api_key}"
+        elif username and password:
+            self.session.auth = (username, password)
+
+    # ---------------------- Public API ----------------------
+    def index_documents(self, docs: Iterable[Any]) -> BulkResult:
+        """Index documents (entities or dicts) keyed by `case_id`."""
+        actions = (("index", _doc_to_dict(doc)) for doc in docs)
+        return self._run(actions)
+
+    def delete_documents(self, case_ids: Iterable[str]) -> BulkResult:
+        """Delete documents by `case_id`; missing ids count as `not_found`, not as failures."""
+        actions = (("delete", {"case_id": case_id}) for case_id in case_ids)
+        return self._run(actions)
+
+    def index_bundle(self, bundle: Any) -> BulkResult:
+        """Index `bundle.index_docs` of a MaterializedBundle."""
+        return self.index_documents(bundle.index_docs)
+
+    def index_jsonl(self, file_path: str) -> BulkResult:
+        """Stream an es_docs JSONL file into the index without loading it fully."""
+        return self.index_documents(iter_jsonl(file_path))
+
+    def iter_ids(self, page_size: int = 1000) -> Iterator[str]:
+        """Stream every `_id` in the index in ascending order via `search_after`."""
+        after: Optional[List[Any]] = None
+        while True:
+            body: Dict[str, Any] = {
+                "size": page_size,
+                "_source": False,
+                "sort": [{"case_id": "asc"}],
+                "query": {"match_all": {}},
+            }
+            if after is not None:
+                body["search_after"] = after
+            try:
+                res = self.session.post(f"{self.es_host}/{self.es_index}/_search", json=body, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                raise IndexingError(f"Listing ids failed: {e}")
+            if res.status_code >= 300:
+                raise IndexingError(f"Listing ids returned HTTP {res.status_code}: {res.text[:200]}", res.status_code)
+            hits = res.json().get("hits", {}).get("hits", [])
+            for hit in hits:
+                yield hit["_id"]
+            if len(hits) < page_size:
+                return
+            after = hits[-1]["sort"]
+
+    @contextmanager
+    def bulk_load_settings(self, refresh_interval: str = "-1", replicas: int = 0):
+        """Temporarily disable refresh and replicas, restoring them afterwards."""
+        url = f"{self.es_host}/{self.es_index}/_settings"
+        original: Dict[str, Any] = {}
+        try:
+            res = self.session.get(url, params={"flat_settings": "true"}, timeout=self.timeout)
+            res.raise_for_status()
+            settings = next(iter(res.json().values()), {}).get("settings", {})
+            original = {
+                "refresh_interval": settings.get("index.refresh_interval", "1s"),
+                "number_of_replicas": settings.get("index.number_of_replicas", "1"),
+            }
+            self._put_settings({"refresh_interval": refresh_interval, "number_of_replicas": replicas})
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Could not apply bulk-load settings, continuing with current ones: {e}")
+            original = {}
+
+        try:
+            yield
+        finally:
+            if original:
+                try:
+                    self._put_settings(original)
+                    self.session.post(f"{self.es_host}/{self.es_index}/_refresh", timeout=self.timeout)
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Failed to restore index settings {original}: {e}")
+
+    # ---------------------- Internals ----------------------
+    def _put_settings(self, index_settings: Dict[str, Any]) -> None:
+        res = self.session.put(
+            f"{self.es_host}/{self.es_index}/_settings",
+            json={"index": index_settings},
+            timeout=self.timeout,
+        )
+        res.raise_for_status()
+
+    def _run(self, actions: Iterator[Tuple[str, Dict[str, Any]]]) -> BulkResult:
+        """Send action chunks with at most `max_workers` requests in flight."""
+        started = time.perf_counter()
+        result = BulkResult()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = set()
+            for chunk in _chunks(actions, self.chunk_size):
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        result.merge(fut.result())
+                pending.add(pool.submit(self._send_chunk, chunk))
+            for fut in pending:
+                result.merge(fut.result())
+        result.elapsed = time.perf_counter() - started
+        logger.info(
+            f"Bulk finished: indexed={result.indexed} deleted={result.deleted} "
+            f"failed={result.failed} in {result.elapsed:.2f}s"
+        )
+        return result
+
+    def _send_chunk(self, chunk: List[Tuple[str, Dict[str, Any]]]) -> BulkResult:
+        """Send one chunk, retrying retryable items with exponential backoff."""
+        result = BulkResult()
+        remaining = chunk
+        for attempt in range(self.max_retries + 1):
+            try:
+                items = self._post_bulk(remaining)
+            except IndexingError as e:
+                if attempt >= self.max_retries or (e.status_code and e.status_code not in RETRYABLE_STATUS):
+                    result.failed += len(remaining)
+                    result.errors.append({"error": str(e), "count": len(remaining)})
+                    return result
+                self._sleep(attempt)
+                continue
+
+            retry: List[Tuple[str, Dict[str, Any]]] = []
+            for (op, doc), item in zip(remaining, items):
+                outcome = item.get(op, {})
+                status = outcome.get("status", 500)
+                if op == "delete" and status == 404:
+                    result.not_found += 1
+                elif status < 300:
+                    if op == "delete":
+                        result.deleted += 1
+                    else:
+                        result.indexed += 1
+                elif status in RETRYABLE_STATUS and attempt < self.max_retries:
+                    retry.append((op, doc))
+                else:
+                    result.failed += 1
+                    result.errors.append({"case_id": doc.get("case_id"), "status": status, "error": outcome.get("error")})
+            if not retry:
+                return result
+            logger.warning(f"Retrying {len(retry)} bulk items (attempt {attempt + 1}/{self.max_retries})")
+            remaining = retry
+            self._sleep(attempt)
+        return result
+
+    def _post_bulk(self, chunk: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        lines = []
+        for op, doc in chunk:
+            lines.append(dumps_json_line({op: {"_index": self.es_index, "_id": doc["case_id"]}}))
+            if op == "index":
+                lines.append(dumps_json_line(doc))
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        try:
+            res = self.session.post(
+                f"{self.es_host}/_bulk",
+                data=payload,
+                headers={"Content-Type": "application/x-ndjson"},
+                timeout=self.timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            raise IndexingError(f"Bulk request failed: {e}")
+        if res.status_code >= 300:
+            raise IndexingError(f"Bulk request returned HTTP {res.status_code}: {res.text[:200]}", res.status_code)
+        return res.json().get("items", [])
+
+    def _sleep(self, attempt: int) -> None:
+        time.sleep(self.backoff * (2 ** attempt))
+
+
+def _doc_to_dict(doc: Any) -> Dict[str, Any]:
+    if hasattr(doc, "model_dump"):
+        return doc.model_dump()
+    return dict(doc)
+
+
+def _chunks(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
@@ -0,0 +1,300 @@
+"""Incremental RDB -> Elasticsearch synchronisation.
+
+Implements the timed sync of db+requirement.md §3.2 on top of
+`SQLiteCaseStore` and `ESBulkIndexer`:
+
+- incremental runs pick up cases whose row, scene mapping or scene changed
+  since the persisted `update_time` watermark, rebuild only those
+  `TestCaseIndexDocument`s (with scene_ids/scene_names) and bulk-upsert them;
+- deletions recorded as tombstones are propagated as bulk deletes, and
+  cases touched by mapping deletes or scene renames are rebuilt; both are
+  stamped by the local clock, so they share a watermark of their own
+  rather than the data's `update_time` watermark;
+- a reconciliation pass walks the RDB and ES primary keys as two sorted
+  streams (sorted merge), so neither side is loaded into memory;
+- failed items are retried 3 times at a 5 s interval, and the watermark only
+  advances when a run finishes without failures. This is the only retry
+  layer: give the engine an indexer built with `max_retries=0`.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from ..entities.converters import to_test_case_index_document
+from ..entities.db_models import DATETIME_FMT, TestCase, TestCaseIndexDocument
+from ..utils.exceptions import FileOperationError, IndexingError
+from .es_indexer import BulkResult, ESBulkIndexer
+from .sqlite_store import SQLiteCaseStore
+from .text_pack import read_text_uri
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_KEY = "es_sync.watermark"
+LOCAL_WATERMARK_KEY = "es_sync.local_watermark"
+LAST_FULL_KEY = "es_sync.last_full"
+DEFAULT_INTERVAL_MINUTES = 30
+DEFAULT_FULL_EVERY_HOURS = 24
+
+
+@dataclass
+class SyncReport:
+    """Summary of one sync run, logged and returned to callers."""
+
+    mode: str
+    upserted: int = 0
+    deleted: int = 0
+    failed: int = 0
+    failed_ids: List[str] = field(default_factory=list)
+    missing_in_es: int = 0
+    extra_in_es: int = 0
+    watermark: Optional[str] = None
+    elapsed: float = 0.0
+
+
+class ESSyncEngine:
+    """Push relational changes into the ES test_case index."""
+
+    def __init__(
+        self,
+        store: SQLiteCaseStore,
+        indexer: ESBulkIndexer,
+        batch_size: int = 500,
+        retries: int = 3,
+        retry_interval: float = 5.0,
+        pack_root: Optional[str] = None,
+    ):
+        """
+        Initialize sync engine.
+
+        Args:
+            store: Relational source of truth
+            indexer: Bulk writer for the target index (built with max_retries=0)
+            batch_size: Cases rebuilt and sent per bulk batch
+            retries: Extra attempts for failed items
+            retry_interval: Seconds between those attempts
+            pack_root: Directory pack URIs of case texts resolve against
+        """
+        self.store = store
+        self.indexer = indexer
+        self.batch_size = max(1, batch_size)
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self.pack_root = pack_root
+
+    # ---------------------- Runs ----------------------
+    def run_incremental(self) -> SyncReport:
+        """Sync everything that changed since the stored watermark."""
+        started = time.perf_counter()
+        since = self.store.get_state(WATERMARK_KEY)
+        local_since = self.store.get_state(LOCAL_WATERMARK_KEY)
+        # Capture the new watermarks before reading so concurrent writes are picked up next run.
+        next_watermark = self.store.max_change_time() or since
+        next_local_watermark = self.store.max_local_time() or local_since
+        report = SyncReport(mode="incremental" if since else "initial")
+
+        changed = _merge_unique(self.store.changed_case_ids(since), self.store.touched_case_ids(local_since))
+        self._upsert_cases(changed, report)
+        self._delete_cases(self.store.deleted_case_ids(local_since), report)
+
+        if report.failed == 0:
+            self._advance(next_watermark, next_local_watermark)
+        report.watermark = self.store.get_state(WATERMARK_KEY)
+        return self._finish(report, started)
+
+    def run_full(self) -> SyncReport:
+        """Re-index every case, then remove ES documents absent from the RDB."""
+        started = time.perf_counter()
+        next_watermark = self.store.max_change_time()
+        next_local_watermark = self.store.max_local_time()
+        report = SyncReport(mode="full")
+
+        self._upsert_cases(self.store.iter_case_ids(), report)
+        extra = [case_id for status, case_id in self._diff_keys() if status == "extra"]
+        report.extra_in_es = len(extra)
+        self._delete_cases(extra, report)
+
+        now = datetime.now().strftime(DATETIME_FMT)
+        self.store.set_state(LAST_FULL_KEY, now)
+        if report.failed == 0:
+            self._advance(next_watermark, next_local_watermark)
+        report.watermark = self.store.get_state(WATERMARK_KEY)
+        return self._finish(report, started)
+
+    def reconcile(self) -> SyncReport:
+        """Compare primary keys on both sides and repair the differences."""
+        started = time.perf_counter()
+        report = SyncReport(mode="reconcile")
+        missing: List[str] = []
+        extra: List[str] = []
+        for status, case_id in self._diff_keys():
+            (missing if status == "missing" else extra).append(case_id)
+            if len(missing) >= self.batch_size:
+                report.missing_in_es += len(missing)
+                self._upsert_cases(missing, report)
+                missing = []
+        report.missing_in_es += len(missing)
+        report.extra_in_es = len(extra)
+        self._upsert_cases(missing, report)
+        self._delete_cases(extra, report)
+        report.watermark = self.store.get_state(WATERMARK_KEY)
+        return self._finish(report, started)
+
+    def run_forever(
+        self,
+        interval_minutes: float = DEFAULT_INTERVAL_MINUTES,
+        full_every_hours: float = DEFAULT_FULL_EVERY_HOURS,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        """Run incremental syncs on a fixed interval with a periodic full compare."""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                if self._full_sync_due(full_every_hours):
+                    self.run_full()
+                else:
+                    self.run_incremental()
+            except Exception as e:
+                logger.error(f"ES sync run failed: {e}")
+            stop_event.wait(interval_minutes * 60)
+
+    # ---------------------- Internals ----------------------
+    def _advance(self, watermark: Optional[str], local_watermark: Optional[str]) -> None:
+        if watermark:
+            self.store.set_state(WATERMARK_KEY, watermark)
+        if local_watermark:
+            self.store.set_state(LOCAL_WATERMARK_KEY, local_watermark)
+
+    def _full_sync_due(self, full_every_hours: float) -> bool:
+        last_full = self.store.get_state(LAST_FULL_KEY)
+        if not last_full:
+            # Never compared in full (e.g. a fresh database): do it now.
+            return True
+        elapsed = datetime.now() - datetime.strptime(last_full, DATETIME_FMT)
+        return elapsed.total_seconds() >= full_every_hours * 3600
+
+    def _diff_keys(self) -> Iterator[Tuple[str, str]]:
+        return merge_diff_sorted(self.store.iter_case_ids(), self.indexer.iter_ids())
+
+    def _upsert_cases(self, case_ids: Iterable[str], report: SyncReport) -> None:
+        for batch in _batched(case_ids, self.batch_size):
+            docs = self.build_documents(self.store.get_cases(batch))
+            result = self._with_retry(
+                lambda ids: self.indexer.index_documents(d for d in docs if d.case_id in ids),
+                [d.case_id for d in docs],
+                report,
+            )
+            report.upserted += result.indexed
+
+    def _delete_cases(self, case_ids: Iterable[str], report: SyncReport) -> None:
+        for batch in _batched(case_ids, self.batch_size):
+            result = self._with_retry(self.indexer.delete_documents, batch, report)
+            report.deleted += result.deleted
+
+    def _with_retry(self, send, case_ids: List[str], report: SyncReport) -> BulkResult:
+        """Send, then re-send only the failed ids up to `retries` times."""
+        total = BulkResult()
+        pending = list(case_ids)
+        for attempt in range(self.retries + 1):
+            try:
+                result = send(set(pending))
+            except IndexingError as e:
+                logger.warning(f"Sync batch failed (attempt {attempt + 1}): {e}")
+                result = BulkResult(failed=len(pending), errors=[{"case_id": cid} for cid in pending])
+            total.indexed += result.indexed
+            total.deleted += result.deleted
+            failed = [err.get("case_id") for err in result.errors if err.get("case_id")]
+            if not result.failed:
+                return total
+            if not failed:
+                failed = pending
+            pending = failed
+            if attempt < self.retries:
+                time.sleep(self.retry_interval)
+        report.failed += len(pending)
+        report.failed_ids.extend(pending)
+        logger.error(f"Sync gave up on {len(pending)} case(s) after {self.retries} retries: {pending[:20]}")
+        return total
+
+    def build_documents(self, cases: List[TestCase]) -> List[TestCaseIndexDocument]:
+        """Rebuild ES documents for cases, joining scenes and loading text artifacts."""
+        scenes = self.store.scenes_for_cases([case.case_id for case in cases])
+        docs = []
+        for case in cases:
+            case_scenes = scenes.get(case.case_id, [])
+            docs.append(
+                to_test_case_index_document(
+                    case,
+                    steps_content=_read_text(case.steps_path, self.pack_root),
+                    expected_result_content=_read_text(case.expected_result_path, self.pack_root),
+                    scene_ids=[scene_id for scene_id, _ in case_scenes],
+                    scene_names=[scene_name for _, scene_name in case_scenes],
+                )
+            )
+        return docs
+
+    def _finish(self, report: SyncReport, started: float) -> SyncReport:
+        report.elapsed = time.perf_counter() - started
+        logger.info(
+            f"ES sync ({report.mode}) finished in {report.elapsed:.2f}s: upserted={report.upserted} "
+            f"deleted={report.deleted} failed={report.failed} missing_in_es={report.missing_in_es} "
+            f"extra_in_es={report.extra_in_es} watermark={report.watermark}"
+        )
+        return report
+
+
+def merge_diff_sorted(left: Iterable[str], right: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Sorted-merge two ascending key streams.
+
+    Yields ("missing", key) for keys only in `left` (the RDB) and
+    ("extra", key) for keys only in `right` (ES). Memory use is O(1).
+    """
+    left_it, right_it = iter(left), iter(right)
+    sentinel = object()
+    a = next(left_it, sentinel)
+    b = next(right_it, sentinel)
+    while a is not sentinel or b is not sentinel:
+        if b is sentinel or (a is not sentinel and a < b):
+            yield "missing", a
+            a = next(left_it, sentinel)
+        elif a is sentinel or b < a:
+            yield "extra", b
+            b = next(right_it, sentinel)
+        else:
+            a = next(left_it, sentinel)
+            b = next(right_it, sentinel)
+
+
+def _read_text(path: Optional[str], pack_root: Optional[str] = None) -> str:
+    if not path:
+        return ""
+    try:
+        return read_text_uri(path, pack_root)
+    except FileOperationError:
+        logger.warning(f"Text artifact not found, indexing empty content: {path}")
+        return ""
+
+
+def _merge_unique(left: Iterable[str], right: Iterable[str]) -> Iterator[str]:
+    """Union of two ascending key streams, each key once."""
+    last = None
+    for key in heapq.merge(left, right):
+        if key != last:
+            yield key
+            last = key
+
+
+def _batched(iterable: Iterable[str], size: int) -> Iterator[List[str]]:
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
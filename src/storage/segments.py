@@ -0,0 +1,257 @@
+"""Segmented storage for local `es_docs` JSONL artifacts.
+
+Every generation run writes one `*es_docs_*.jsonl` file. Instead of treating
+only the newest file as the search corpus, the files are tracked as segments
+in a manifest (oldest first). Reads walk segments newest-first so the latest
+version of each `case_id` wins, and `compact()` folds a project's segments
+into a single deduplicated segment with a rebuilt `case_id` offset index.
+
+The manifest is reconciled with the directory on every load, so es_docs
+files that were never registered (older runs, copied-in files) are still
+searched, ordered by their modification time. Manifest updates hold an
+exclusive lock on `es_docs_manifest.lock` so concurrent runs do not lose
+each other's segments.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from ..utils.file_utils import JsonlWriter, iter_jsonl, loads_json_line
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "es_docs_manifest.json"
+LOCK_NAME = "es_docs_manifest.lock"
+INDEX_SUFFIX = ".idx.json"
+_MANIFEST_VERSION = 1
+
+
+class SegmentStore:
+    """Manifest-backed view over all es_docs segments in a directory."""
+
+    def __init__(self, base_dir: str, project_name: Optional[str] = None):
+        """
+        Initialize segment store.
+
+        Args:
+            base_dir: Directory holding the es_docs JSONL segments
+            project_name: Restrict reads/compaction to one project (all when None)
+        """
+        self.base_dir = Path(base_dir)
+        self.project_name = project_name
+        self.manifest_path = self.base_dir / MANIFEST_NAME
+        self._index_cache: Dict[str, tuple] = {}
+
+    # ---------------------- Manifest ----------------------
+    def load_manifest(self) -> Dict[str, Any]:
+        """Load the manifest and add es_docs files on disk that it does not list."""
+        manifest: Dict[str, Any] = {"version": _MANIFEST_VERSION, "segments": []}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+        known = {s["file"] for s in manifest["segments"]} | set(manifest.get("retired", []))
+        unlisted = []
+        for path in sorted(glob.glob(str(self.base_dir / "*es_docs_*.jsonl"))):
+            name = Path(path).name
+            if name in known:
+                continue
+            unlisted.append({
+                "file": name,
+                "project": _project_from_filename(name),
+                "created": datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S"),
+                "records": None,
+            })
+        if unlisted:
+            # Stable sort: listed segments keep their order, unlisted ones slot in by age.
+            manifest["segments"] = sorted(manifest["segments"] + unlisted, key=lambda s: s.get("created") or "")
+        return manifest
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the manifest lock across a read-modify-write."""
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.base_dir / LOCK_NAME, "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def register_segment(self, segment_path: str, project_name: Optional[str] = None) -> Dict[str, Any]:
+        """Append a freshly written es_docs file to the manifest and index it."""
+        path = Path(segment_path)
+        records = self._build_index(path)
+        entry = {
+            "file": path.name,
+            "project": project_name if project_name is not None else _project_from_filename(path.name),
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "records": records,
+        }
+        with self._locked():
+            manifest = self.load_manifest()
+            manifest["segments"] = [s for s in manifest["segments"] if s["file"] != path.name]
+            manifest["segments"].append(entry)
+            self._save_manifest(manifest)
+        logger.info(f"Registered es_docs segment: {path.name} ({records} records)")
+        return entry
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """Segments visible to this store, newest first."""
+        all_segments = self.load_manifest()["segments"]
+        if self.project_name:
+            all_segments = [s for s in all_segments if s.get("project") == self.project_name]
+        return [s for s in reversed(all_segments) if (self.base_dir / s["file"]).exists()]
+
+    # ---------------------- Reads ----------------------
+    def iter_docs(self, files: Optional[set] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the newest version of every case across all (or the given) segments."""
+        seen = set()
+        for segment in self.segments():
+            if files is not None and segment["file"] not in files:
+                continue
+            for doc in iter_jsonl(str(self.base_dir / segment["file"])):
+                case_id = doc.get("case_id")
+                if case_id in seen:
+                    continue
+                seen.add(case_id)
+                yield doc
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """Point lookup through the per-segment offset indexes."""
+        for segment in self.segments():
+            path = self.base_dir / segment["file"]
+            offset = self._load_index(path).get(case_id)
+            if offset is None:
+                continue
+            with open(path, "rb") as f:
+                f.seek(offset)
+                return loads_json_line(f.readline())
+        return None
+
+    # ---------------------- Compaction ----------------------
+    def compact(self, keep_old: bool = False) -> List[Dict[str, Any]]:
+        """Merge segments into one deduplicated segment per project.
+
+        Args:
+            keep_old: Keep the merged segment files on disk (they are always
+                dropped from the manifest and listed as retired)
+
+        Returns:
+            Manifest entries of the newly written segments
+        """
+        with self._locked():
+            return self._compact(keep_old)
+
+    def _compact(self, keep_old: bool) -> List[Dict[str, Any]]:
+        manifest = self.load_manifest()
+        groups: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for segment in manifest["segments"]:
+            if self.project_name and segment.get("project") != self.project_name:
+                continue
+            groups.setdefault(segment.get("project"), []).append(segment)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        written: List[Dict[str, Any]] = []
+        for project, group in groups.items():
+            if len(group) < 2:
+                continue
+            prefix = f"{project}_" if project else ""
+            target = self.base_dir / f"{prefix}es_docs_compacted_{timestamp}.jsonl"
+            scoped_files = {s["file"] for s in group}
+            tmp_target = target.with_suffix(".jsonl.tmp")
+            with JsonlWriter(str(tmp_target)) as out:
+                out.write_many(self.iter_docs(files=scoped_files))
+            os.replace(tmp_target, target)
+            records = self._build_index(target)
+
+            manifest["segments"] = [s for s in manifest["segments"] if s["file"] not in scoped_files]
+            entry = {
+                "file": target.name,
+                "project": project,
+                "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "records": records,
+            }
+            manifest["segments"].append(entry)
+            if keep_old:
+                manifest["retired"] = sorted(set(manifest.get("retired", [])) | scoped_files)
+            written.append(entry)
+            self._save_manifest(manifest)
+
+            if not keep_old:
+                for name in scoped_files:
+                    (self.base_dir / name).unlink(missing_ok=True)
+                    _index_path(self.base_dir / name).unlink(missing_ok=True)
+            logger.info(f"Compacted {len(group)} segments into {target.name} ({records} records)")
+
+        self._index_cache.clear()
+        return written
+
+    # ---------------------- Index ----------------------
+    def _build_index(self, path: Path) -> int:
+        """Write the `case_id -> byte offset` sidecar for a segment."""
+        index: Dict[str, int] = {}
+        offset = 0
+        with open(path, "rb") as f:
+            for raw in f:
+                line = raw.strip()
+                if line:
+                    case_id = loads_json_line(line).get("case_id")
+                    if case_id is not None:
+                        index[case_id] = offset
+                offset += len(raw)
+        with open(_index_path(path), "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        return len(index)
+
+    def _load_index(self, path: Path) -> Dict[str, int]:
+        idx_path = _index_path(path)
+        if not idx_path.exists() or idx_path.stat().st_mtime < path.stat().st_mtime:
+            self._build_index(path)
+        mtime = idx_path.stat().st_mtime
+        cached = self._index_cache.get(str(idx_path))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(idx_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self._index_cache[str(idx_path)] = (mtime, index)
+        return index
+
+
+def _index_path(segment_path: Path) -> Path:
+    return segment_path.with_name(segment_path.name[: -len(".jsonl")] + INDEX_SUFFIX)
+
+
+def _project_from_filename(name: str) -> Optional[str]:
+    """Recover the project prefix from `{project}_es_docs_*.jsonl`."""
+    prefix, _, _ = name.partition("es_docs_")
+    return prefix[:-1] if prefix.endswith("_") else None
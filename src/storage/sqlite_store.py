@@ -0,0 +1,503 @@
+"""SQLite persistence for the relational test case schema.
+
+Mirrors `TestCase`, `CaseScene`, `CaseSceneMapping` and `CaseRelation` as
+tables with primary keys and the indexes lookups/sync rely on (module,
+project_name, update_time, scene_id). The database runs in WAL mode so
+readers (search, sync) are not blocked by a writer, and bundles are written
+with batched `executemany` upserts.
+
+Deleted test cases are recorded in `case_tombstone` by a trigger so the sync
+engine can propagate deletions without diffing full key sets every run.
+Changes that alter a case's ES document without touching its row (a
+removed or re-pointed scene mapping, a renamed or deleted scene) mark the
+case in `case_touch`. Both tables are stamped with the local clock.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..entities.codec import EntityCodec
+from ..entities.db_models import (
+    DATETIME_FMT,
+    CaseRelation,
+    CaseScene,
+    CaseSceneMapping,
+    TestCase,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows are only ever written from validated entities, so reads skip re-validation.
+_CASE_CODEC = EntityCodec(TestCase, trusted=True)
+
+_TEST_CASE_COLUMNS = (
+    "case_id", "project_name", "module", "feature", "title", "precondition",
+    "steps_path", "expected_result_path", "level", "source", "environment",
+    "owner", "status", "remark", "create_time", "update_time", "executor",
+)
+_SCENE_COLUMNS = ("scene_id", "scene_name", "scene_desc_path", "create_time")
+_MAPPING_COLUMNS = ("mapping_id", "scene_id", "case_id", "create_time")
+_RELATION_COLUMNS = ("relation_id", "source_case_id", "target_case_id", "relation_type", "remark", "create_time")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_case (
+    case_id TEXT PRIMARY KEY,
+    project_name TEXT,
+    module TEXT NOT NULL,
+    feature TEXT NOT NULL,
+    title TEXT NOT NULL,
+    precondition TEXT,
+    steps_path TEXT NOT NULL,
+    expected_result_path TEXT NOT NULL,
+    level TEXT NOT NULL,
+    source TEXT,
+    environment TEXT,
+    owner TEXT,
+    status TEXT NOT NULL,
+    remark TEXT,
+    create_time TEXT NOT NULL,
+    update_time TEXT NOT NULL,
+    executor TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_test_case_module ON test_case(module);
+CREATE INDEX IF NOT EXISTS idx_test_case_project ON test_case(project_name);
+CREATE INDEX IF NOT EXISTS idx_test_case_update_time ON test_case(update_time);
+
+CREATE TABLE IF NOT EXISTS case_scene (
+    scene_id TEXT PRIMARY KEY,
+    scene_name TEXT NOT NULL,
+    scene_desc_path TEXT,
+    create_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_case_scene_create_time ON case_scene(create_time);
+
+CREATE TABLE IF NOT EXISTS case_scene_mapping (
+    mapping_id TEXT PRIMARY KEY,
+    scene_id TEXT NOT NULL,
+    case_id TEXT NOT NULL,
+    create_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mapping_scene_id ON case_scene_mapping(scene_id);
+CREATE INDEX IF NOT EXISTS idx_mapping_case_id ON case_scene_mapping(case_id);
+CREATE INDEX IF NOT EXISTS idx_mapping_create_time ON case_scene_mapping(create_time);
+
+CREATE TABLE IF NOT EXISTS case_relation (
+    relation_id TEXT PRIMARY KEY,
+    source_case_id TEXT NOT NULL,
+    target_case_id TEXT NOT NULL,
+    relation_type TEXT NOT NULL,
+    remark TEXT,
+    create_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_relation_source ON case_relation(source_case_id);
+CREATE INDEX IF NOT EXISTS idx_relation_target ON case_relation(target_case_id);
+
+CREATE TABLE IF NOT EXISTS case_tombstone (
+    case_id TEXT PRIMARY KEY,
+    delete_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tombstone_delete_time ON case_tombstone(delete_time);
+
+CREATE TRIGGER IF NOT EXISTS trg_test_case_delete AFTER DELETE ON test_case
+BEGIN
+    INSERT OR REPLACE INTO case_tombstone(case_id, delete_time)
+    VALUES (OLD.case_id, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_test_case_revive AFTER INSERT ON test_case
+BEGIN
+    DELETE FROM case_tombstone WHERE case_id = NEW.case_id;
+END;
+
+CREATE TABLE IF NOT EXISTS case_touch (
+    case_id TEXT PRIMARY KEY,
+    touch_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_touch_time ON case_touch(touch_time);
+
+-- Upserts, not OR REPLACE: a trigger's conflict clause yields to the outer upsert's.
+CREATE TRIGGER IF NOT EXISTS trg_mapping_delete AFTER DELETE ON case_scene_mapping
+BEGIN
+    INSERT INTO case_touch(case_id, touch_time)
+    VALUES (OLD.case_id, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+    ON CONFLICT(case_id) DO UPDATE SET touch_time = excluded.touch_time;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mapping_update AFTER UPDATE OF scene_id, case_id ON case_scene_mapping
+WHEN OLD.scene_id IS NOT NEW.scene_id OR OLD.case_id IS NOT NEW.case_id
+BEGIN
+    INSERT INTO case_touch(case_id, touch_time)
+    VALUES (OLD.case_id, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')),
+           (NEW.case_id, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+    ON CONFLICT(case_id) DO UPDATE SET touch_time = excluded.touch_time;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_scene_rename AFTER UPDATE OF scene_name ON case_scene
+WHEN OLD.scene_name IS NOT NEW.scene_name
+BEGIN
+    INSERT INTO case_touch(case_id, touch_time)
+    SELECT case_id, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')
+    FROM case_scene_mapping WHERE scene_id = NEW.scene_id
+    ON CONFLICT(case_id) DO UPDATE SET touch_time = excluded.touch_time;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_scene_delete AFTER DELETE ON case_scene
+BEGIN
+    INSERT INTO case_touch(case_id, touch_time)
+    SELECT case_id, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')
+    FROM case_scene_mapping WHERE scene_id = OLD.scene_id
+    ON CONFLICT(case_id) DO UPDATE SET touch_time = excluded.touch_time;
+END;
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLiteCaseStore:
+    """Relational store for materialized bundles backed by SQLite."""
+
+    def __init__(self, db_path: str, batch_size: int = 1000):
+        """
+        Initialize SQLite store and create the schema if needed.
+
+        Args:
+            db_path: Path to the SQLite database file
+            batch_size: Rows per executemany batch
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "SQLiteCaseStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            try:
+                yield self._conn
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    # ---------------------- Writes ----------------------
+    def save_bundle(self, bundle: Any) -> Dict[str, int]:
+        """Upsert every entity of a MaterializedBundle in one transaction."""
+        counts = {
+            "test_cases": self.upsert_test_cases(bundle.test_cases, commit=False),
+            "scenes": self.upsert_scenes(bundle.scenes, commit=False),
+            "scene_mappings": self.upsert_scene_mappings(bundle.scene_mappings, commit=False),
+            "relations": self.upsert_relations(bundle.relations, commit=False),
+        }
+        with self._lock:
+            self._conn.commit()
+        logger.info(f"Saved bundle to {self.db_path}: {counts}")
+        return counts
+
+    def upsert_test_cases(self, cases: Iterable[TestCase], commit: bool = True) -> int:
+        return self._upsert("test_case", _TEST_CASE_COLUMNS, "case_id", cases, commit)
+
+    def upsert_scenes(self, scenes: Iterable[CaseScene], commit: bool = True) -> int:
+        return self._upsert("case_scene", _SCENE_COLUMNS, "scene_id", scenes, commit)
+
+    def upsert_scene_mappings(self, mappings: Iterable[CaseSceneMapping], commit: bool = True) -> int:
+        return self._upsert("case_scene_mapping", _MAPPING_COLUMNS, "mapping_id", mappings, commit)
+
+    def upsert_relations(self, relations: Iterable[CaseRelation], commit: bool = True) -> int:
+        return self._upsert("case_relation", _RELATION_COLUMNS, "relation_id", relations, commit)
+
+    def delete_cases(self, case_ids: Iterable[str]) -> int:
+        """Delete cases and their mappings/relations (tombstones are recorded)."""
+        deleted = 0
+        with self._transaction() as conn:
+            for batch in _batched(case_ids, self.batch_size):
+                params = [(case_id,) for case_id in batch]
+                conn.executemany("DELETE FROM case_scene_mapping WHERE case_id = ?", params)
+                conn.executemany(
+                    "DELETE FROM case_relation WHERE source_case_id = ? OR target_case_id = ?",
+                    [(case_id, case_id) for case_id in batch],
+                )
+                cur = conn.executemany("DELETE FROM test_case WHERE case_id = ?", params)
+                deleted += cur.rowcount
+        return deleted
+
+    def sink(self) -> "SQLiteSink":
+        """Return a materializer sink that upserts entities in batches."""
+        return SQLiteSink(self)
+
+    def _upsert(
+        self,
+        table: str,
+        columns: Sequence[str],
+        key: str,
+        entities: Iterable[Any],
+        commit: bool,
+    ) -> int:
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != key)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates}"
+        )
+        total = 0
+        with self._lock:
+            try:
+                for batch in _batched(entities, self.batch_size):
+                    rows = [_entity_row(entity, columns) for entity in batch]
+                    self._conn.executemany(sql, rows)
+                    total += len(rows)
+                if commit:
+                    self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return total
+
+    # ---------------------- Queries ----------------------
+    def get_case(self, case_id: str) -> Optional[TestCase]:
+        row = self._query_one("SELECT * FROM test_case WHERE case_id = ?", (case_id,))
+        return _CASE_CODEC.decode(dict(row)) if row else None
+
+    def query_cases(
+        self,
+        project_name: Optional[str] = None,
+        module: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[TestCase]:
+        """Filter cases on indexed columns, ordered by update_time then case_id."""
+        clauses, params = [], []
+        if project_name is not None:
+            clauses.append("project_name = ?")
+            params.append(project_name)
+        if module is not None:
+            clauses.append("module = ?")
+            params.append(module)
+        if updated_since is not None:
+            clauses.append("update_time >= ?")
+            params.append(updated_since.strftime(DATETIME_FMT))
+        sql = "SELECT * FROM test_case"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY update_time, case_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [_CASE_CODEC.decode(dict(row)) for row in self._query_all(sql, params)]
+
+    def get_cases(self, case_ids: Sequence[str]) -> List[TestCase]:
+        cases: List[TestCase] = []
+        for batch in _batched(case_ids, 500):
+            marks = ", ".join("?" for _ in batch)
+            rows = self._query_all(f"SELECT * FROM test_case WHERE case_id IN ({marks})", batch)
+            cases.extend(_CASE_CODEC.decode(dict(row)) for row in rows)
+        return cases
+
+    def cases_for_scene(self, scene_id: str) -> List[str]:
+        rows = self._query_all("SELECT case_id FROM case_scene_mapping WHERE scene_id = ? ORDER BY case_id", (scene_id,))
+        return [row["case_id"] for row in rows]
+
+    def scenes_for_cases(self, case_ids: Sequence[str]) -> Dict[str, List[Tuple[str, str]]]:
+        """Map case_id -> [(scene_id, scene_name)] in mapping insertion order."""
+        result: Dict[str, List[Tuple[str, str]]] = {}
+        for batch in _batched(case_ids, 500):
+            marks = ", ".join("?" for _ in batch)
+            rows = self._query_all(
+                "SELECT m.case_id, m.scene_id, COALESCE(s.scene_name, m.scene_id) AS scene_name "
+                "FROM case_scene_mapping m LEFT JOIN case_scene s ON s.scene_id = m.scene_id "
+                f"WHERE m.case_id IN ({marks}) ORDER BY m.rowid",
+                batch,
+            )
+            for row in rows:
+                result.setdefault(row["case_id"], []).append((row["scene_id"], row["scene_name"]))
+        return result
+
+    def changed_case_ids(self, since: Optional[str]) -> Iterator[str]:
+        """Case ids whose row, scene mapping or mapped scene changed at/after `since`."""
+        if since is None:
+            yield from self.iter_case_ids()
+            return
+        sql = (
+            "SELECT case_id FROM test_case WHERE update_time >= ? "
+            "UNION SELECT case_id FROM case_scene_mapping WHERE create_time >= ? "
+            "UNION SELECT m.case_id FROM case_scene_mapping m JOIN case_scene s ON s.scene_id = m.scene_id "
+            "WHERE s.create_time >= ? "
+            "ORDER BY case_id"
+        )
+        for row in self._iter_rows(sql, (since, since, since)):
+            yield row["case_id"]
+
+    def deleted_case_ids(self, since: Optional[str]) -> List[str]:
+        if since is None:
+            rows = self._query_all("SELECT case_id FROM case_tombstone ORDER BY case_id", ())
+        else:
+            rows = self._query_all(
+                "SELECT case_id FROM case_tombstone WHERE delete_time >= ? ORDER BY case_id", (since,)
+            )
+        return [row["case_id"] for row in rows]
+
+    def touched_case_ids(self, since: Optional[str]) -> List[str]:
+        """Case ids marked in case_touch at/after `since` (local clock)."""
+        if since is None:
+            rows = self._query_all("SELECT case_id FROM case_touch ORDER BY case_id", ())
+        else:
+            rows = self._query_all(
+                "SELECT case_id FROM case_touch WHERE touch_time >= ? ORDER BY case_id", (since,)
+            )
+        return [row["case_id"] for row in rows]
+
+    def iter_case_ids(self) -> Iterator[str]:
+        """All case ids in primary-key (binary) order, streamed from a cursor."""
+        for row in self._iter_rows("SELECT case_id FROM test_case ORDER BY case_id", ()):
+            yield row["case_id"]
+
+    def max_change_time(self) -> Optional[str]:
+        """Latest data timestamp (case update_time, mapping/scene create_time)."""
+        row = self._query_one(
+            "SELECT MAX(t) AS t FROM ("
+            "SELECT MAX(update_time) AS t FROM test_case "
+            "UNION ALL SELECT MAX(create_time) FROM case_scene_mapping "
+            "UNION ALL SELECT MAX(create_time) FROM case_scene)",
+            (),
+        )
+        return row["t"] if row else None
+
+    def max_local_time(self) -> Optional[str]:
+        """Latest tombstone or touch time; taken from the local clock, not from the data."""
+        row = self._query_one(
+            "SELECT MAX(t) AS t FROM ("
+            "SELECT MAX(delete_time) AS t FROM case_tombstone "
+            "UNION ALL SELECT MAX(touch_time) FROM case_touch)",
+            (),
+        )
+        return row["t"] if row else None
+
+    def count_cases(self) -> int:
+        return self._query_one("SELECT COUNT(*) AS n FROM test_case", ())["n"]
+
+    # ---------------------- Sync state ----------------------
+    def get_state(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        row = self._query_one("SELECT value FROM sync_state WHERE name = ?", (name,))
+        return row["value"] if row else default
+
+    def set_state(self, name: str, value: Optional[str]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO sync_state(name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, value),
+            )
+
+    # ---------------------- Internals ----------------------
+    def _query_one(self, sql: str, params: Sequence[Any]) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchone()
+
+    def _query_all(self, sql: str, params: Sequence[Any]) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def _iter_rows(self, sql: str, params: Sequence[Any], arraysize: int = 1000) -> Iterator[sqlite3.Row]:
+        """Stream rows on a dedicated cursor so large scans stay bounded in memory."""
+        cursor = self._conn.cursor()
+        cursor.arraysize = arraysize
+        with self._lock:
+            cursor.execute(sql, tuple(params))
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany()
+            if not rows:
+                break
+            yield from rows
+        cursor.close()
+
+
+class SQLiteSink:
+    """Materializer sink buffering rows and upserting them `batch_size` at a time.
+
+    Implements the `MaterializeSink` interface of `src.entities.materializer`;
+    everything is committed when the sink is closed.
+    """
+
+    def __init__(self, store: SQLiteCaseStore):
+        self.store = store
+        self.counts = {"test_cases": 0, "scenes": 0, "scene_mappings": 0, "relations": 0}
+        self._buffers: Dict[str, List[Any]] = {kind: [] for kind in self.counts}
+
+    def add_scene(self, scene: CaseScene) -> None:
+        self._add("scenes", scene)
+
+    def add_scene_mapping(self, mapping: CaseSceneMapping) -> None:
+        self._add("scene_mappings", mapping)
+
+    def add_relation(self, relation: CaseRelation) -> None:
+        self._add("relations", relation)
+
+    def add_case(self, case: TestCase, doc: Any = None) -> None:
+        self._add("test_cases", case)
+
+    def close(self) -> None:
+        for kind in self._buffers:
+            self._flush(kind)
+        with self.store._lock:
+            self.store._conn.commit()
+        logger.info(f"Saved materialized entities to {self.store.db_path}: {self.counts}")
+
+    def _add(self, kind: str, entity: Any) -> None:
+        buffer = self._buffers[kind]
+        buffer.append(entity)
+        if len(buffer) >= self.store.batch_size:
+            self._flush(kind)
+
+    def _flush(self, kind: str) -> None:
+        buffer = self._buffers[kind]
+        if not buffer:
+            return
+        upsert = {
+            "test_cases": self.store.upsert_test_cases,
+            "scenes": self.store.upsert_scenes,
+            "scene_mappings": self.store.upsert_scene_mappings,
+            "relations": self.store.upsert_relations,
+        }[kind]
+        self.counts[kind] += upsert(buffer, commit=False)
+        buffer.clear()
+
+
+def _entity_row(entity: Any, columns: Sequence[str]) -> Tuple[Any, ...]:
+    data = entity.model_dump() if hasattr(entity, "model_dump") else dict(entity)
+    return tuple(data.get(column) for column in columns)
+
+
+def _batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,233 @@
+"""Packed, content-addressed storage for case text artifacts.
+
+Instead of one small file per case steps/expected result, texts are appended
+to a few large segment files and addressed by stable URIs of the form
+`pack://<segment name>#<offset>:<length>`. The segment name is relative to
+the pack root (QA_AGENT_PACK_ROOT, else `global.text_pack_root`; relative
+roots are taken from the project root), so URIs read the same from any
+working directory. Identical texts are stored once (keyed by their SHA-1),
+and reads use mmap for random access.
+
+Layout of a pack directory::
+
+    packs/
+        segment_00001.pack      # append-only UTF-8 payloads
+        segment_00002.pack
+        pack_index.jsonl        # {"sha1": ..., "uri": ...} per stored text
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from ..utils.config_loader import get_config
+from ..utils.exceptions import FileOperationError
+
+logger = logging.getLogger(__name__)
+
+PACK_SCHEME = "pack://"
+INDEX_FILE = "pack_index.jsonl"
+SEGMENT_PATTERN = "segment_*.pack"
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_PACK_ROOT = "outputs/testcases/packs"
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+
+def get_pack_root() -> Path:
+    """Directory pack URIs are resolved against."""
+    root = Path(os.getenv("QA_AGENT_PACK_ROOT") or get_config("text_pack_root", DEFAULT_PACK_ROOT))
+    return root if root.is_absolute() else PROJECT_ROOT / root
+
+
+class TextPackStore:
+    """Append-only writer for packed text segments with hash deduplication."""
+
+    def __init__(self, pack_dir: Optional[str] = None, max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES):
+        """
+        Initialize pack store, resuming the newest segment if one exists.
+
+        Args:
+            pack_dir: Pack root holding segments and the hash index (default: get_pack_root())
+            max_segment_bytes: Roll over to a new segment past this size
+        """
+        self.pack_dir = Path(pack_dir) if pack_dir else get_pack_root()
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max(1, max_segment_bytes)
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, str] = self._load_index()
+
+        segments = sorted(self.pack_dir.glob(SEGMENT_PATTERN))
+        self._segment_no = int(segments[-1].stem.split("_")[-1]) if segments else 1
+        self._segment: Optional[BinaryIO] = None
+        self._index = open(self.pack_dir / INDEX_FILE, "a", encoding="utf-8")
+
+    @property
+    def segment_path(self) -> Path:
+        return self.pack_dir / f"segment_{self._segment_no:05d}.pack"
+
+    def put(self, text: str) -> str:
+        """Store text (once per distinct content) and return its pack URI."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            uri = self._hashes.get(digest)
+            if uri:
+                return uri
+
+            segment = self._open_segment(len(data))
+            offset = segment.tell()
+            segment.write(data)
+            # The payload must reach the file before an index line can point at it.
+            segment.flush()
+            uri = f"{PACK_SCHEME}{self.segment_path.name}#{offset}:{len(data)}"
+            self._index.write(json.dumps({"sha1": digest, "uri": uri}) + "\n")
+            self._hashes[digest] = uri
+            return uri
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._segment:
+                self._segment.flush()
+            self._index.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment:
+                self._segment.close()
+                self._segment = None
+            self._index.close()
+
+    def __enter__(self) -> "TextPackStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _open_segment(self, incoming: int) -> BinaryIO:
+        if self._segment is None:
+            self._segment = open(self.segment_path, "ab")
+        size = self._segment.tell()
+        if size and size + incoming > self.max_segment_bytes:
+            self._segment.close()
+            self._segment_no += 1
+            self._segment = open(self.segment_path, "ab")
+            logger.debug(f"Rolled text pack to {self.segment_path}")
+        return self._segment
+
+    def _load_index(self) -> Dict[str, str]:
+        hashes: Dict[str, str] = {}
+        index_path = self.pack_dir / INDEX_FILE
+        if not index_path.exists():
+            return hashes
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted write; the payload is just orphaned.
+                    continue
+                # Older entries hold the segment path; keep only its name.
+                segment, offset, length = parse_pack_uri(entry["uri"])
+                hashes[entry["sha1"]] = f"{PACK_SCHEME}{Path(segment).name}#{offset}:{length}"
+        return hashes
+
+
+class PackReader:
+    """Random-access reader over pack segments, keeping one mmap per segment."""
+
+    def __init__(self, pack_root: Optional[str] = None):
+        """
+        Initialize reader.
+
+        Args:
+            pack_root: Directory segment names resolve against (default: get_pack_root())
+        """
+        self.pack_root = Path(pack_root) if pack_root else get_pack_root()
+        self._maps: Dict[str, Tuple[BinaryIO, mmap.mmap]] = {}
+        self._lock = threading.Lock()
+
+    def read(self, uri: str) -> str:
+        segment, offset, length = parse_pack_uri(uri)
+        if length == 0:
+            return ""
+        # URIs written before segment names were relative hold a full path.
+        path = segment if len(Path(segment).parts) > 1 else str(self.pack_root / segment)
+        mm = self._map(path, offset + length)
+        return mm[offset:offset + length].decode("utf-8")
+
+    def close(self) -> None:
+        with self._lock:
+            for handle, mm in self._maps.values():
+                mm.close()
+                handle.close()
+            self._maps.clear()
+
+    def _map(self, path: str, needed: int) -> mmap.mmap:
+        with self._lock:
+            entry = self._maps.get(path)
+            if entry and len(entry[1]) >= needed:
+                return entry[1]
+            if entry:
+                # The segment grew since it was mapped; remap to see the new tail.
+                del self._maps[path]
+                entry[1].close()
+                entry[0].close()
+            try:
+                handle = open(path, "rb")
+                mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                raise FileOperationError(f"Cannot map text pack segment {path}: {e}")
+            if len(mm) < needed:
+                mm.close()
+                handle.close()
+                raise FileOperationError(f"Text pack segment {path} is shorter than {needed} bytes")
+            self._maps[path] = (handle, mm)
+            return mm
+
+
+def is_pack_uri(ref: Optional[str]) -> bool:
+    return bool(ref) and ref.startswith(PACK_SCHEME)
+
+
+def parse_pack_uri(uri: str) -> Tuple[str, int, int]:
+    """Split `pack://segment#offset:len` into (segment, offset, length)."""
+    if not is_pack_uri(uri):
+        raise ValueError(f"Not a pack URI: {uri}")
+    path, _, span = uri[len(PACK_SCHEME):].rpartition("#")
+    offset, _, length = span.partition(":")
+    try:
+        return path, int(offset), int(length)
+    except ValueError:
+        raise ValueError(f"Malformed pack URI: {uri}")
+
+
+_readers: Dict[Path, PackReader] = {}
+_readers_lock = threading.Lock()
+
+
+def read_text_uri(ref: str, pack_root: Optional[str] = None) -> str:
+    """
+    Read a text artifact given either a pack URI or a plain file path.
+
+    Args:
+        ref: Pack URI or file path
+        pack_root: Directory pack URIs resolve against (default: get_pack_root())
+    """
+    if is_pack_uri(ref):
+        root = Path(pack_root) if pack_root else get_pack_root()
+        with _readers_lock:
+            reader = _readers.get(root)
+            if reader is None:
+                reader = _readers[root] = PackReader(str(root))
+        return reader.read(ref)
+    try:
+        return Path(ref).read_text(encoding="utf-8")
+    except OSError as e:
+        raise FileOperationError(f"Cannot read text artifact {ref}: {e}")
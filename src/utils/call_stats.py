@@ -0,0 +1,94 @@
+"""Historical per-call LLM latency, used to project run wall time.
+
+Latencies are kept per call shape (see token_estimator.OUTPUT_SHAPES) as
+an exponentially weighted mean, and persisted between runs in a small
+JSON file: QA_AGENT_LATENCY_STATS, else
+~/.cache/vita-qaagent/llm_latency.json.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Used until a shape has history (seconds per call).
+DEFAULT_LATENCY_SECONDS: Dict[str, float] = {
+    "parsed_requirement": 60.0,
+    "walkthrough_rule": 60.0,
+    "testcase_steps": 8.0,
+    "expected_result": 5.0,
+}
+EWMA_ALPHA = 0.2
+
+
+def default_stats_path() -> Path:
+    path = os.getenv("QA_AGENT_LATENCY_STATS")
+    if path:
+        return Path(path)
+    return Path.home() / ".cache" / "vita-qaagent" / "llm_latency.json"
+
+
+class LatencyStats:
+    """Per-shape latency means with persistence."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Load stats.
+
+        Args:
+            path: JSON file (defaults to default_stats_path())
+        """
+        self.path = Path(path) if path else default_stats_path()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        if self.path.exists():
+            try:
+                self._stats = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable latency stats {self.path}: {e}")
+
+    def record(self, shape: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._stats.get(shape)
+            if entry is None:
+                self._stats[shape] = {"count": 1, "mean_seconds": seconds}
+            else:
+                entry["count"] += 1
+                entry["mean_seconds"] += EWMA_ALPHA * (seconds - entry["mean_seconds"])
+
+    def mean(self, shape: str) -> float:
+        """Mean seconds per call, or the default when there is no history."""
+        with self._lock:
+            entry = self._stats.get(shape)
+        if entry:
+            return float(entry["mean_seconds"])
+        return DEFAULT_LATENCY_SECONDS.get(shape, 10.0)
+
+    def count(self, shape: str) -> int:
+        with self._lock:
+            entry = self._stats.get(shape)
+        return int(entry["count"]) if entry else 0
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._stats, ensure_ascii=False, indent=2)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(data, encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Failed to save latency stats {self.path}: {e}")
+
+
+_latency_stats: Optional[LatencyStats] = None
+
+
+def get_latency_stats() -> LatencyStats:
+    """Process-wide latency stats."""
+    global _latency_stats
+    if _latency_stats is None:
+        _latency_stats = LatencyStats()
+    return _latency_stats
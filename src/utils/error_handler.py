@@ -1,7 +1,9 @@
 """Error handling utilities."""
 
 import logging
+import time
 import traceback
+from contextlib import nullcontext
 from typing import Optional, Callable, Any
 from functools import wraps
 
@@ -12,6 +14,7 @@ from .exceptions import (
     ParsingError,
     AgentExecutionError,
 )
+from .retry_policy import CircuitBreaker, RetryPolicy, error_status_code
 
 logger = logging.getLogger(__name__)
 
@@ -59,46 +62,79 @@ def safe_model_call(
     max_retries: int = 3,
     retry_delay: float = 2.0,
     timeout: int = 60,
+    governor: Any = None,
+    rate_limiter: Any = None,
+    rate_tokens: int = 0,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    sleep: Callable[[float], None] = time.sleep,
 ) -> Any:
     """
     Safely call model API with retries and timeout handling.
 
     Args:
         func: Function to call
-        max_retries: Maximum number of retries
-        retry_delay: Delay between retries (seconds)
+        max_retries: Maximum number of attempts (when no policy is given)
+        retry_delay: Base backoff delay in seconds (when no policy is given)
         timeout: Timeout for the call (seconds)
+        governor: Optional ConcurrencyGovernor; each attempt holds one of its slots
+        rate_limiter: Optional RateLimiter; each attempt first waits for capacity,
+            and a failed attempt returns its token reservation
+        rate_tokens: Estimated tokens (prompt + max_tokens) of one attempt
+        policy: Retry policy (default: jittered backoff from max_retries/retry_delay)
+        breaker: Optional provider CircuitBreaker; open circuits fail fast
+        sleep: Blocking sleep (for tests)
 
     Returns:
         Function result
 
     Raises:
-        ModelAPIError: If all retries fail
-        ModelTimeoutError: If timeout occurs
+        ModelAPIError: If the error is not retryable or all attempts fail
+        ModelTimeoutError: If the last attempt timed out
+        CircuitOpenError: If the provider's circuit is open
     """
-    import time
+    policy = policy or RetryPolicy(max_attempts=max_retries, base_delay=retry_delay)
 
-    last_error = None
-
-    for attempt in range(max_retries):
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        reserved = False
         try:
-            return func()
-        except ModelTimeoutError:
-            logger.warning(f"Model call timeout (attempt {attempt + 1}/{max_retries})")
-            last_error = ModelTimeoutError("Model API call timed out")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
-        except ModelAPIError as e:
-            logger.warning(f"Model API error (attempt {attempt + 1}/{max_retries}): {e}")
-            last_error = e
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
+            # Wait for rate capacity before taking a concurrency slot so the
+            # wait does not count as call latency.
+            if rate_limiter is not None:
+                rate_limiter.acquire(rate_tokens)
+                reserved = True
+            with governor.slot() if governor is not None else nullcontext():
+                result = func()
         except Exception as e:
-            logger.error(f"Unexpected error in model call: {e}")
-            last_error = ModelAPIError(f"Unexpected error: {str(e)}")
-            break
-
-    raise last_error or ModelAPIError("Model call failed after retries")
+            if reserved:
+                rate_limiter.cancel(rate_tokens)
+            if breaker is not None:
+                breaker.record_failure(e)
+            error = e if isinstance(e, QAAgentError) else ModelAPIError(
+                f"Unexpected error: {e}", status_code=error_status_code(e)
+            )
+            delay = policy.delay(e, attempt) if policy.should_retry(e, attempt) else None
+            if delay is None:
+                logger.error(f"Model call failed (attempt {attempt + 1}/{policy.max_attempts}): {e}")
+                if error is e:
+                    raise
+                raise error from e
+            logger.warning(
+                f"Model call failed (attempt {attempt + 1}/{policy.max_attempts}): {e}; retrying in {delay:.1f}s"
+            )
+            sleep(delay)
+            attempt += 1
+            continue
+
+        if breaker is not None:
+            breaker.record_success()
+        if rate_limiter is not None:
+            usage = result.get("usage") if isinstance(result, dict) else getattr(result, "usage", None)
+            rate_limiter.settle(rate_tokens, usage)
+        return result
 
 
 def validate_json_response(response: str, required_fields: list = None) -> dict:
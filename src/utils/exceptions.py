@@ -14,10 +14,17 @@ class ModelClientError(QAAgentError):
 class ModelAPIError(ModelClientError):
     """Error from model API calls."""
 
-    def __init__(self, message: str, status_code: int = None, response_text: str = None):
+    def __init__(
+        self,
+        message: str,
+        status_code: int = None,
+        response_text: str = None,
+        retry_after: float = None,
+    ):
         super().__init__(message)
         self.status_code = status_code
         self.response_text = response_text
+        self.retry_after = retry_after
 
 
 class ModelTimeoutError(ModelClientError):
@@ -58,3 +65,27 @@ class AgentExecutionError(QAAgentError):
         super().__init__(message)
         self.agent_name = agent_name
         self.stage = stage
+
+
+class IndexingError(QAAgentError):
+    """Error while writing documents to the search index."""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class BudgetExceededError(ModelClientError):
+    """LLM call refused because the run's token or call budget is spent."""
+
+    def __init__(self, message: str, limit: str = None):
+        super().__init__(message)
+        self.limit = limit
+
+
+class CircuitOpenError(ModelClientError):
+    """Call rejected without trying because the provider's circuit is open."""
+
+    def __init__(self, message: str, provider: str = None):
+        super().__init__(message)
+        self.provider = provider
@@ -1,16 +1,25 @@
 """File and URI loader utilities."""
 
+import hashlib
+import json
 import os
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Union, List
+from typing import Dict, Optional, Union, List
 from urllib.parse import urlparse
 
 from .exceptions import FileOperationError
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for a single document; override with QA_AGENT_MAX_DOC_BYTES.
+DEFAULT_MAX_DOC_BYTES = 20 * 1024 * 1024
+# Concurrent document loads; override with QA_AGENT_LOAD_WORKERS.
+DEFAULT_LOAD_WORKERS = 8
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 def is_url(path: str) -> bool:
     """
@@ -29,13 +38,135 @@ def is_url(path: str) -> bool:
         return False
 
 
-def load_content_from_uri(uri: str, timeout: int = 30) -> str:
+def _max_doc_bytes() -> int:
+    return int(os.getenv("QA_AGENT_MAX_DOC_BYTES", DEFAULT_MAX_DOC_BYTES))
+
+
+class HTTPCache:
+    """
+    On-disk cache of remote documents keyed by URL.
+
+    Stores the body plus its ETag/Last-Modified validators so later fetches
+    can be conditional GETs answered with 304 Not Modified.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize cache.
+
+        Args:
+            cache_dir: Cache directory (defaults to QA_AGENT_HTTP_CACHE_DIR or
+                ~/.cache/vita-qaagent/http)
+        """
+        default_dir = Path.home() / ".cache" / "vita-qaagent" / "http"
+        self.cache_dir = Path(cache_dir or os.getenv("QA_AGENT_HTTP_CACHE_DIR") or default_dir)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.meta.json"
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        """Return cached {'content', 'etag', 'last_modified'} for url, if any."""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            meta["content"] = body_path.read_text(encoding="utf-8")
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, content: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        body_path, meta_path = self._paths(url)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            body_path.write_text(content, encoding="utf-8")
+            meta = {"url": url, "etag": etag, "last_modified": last_modified}
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"Failed to write HTTP cache for {url}: {e}")
+
+
+def _http_cache_enabled() -> bool:
+    return os.getenv("QA_AGENT_HTTP_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+def _fetch_url(uri: str, timeout: int, max_bytes: int, cache: Optional[HTTPCache]) -> str:
+    """GET a URL, using conditional requests against the cache and streaming the body."""
+    cached = cache.get(uri) if cache else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        with requests.get(uri, timeout=timeout, headers=headers, stream=True) as response:
+            if response.status_code == 304 and cached:
+                logger.info(f"Not modified, using cached copy of URL: {uri}")
+                return cached["content"]
+            response.raise_for_status()
+
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise FileOperationError(
+                    f"Document too large ({declared} bytes > {max_bytes}): {uri}", file_path=uri
+                )
+
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                body.extend(chunk)
+                if len(body) > max_bytes:
+                    raise FileOperationError(
+                        f"Document exceeds max size of {max_bytes} bytes: {uri}", file_path=uri
+                    )
+            content = _decode_body(bytes(body), response)
+
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if cache and (etag or last_modified):
+                cache.put(uri, content, etag, last_modified)
+            return content
+
+    except requests.exceptions.Timeout:
+        if cached:
+            logger.warning(f"Timeout loading URL, using cached copy: {uri}")
+            return cached["content"]
+        raise FileOperationError(f"Timeout loading URL: {uri}", file_path=uri)
+    except requests.exceptions.RequestException as e:
+        if cached and not isinstance(e, requests.exceptions.HTTPError):
+            logger.warning(f"Failed to load URL ({e}), using cached copy: {uri}")
+            return cached["content"]
+        raise FileOperationError(f"Failed to load URL: {e}", file_path=uri)
+
+
+def _decode_body(body: bytes, response: requests.Response) -> str:
+    # Honor an explicit charset; otherwise prefer UTF-8 over requests' ISO-8859-1 default for text/*.
+    if "charset=" in response.headers.get("Content-Type", "").lower() and response.encoding:
+        return body.decode(response.encoding, errors="replace")
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return body.decode(response.apparent_encoding or "utf-8", errors="replace")
+
+
+def load_content_from_uri(
+    uri: str,
+    timeout: int = 30,
+    max_bytes: Optional[int] = None,
+    cache: Optional[HTTPCache] = None,
+) -> str:
     """
     Load content from URI (file path or URL).
 
     Args:
         uri: File path or HTTP(S) URL
         timeout: Timeout for HTTP requests (seconds)
+        max_bytes: Maximum document size (defaults to QA_AGENT_MAX_DOC_BYTES or 20MB)
+        cache: HTTP cache for URLs (defaults to the on-disk cache unless
+            QA_AGENT_HTTP_CACHE=0)
 
     Returns:
         Content as string
@@ -44,20 +175,15 @@ def load_content_from_uri(uri: str, timeout: int = 30) -> str:
         FileOperationError: If loading fails
     """
     logger.info(f"Loading content from URI: {uri}")
+    max_bytes = max_bytes or _max_doc_bytes()
 
     # Handle URL
     if is_url(uri):
-        try:
-            response = requests.get(uri, timeout=timeout)
-            response.raise_for_status()
-            content = response.text
-            logger.info(f"Successfully loaded {len(content)} characters from URL: {uri}")
-            return content
-
-        except requests.exceptions.Timeout:
-            raise FileOperationError(f"Timeout loading URL: {uri}", file_path=uri)
-        except requests.exceptions.RequestException as e:
-            raise FileOperationError(f"Failed to load URL: {e}", file_path=uri)
+        if cache is None and _http_cache_enabled():
+            cache = HTTPCache()
+        content = _fetch_url(uri, timeout, max_bytes, cache)
+        logger.info(f"Successfully loaded {len(content)} characters from URL: {uri}")
+        return content
 
     # Handle local file
     else:
@@ -69,6 +195,10 @@ def load_content_from_uri(uri: str, timeout: int = 30) -> str:
         if not path.is_file():
             raise FileOperationError(f"Not a file: {uri}", file_path=uri)
 
+        size = path.stat().st_size
+        if size > max_bytes:
+            raise FileOperationError(f"Document too large ({size} bytes > {max_bytes}): {uri}", file_path=uri)
+
         try:
             with open(path, "r", encoding="utf-8") as f:
                 content = f.read()
@@ -80,15 +210,42 @@ def load_content_from_uri(uri: str, timeout: int = 30) -> str:
             raise FileOperationError(f"Failed to read file: {e}", file_path=uri)
 
 
-def load_multiple_prds(prd_uris: Union[str, List[str]]) -> List[dict]:
+def load_uris_concurrently(uris: List[str], max_workers: Optional[int] = None, **kwargs) -> List[Union[str, FileOperationError]]:
     """
-    Load multiple PRD files from URIs.
+    Load several URIs in parallel.
+
+    Args:
+        uris: File paths or URLs
+        max_workers: Concurrent loads (defaults to QA_AGENT_LOAD_WORKERS or 8)
+        **kwargs: Passed through to load_content_from_uri
+
+    Returns:
+        Content or the FileOperationError raised, in the order of `uris`
+    """
+    if not uris:
+        return []
+    workers = max_workers or int(os.getenv("QA_AGENT_LOAD_WORKERS", DEFAULT_LOAD_WORKERS))
+
+    def _load(uri: str) -> Union[str, FileOperationError]:
+        try:
+            return load_content_from_uri(uri, **kwargs)
+        except FileOperationError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(uris)))) as pool:
+        return list(pool.map(_load, uris))
+
+
+def load_multiple_prds(prd_uris: Union[str, List[str]], max_workers: Optional[int] = None) -> List[dict]:
+    """
+    Load multiple PRD files from URIs concurrently.
 
     Args:
         prd_uris: Single URI or list of URIs (file paths or URLs)
+        max_workers: Concurrent loads (defaults to QA_AGENT_LOAD_WORKERS or 8)
 
     Returns:
-        List of dicts with 'uri', 'name', and 'content'
+        List of dicts with 'uri', 'name', and 'content', in input order
 
     Raises:
         FileOperationError: If any PRD fails to load
@@ -99,26 +256,24 @@ def load_multiple_prds(prd_uris: Union[str, List[str]]) -> List[dict]:
     prds = []
     errors = []
 
-    for uri in prd_uris:
-        try:
-            content = load_content_from_uri(uri)
-
-            # Extract name from URI
-            if is_url(uri):
-                name = Path(urlparse(uri).path).stem or "remote_prd"
-            else:
-                name = Path(uri).stem
-
-            prds.append({
-                "uri": uri,
-                "name": name,
-                "content": content
-            })
-
-        except FileOperationError as e:
-            error_msg = f"Failed to load PRD from {uri}: {e}"
+    for uri, result in zip(prd_uris, load_uris_concurrently(prd_uris, max_workers=max_workers)):
+        if isinstance(result, FileOperationError):
+            error_msg = f"Failed to load PRD from {uri}: {result}"
             logger.error(error_msg)
             errors.append(error_msg)
+            continue
+
+        # Extract name from URI
+        if is_url(uri):
+            name = Path(urlparse(uri).path).stem or "remote_prd"
+        else:
+            name = Path(uri).stem
+
+        prds.append({
+            "uri": uri,
+            "name": name,
+            "content": result
+        })
 
     if errors:
         raise FileOperationError(
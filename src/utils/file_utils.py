@@ -1,13 +1,22 @@
 """File utilities for reading and writing test cases."""
 
+import gzip
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import IO, List, Dict, Any, Iterable, Iterator, Optional, Union
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Records buffered by JsonlWriter before each write call.
+JSONL_WRITE_BATCH = 1000
+
 
 def read_markdown_file(file_path: str) -> str:
     """
@@ -80,44 +89,186 @@ def write_json_file(file_path: str, data: Any, indent: int = 2) -> None:
     logger.info(f"JSON file written to: {file_path}")
 
 
-def write_jsonl_file(file_path: str, records: List[Dict[str, Any]]) -> None:
+def dumps_json_line(record: Any) -> str:
     """
-    Write records to JSONL file (one JSON object per line).
+    Encode one record as a compact JSON line (no trailing newline).
+
+    Uses orjson when installed, falling back to the stdlib for values orjson
+    rejects (e.g. non-string keys).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(record).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(record, ensure_ascii=False)
+
+
+def loads_json_line(line: Union[str, bytes]) -> Any:
+    """Decode one JSON line, using orjson when installed."""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def open_text(file_path: str, mode: str = "r") -> IO[str]:
+    """
+    Open a text file, transparently (de)compressing `.gz` and `.zst` files.
 
     Args:
-        file_path: Output file path
-        records: List of records to write
+        file_path: Path to the file
+        mode: "r", "w" or "a"
+
+    Returns:
+        Text file object (UTF-8)
     """
     path = Path(file_path)
-    path.parent.mkdir(parents=True, exist_ok=True)
+    if "r" not in mode:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading/writing .zst files requires the 'zstandard' package")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def iter_jsonl(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a JSONL file (optionally .gz/.zst) one at a time.
 
-    with open(path, "w", encoding="utf-8") as f:
+    Args:
+        file_path: Path to JSONL file
+
+    Yields:
+        Parsed JSON objects, skipping blank lines
+    """
+    if not Path(file_path).exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    with open_text(file_path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield loads_json_line(line)
+
+
+def count_jsonl(file_path: str) -> int:
+    """
+    Count records in a JSONL file without decoding them.
+
+    Args:
+        file_path: Path to JSONL file (optionally .gz/.zst)
+
+    Returns:
+        Number of non-blank lines
+    """
+    if not Path(file_path).exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    if Path(file_path).suffix in (".gz", ".zst"):
+        with open_text(file_path, "r") as f:
+            return sum(1 for line in f if line.strip())
+
+    count = 0
+    with open(file_path, "rb") as f:
+        for line in f:
+            if not line.isspace():
+                count += 1
+    return count
+
+
+class JsonlWriter:
+    """
+    Streaming JSONL writer with batched writes.
+
+    Usage:
+        with JsonlWriter("out.jsonl.gz") as writer:
+            for record in records:
+                writer.write(record)
+    """
+
+    def __init__(self, file_path: str, mode: str = "w", batch_size: int = JSONL_WRITE_BATCH):
+        """
+        Initialize writer.
+
+        Args:
+            file_path: Output path; `.gz`/`.zst` suffixes are compressed
+            mode: "w" to truncate, "a" to append
+            batch_size: Lines buffered before each write call
+        """
+        self.file_path = file_path
+        self.count = 0
+        self._batch_size = max(1, batch_size)
+        self._buffer: List[str] = []
+        self._file = open_text(file_path, mode)
+
+    def write(self, record: Any) -> None:
+        """Encode and write one record."""
+        self.write_line(dumps_json_line(record))
+
+    def write_line(self, line: str) -> None:
+        """Write an already-encoded JSON line (e.g. from `model_dump_json`)."""
+        self._buffer.append(line)
+        self.count += 1
+        if len(self._buffer) >= self._batch_size:
+            self.flush()
+
+    def write_many(self, records: Iterable[Any]) -> int:
+        """Write every record; returns how many were written."""
+        before = self.count
         for record in records:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.write(record)
+        return self.count - before
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._file.flush()
 
-    logger.info(f"JSONL file written to: {file_path} ({len(records)} records)")
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_jsonl_file(file_path: str, records: Iterable[Dict[str, Any]]) -> None:
+    """
+    Write records to JSONL file (one JSON object per line).
+
+    Args:
+        file_path: Output file path (`.gz`/`.zst` are compressed)
+        records: Records to write (any iterable, consumed once)
+    """
+    with JsonlWriter(file_path) as writer:
+        writer.write_many(records)
+
+    logger.info(f"JSONL file written to: {file_path} ({writer.count} records)")
 
 
 def read_jsonl_file(file_path: str) -> List[Dict[str, Any]]:
     """
     Read JSONL file.
 
+    Prefer `iter_jsonl` for large files.
+
     Args:
         file_path: Path to JSONL file
 
     Returns:
         List of parsed JSON objects
     """
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"File not found: {file_path}")
-
-    records = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                records.append(json.loads(line))
+    records = list(iter_jsonl(file_path))
 
     logger.info(f"Read {len(records)} records from: {file_path}")
     return records
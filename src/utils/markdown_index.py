@@ -0,0 +1,317 @@
+"""Structural index of markdown documents (PRDs).
+
+A `MarkdownIndex` is built once per document: a heading tree whose
+sections carry character and UTF-8 byte offsets, a content hash and a
+token estimate. Section text is then a plain slice of the source, so
+parsing, chunking, change detection and per-feature context retrieval
+never re-scan or blindly truncate the document.
+
+Only ATX headings (`# Title`) are recognised; headings inside fenced code
+blocks are ignored. Text before the first heading belongs to the level-0
+root section, which spans the whole document.
+
+`get_markdown_index(content)` caches indexes by content hash, so every
+component that receives the same PRD string shares one index.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .token_estimator import estimate_tokens
+
+_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+
+@dataclass
+class Section:
+    """One heading and the text under it.
+
+    `start:end` covers the heading line and all nested subsections;
+    `body_start:body_end` is the section's own text, up to its first child.
+    """
+
+    index: int
+    level: int
+    title: str
+    start: int
+    body_start: int
+    body_end: int
+    end: int
+    byte_start: int
+    byte_end: int
+    parent: Optional[int] = None
+    children: List[int] = field(default_factory=list)
+    path: Tuple[str, ...] = ()
+    hash: str = ""
+    tokens: int = 0
+    body_tokens: int = 0
+
+    @property
+    def byte_length(self) -> int:
+        return self.byte_end - self.byte_start
+
+
+@dataclass
+class Chunk:
+    """Contiguous span of the document that fits a token budget."""
+
+    start: int
+    end: int
+    tokens: int
+    sections: List[int]
+
+
+class MarkdownIndex:
+    """Heading tree over one markdown string."""
+
+    def __init__(self, content: str, content_hash: Optional[str] = None):
+        """
+        Build the index.
+
+        Args:
+            content: Markdown document
+            content_hash: sha1 of content, if already known
+        """
+        self.content = content
+        self.content_hash = content_hash or _sha1(content)
+        self.sections: List[Section] = []
+        self._build()
+
+    @property
+    def root(self) -> Section:
+        return self.sections[0]
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def __iter__(self) -> Iterator[Section]:
+        return iter(self.sections)
+
+    def headings(self) -> List[Section]:
+        """All sections except the root, in document order."""
+        return self.sections[1:]
+
+    def text(self, section: Section) -> str:
+        """Full text of a section, including its heading and subsections."""
+        return self.content[section.start:section.end]
+
+    def body(self, section: Section) -> str:
+        """Own text of a section, without the heading line and subsections."""
+        return self.content[section.body_start:section.body_end]
+
+    def get(self, path: Tuple[str, ...]) -> Optional[Section]:
+        """Look up a section by its heading path."""
+        for section in self.sections:
+            if section.path == path:
+                return section
+        return None
+
+    def find(self, query: str) -> List[Section]:
+        """Sections whose title contains query (case-insensitive)."""
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        return [s for s in self.headings() if needle in s.title.lower()]
+
+    def chunks(self, max_tokens: int) -> List[Chunk]:
+        """
+        Split the document into spans of at most max_tokens (estimated).
+
+        Sections' own texts are packed greedily in document order; a new
+        chunk starts at a heading whenever the budget would overflow. A
+        single section larger than the budget is split at blank lines.
+
+        Args:
+            max_tokens: Token budget per chunk
+
+        Returns:
+            Chunks covering the document in order
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+
+        chunks: List[Chunk] = []
+        current: Optional[Chunk] = None
+        for section in self.sections:
+            start = section.start if section.level else 0
+            end = section.body_end
+            if start == end:
+                continue
+            tokens = estimate_tokens(self.content[start:end])
+            if current is not None and current.tokens + tokens <= max_tokens:
+                current.end = end
+                current.tokens += tokens
+                current.sections.append(section.index)
+                continue
+            if current is not None:
+                chunks.append(current)
+                current = None
+            if tokens <= max_tokens:
+                current = Chunk(start, end, tokens, [section.index])
+                continue
+            pieces = self._split_span(start, end, max_tokens, section.index)
+            chunks.extend(pieces[:-1])
+            current = pieces[-1]
+        if current is not None:
+            chunks.append(current)
+        return chunks
+
+    def diff(self, other: "MarkdownIndex") -> Dict[str, List[Tuple[str, ...]]]:
+        """
+        Compare section hashes with a newer version of the document.
+
+        Sections are matched by heading path (duplicate paths are matched
+        in order).
+
+        Args:
+            other: Index of the newer document
+
+        Returns:
+            Dict with "added", "removed" and "changed" heading paths
+        """
+        old = self._hashes_by_path()
+        new = other._hashes_by_path()
+        result: Dict[str, List[Tuple[str, ...]]] = {"added": [], "removed": [], "changed": []}
+        for key, digest in new.items():
+            if key not in old:
+                result["added"].append(key[0])
+            elif old[key] != digest:
+                result["changed"].append(key[0])
+        result["removed"] = [key[0] for key in old if key not in new]
+        return result
+
+    def _hashes_by_path(self) -> Dict[Tuple[Tuple[str, ...], int], str]:
+        seen: Dict[Tuple[str, ...], int] = {}
+        hashes = {}
+        for section in self.headings():
+            ordinal = seen.get(section.path, 0)
+            seen[section.path] = ordinal + 1
+            hashes[(section.path, ordinal)] = section.hash
+        return hashes
+
+    def _split_span(self, start: int, end: int, max_tokens: int, section_index: int) -> List[Chunk]:
+        pieces: List[Chunk] = []
+        piece_start = start
+        piece_tokens = 0
+        position = start
+        for paragraph in re.split(r"(\n[ \t]*\n)", self.content[start:end]):
+            tokens = estimate_tokens(paragraph)
+            if piece_tokens and piece_tokens + tokens > max_tokens:
+                pieces.append(Chunk(piece_start, position, piece_tokens, [section_index]))
+                piece_start = position
+                piece_tokens = 0
+            position += len(paragraph)
+            piece_tokens += tokens
+        pieces.append(Chunk(piece_start, end, piece_tokens, [section_index]))
+        return pieces
+
+    def _build(self) -> None:
+        content = self.content
+        headings: List[Tuple[int, str, int, int, int]] = []  # level, title, start, body_start, byte_start
+        fence: Optional[str] = None
+        offset = 0
+        byte_offset = 0
+        for line in content.splitlines(keepends=True):
+            stripped = line.rstrip("\r\n")
+            fence_match = _FENCE_RE.match(stripped)
+            if fence_match:
+                marker = fence_match.group(1)
+                if fence is None:
+                    fence = marker
+                elif marker[0] == fence[0] and len(marker) >= len(fence):
+                    fence = None
+            elif fence is None:
+                match = _HEADING_RE.match(stripped)
+                if match:
+                    title = (match.group(2) or "").strip()
+                    headings.append((len(match.group(1)), title, offset, offset + len(line), byte_offset))
+            offset += len(line)
+            byte_offset += len(line.encode("utf-8"))
+        total_bytes = byte_offset
+
+        root = Section(
+            index=0,
+            level=0,
+            title="",
+            start=0,
+            body_start=0,
+            body_end=headings[0][2] if headings else len(content),
+            end=len(content),
+            byte_start=0,
+            byte_end=total_bytes,
+        )
+        self.sections = [root]
+        stack: List[Section] = [root]
+        for i, (level, title, start, body_start, byte_start) in enumerate(headings):
+            while stack[-1].level >= level:
+                self._close(stack.pop(), start, byte_start)
+            parent = stack[-1]
+            next_start = headings[i + 1][2] if i + 1 < len(headings) else len(content)
+            section = Section(
+                index=len(self.sections),
+                level=level,
+                title=title,
+                start=start,
+                body_start=min(body_start, len(content)),
+                body_end=next_start,
+                end=len(content),
+                byte_start=byte_start,
+                byte_end=total_bytes,
+                parent=parent.index,
+                path=parent.path + (title,),
+            )
+            parent.children.append(section.index)
+            self.sections.append(section)
+            stack.append(section)
+        for section in stack:
+            self._close(section, len(content), total_bytes)
+
+    def _close(self, section: Section, end: int, byte_end: int) -> None:
+        section.end = end
+        section.byte_end = byte_end
+        text = self.content[section.start:end]
+        section.hash = _sha1(text)
+        section.tokens = estimate_tokens(text)
+        section.body_tokens = estimate_tokens(self.content[section.body_start:section.body_end])
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+_CACHE_SIZE = 32
+_cache: "OrderedDict[str, MarkdownIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_markdown_index(content: str) -> MarkdownIndex:
+    """
+    Return the (cached) index for a markdown document.
+
+    Args:
+        content: Markdown document
+
+    Returns:
+        MarkdownIndex shared by all callers passing the same content
+    """
+    key = _sha1(content)
+    with _cache_lock:
+        index = _cache.get(key)
+        if index is not None:
+            _cache.move_to_end(key)
+            return index
+
+    index = MarkdownIndex(content, content_hash=key)
+    with _cache_lock:
+        _cache[key] = index
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
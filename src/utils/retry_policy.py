@@ -0,0 +1,249 @@
+"""Retry policy and circuit breaker for model API calls.
+
+`RetryPolicy` decides whether an error is worth retrying (timeouts,
+connection errors, HTTP 408/425/429/5xx; other 4xx fail at once) and how
+long to wait: exponential backoff with full jitter, or the server's
+`Retry-After` when it sends one.
+
+`CircuitBreaker` fails fast while a provider is down: after
+`failure_threshold` consecutive retryable failures it opens and rejects
+calls with CircuitOpenError for `reset_seconds`, then lets a single probe
+through (half-open) and closes again on success.
+
+Both are configured per provider in config/prompts.yaml:
+
+    max_retries: 3      # attempts, unless overridden below
+    retry_delay: 2.0    # base backoff
+    retry:
+      ollama: {max_attempts: 2, base_delay: 1.0}
+    circuit_breaker:
+      default: {failure_threshold: 5, reset_seconds: 30}
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from .config_loader import get_config
+from .exceptions import CircuitOpenError, ModelAPIError, ModelTimeoutError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def error_status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an exception (ModelAPIError, requests, SDK errors)."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    if status is None and exc.__cause__ is not None:
+        return error_status_code(exc.__cause__)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Delay requested by the server via Retry-After (seconds or HTTP date)."""
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is not None:
+        return float(retry_after)
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if value is None:
+        return retry_after_seconds(exc.__cause__) if exc.__cause__ is not None else None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Timeouts, connection errors and retryable HTTP statuses."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (ModelTimeoutError, TimeoutError, requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    status = error_status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # A ModelAPIError without a status is a transport-level failure.
+    return isinstance(exc, ModelAPIError)
+
+
+class RetryPolicy:
+    """How often and how long to retry a failed call."""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        max_retry_after: float = 60.0,
+        rng: Optional[random.Random] = None,
+    ):
+        """
+        Initialize policy.
+
+        Args:
+            max_attempts: Attempts including the first call
+            base_delay: Backoff cap of the first retry (seconds)
+            max_delay: Largest backoff cap (seconds)
+            max_retry_after: Give up instead of honouring a longer Retry-After
+            rng: Random source (for tests)
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self._rng = rng or random.Random()
+
+    def should_retry(self, exc: BaseException, attempt: int) -> bool:
+        """Whether to retry after the `attempt`-th (0-based) attempt failed with exc."""
+        return attempt + 1 < self.max_attempts and is_retryable_error(exc)
+
+    def delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt.
+
+        Returns:
+            Retry-After if the server sent one, otherwise a full-jitter
+            backoff in [0, min(max_delay, base_delay * 2**attempt)];
+            None when the server asks for longer than max_retry_after
+        """
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize breaker (closed).
+
+        Args:
+            name: Provider name (for logs and errors)
+            failure_threshold: Consecutive retryable failures that open the circuit
+            reset_seconds: How long the circuit stays open before a probe
+            clock: Monotonic clock (for tests)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_call(self) -> None:
+        """
+        Admit a call or fail fast.
+
+        Raises:
+            CircuitOpenError: While the circuit is open (or a probe is running)
+        """
+        with self._lock:
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            if self.state != self.CLOSED:
+                remaining = max(0.0, self.reset_seconds - (self._clock() - self._opened_at))
+                raise CircuitOpenError(
+                    f"{self.name} circuit open after {self.failures} consecutive failures; "
+                    f"retry in {remaining:.0f}s",
+                    provider=self.name,
+                )
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"{self.name} circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, exc: BaseException) -> None:
+        """Count a failure; only retryable (backend) errors trip the breaker."""
+        with self._lock:
+            if not is_retryable_error(exc):
+                # The backend answered; a bad request says nothing about its health.
+                if self.state == self.HALF_OPEN:
+                    self.state = self.CLOSED
+                if self.state == self.CLOSED:
+                    self.failures = 0
+                self._probing = False
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"{self.name} circuit open after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+def _provider_conf(section: str, provider: str) -> Dict[str, Any]:
+    conf = get_config(section, {}) or {}
+    merged = dict(conf.get("default", {}) or {})
+    merged.update(conf.get(provider, {}) or {})
+    return merged
+
+
+_policies: Dict[str, RetryPolicy] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_retry_policy(provider: str) -> RetryPolicy:
+    """Retry policy for a provider from `global.retry` (falling back to max_retries/retry_delay)."""
+    with _registry_lock:
+        if provider not in _policies:
+            conf = _provider_conf("retry", provider)
+            _policies[provider] = RetryPolicy(
+                max_attempts=int(conf.get("max_attempts", get_config("max_retries", 3))),
+                base_delay=float(conf.get("base_delay", get_config("retry_delay", 1.0))),
+                max_delay=float(conf.get("max_delay", 30.0)),
+                max_retry_after=float(conf.get("max_retry_after", 60.0)),
+            )
+        return _policies[provider]
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """Process-wide circuit breaker for a provider from `global.circuit_breaker`."""
+    with _registry_lock:
+        if provider not in _breakers:
+            conf = _provider_conf("circuit_breaker", provider)
+            _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=int(conf.get("failure_threshold", 5)),
+                reset_seconds=float(conf.get("reset_seconds", 30.0)),
+            )
+        return _breakers[provider]
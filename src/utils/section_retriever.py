@@ -0,0 +1,178 @@
+"""Local BM25 retrieval over markdown sections.
+
+Each heading section of a `MarkdownIndex` (heading line plus its own text,
+without subsections) is one retrieval unit; the root preamble is one too.
+Terms are lowercased Latin/digit words plus CJK character bigrams, so
+Chinese PRDs match without a segmenter. Heading paths are indexed with
+the text, which lets a feature name pull in the section it titles.
+
+Everything runs in-process; no search service is involved.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .markdown_index import MarkdownIndex, Section
+from .token_estimator import estimate_tokens
+
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+_CJK_RUN_RE = re.compile("[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into BM25 terms (Latin words and CJK bigrams)."""
+    lowered = text.lower()
+    terms = _WORD_RE.findall(lowered)
+    for run in _CJK_RUN_RE.findall(lowered):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+@dataclass
+class ScoredSection:
+    """Retrieval hit."""
+
+    section: Section
+    score: float
+    start: int
+    end: int
+    tokens: int
+
+
+class SectionRetriever:
+    """BM25 ranking of the sections of one document."""
+
+    def __init__(self, index: MarkdownIndex, k1: float = 1.5, b: float = 0.75):
+        """
+        Build the inverted index.
+
+        Args:
+            index: Markdown index of the document
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.index = index
+        self.k1 = k1
+        self.b = b
+        self._units: List[Tuple[Section, int, int, int]] = []  # section, start, end, tokens
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for section in index:
+            start = section.start if section.level else 0
+            end = section.body_end
+            text = index.content[start:end]
+            if not text.strip():
+                continue
+            terms = tokenize(" ".join(section.path) + "\n" + text)
+            if not terms:
+                continue
+            doc_id = len(self._units)
+            self._units.append((section, start, end, estimate_tokens(text)))
+            self._lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self._postings.setdefault(term, []).append((doc_id, tf))
+
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+
+    def search(self, query: str, top_k: int = 10) -> List[ScoredSection]:
+        """
+        Rank sections against a query.
+
+        Args:
+            query: Free text (feature/flow names, descriptions)
+            top_k: Maximum hits
+
+        Returns:
+            Hits with positive score, best first
+        """
+        total = len(self._units)
+        if not total:
+            return []
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        hits = []
+        for doc_id, score in ranked:
+            section, start, end, tokens = self._units[doc_id]
+            hits.append(ScoredSection(section, score, start, end, tokens))
+        return hits
+
+    def select(self, query: str, token_budget: int, max_sections: int = 4) -> List[ScoredSection]:
+        """
+        Pick the best sections that fit a token budget together.
+
+        Sections are taken in score order and skipped when they would
+        overflow the budget. If even the best section is too large, it is
+        cut down to the budget.
+
+        Args:
+            query: Free text
+            token_budget: Total estimated tokens allowed
+            max_sections: Maximum sections selected
+
+        Returns:
+            Selected hits in document order
+        """
+        if token_budget <= 0:
+            return []
+        hits = self.search(query, top_k=max(max_sections * 3, 10))
+        chosen: List[ScoredSection] = []
+        used = 0
+        for hit in hits:
+            if len(chosen) >= max_sections:
+                break
+            if used + hit.tokens <= token_budget:
+                chosen.append(hit)
+                used += hit.tokens
+        if not chosen and hits:
+            chosen = [self._shrink(hits[0], token_budget)]
+        return sorted(chosen, key=lambda hit: hit.start)
+
+    def context(self, query: str, token_budget: int, max_sections: int = 4) -> Optional[str]:
+        """
+        Relevant document excerpt for a prompt.
+
+        Args:
+            query: Free text
+            token_budget: Total estimated tokens allowed
+            max_sections: Maximum sections included
+
+        Returns:
+            Selected sections joined by blank lines, or None when nothing matches
+        """
+        hits = self.select(query, token_budget, max_sections=max_sections)
+        if not hits:
+            return None
+        parts = []
+        for hit in hits:
+            text = self.index.content[hit.start:hit.end].strip()
+            if hit.section.level > 1:
+                # Keep ancestry visible when a subsection is quoted on its own.
+                text = f"[{' > '.join(hit.section.path[:-1])}]\n{text}"
+            parts.append(text)
+        return "\n\n".join(parts)
+
+    def _shrink(self, hit: ScoredSection, token_budget: int) -> ScoredSection:
+        text = self.index.content[hit.start:hit.end]
+        # Estimates grow with length, so cut back until the slice fits.
+        end = len(text)
+        while end > 0 and estimate_tokens(text[:end]) > token_budget:
+            end = end * 3 // 4
+        return ScoredSection(hit.section, hit.score, hit.start, hit.start + end, estimate_tokens(text[:end]))
@@ -0,0 +1,345 @@
+"""Offline, CJK-aware token estimation.
+
+No tokenizer is shipped with the model clients, so prompt sizes are
+estimated from character classes: CJK characters cost roughly one token
+each, while Latin text averages about four characters per token. The
+estimate deliberately errs on the high side.
+
+On top of the estimate, `plan_call` / `budgeted_completion` size each
+LLM call: prompt tokens are estimated (and calibrated against reported
+usage), and max_tokens follows the expected output shape while leaving
+the prompt room in the model's context window.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .call_stats import get_latency_stats
+from .config_loader import get_config
+from .file_utils import dumps_json_line
+
+logger = logging.getLogger(__name__)
+
+# CJK ideographs, kana, hangul and full-width punctuation.
+_CJK_RE = re.compile(
+    "[\u2e80-\u2fff\u3000-\u303f\u3040-\u30ff\u3100-\u318f"
+    "\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+_WS_RE = re.compile(r"\s+")
+
+CJK_TOKENS_PER_CHAR = 1.0
+OTHER_CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text.
+
+    Args:
+        text: Prompt or document text
+
+    Returns:
+        Estimated tokens (0 for empty text)
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    # Runs of whitespace mostly merge into neighbouring tokens.
+    other = len(_WS_RE.sub(" ", text)) - cjk
+    return int(cjk * CJK_TOKENS_PER_CHAR + max(other, 0) / OTHER_CHARS_PER_TOKEN + 0.999)
+
+
+# --- Call budgeting -------------------------------------------------------
+
+# Role markers and separators added per chat message.
+MESSAGE_OVERHEAD_TOKENS = 4
+# Head room kept free in the context window for estimation error.
+WINDOW_SAFETY_MARGIN = 256
+DEFAULT_CONTEXT_WINDOW = 32768
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+
+
+@dataclass(frozen=True)
+class OutputShape:
+    """Expected completion size: base + per_unit * units, clamped to [floor, cap]."""
+
+    base: int
+    per_unit: float = 0.0
+    floor: int = 0
+    cap: int = 8192
+
+
+OUTPUT_SHAPES: Dict[str, OutputShape] = {
+    # Structured JSON grows with the PRD (units = PRD tokens).
+    "parsed_requirement": OutputShape(base=1000, per_unit=0.6, floor=2000, cap=8000),
+    # Dimensions and scene rules grow with the feature count (units = features).
+    "walkthrough_rule": OutputShape(base=2500, per_unit=200, floor=3000, cap=8000),
+    # 3-8 steps as a JSON array.
+    "testcase_steps": OutputShape(base=600, floor=300, cap=800),
+    # One short paragraph.
+    "expected_result": OutputShape(base=300, floor=150, cap=300),
+}
+
+
+def estimate_messages_tokens(messages: List[Dict[str, Any]]) -> int:
+    """
+    Estimate the prompt tokens of a chat request.
+
+    Args:
+        messages: Chat messages ({"role", "content"}); list contents are
+            counted by their text parts
+
+    Returns:
+        Estimated prompt tokens
+    """
+    total = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(
+                str(part.get("text", "")) if isinstance(part, dict) else str(part) for part in content
+            )
+        total += estimate_tokens(str(content)) + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
+def get_context_window() -> int:
+    """Model context window in tokens (QA_AGENT_CONTEXT_WINDOW, else global.context_window_tokens)."""
+    value = os.getenv("QA_AGENT_CONTEXT_WINDOW")
+    if value:
+        return int(value)
+    return int(get_config("context_window_tokens", DEFAULT_CONTEXT_WINDOW))
+
+
+def get_max_output_tokens() -> int:
+    """Provider's completion limit (QA_AGENT_MAX_OUTPUT_TOKENS, else global.max_output_tokens)."""
+    value = os.getenv("QA_AGENT_MAX_OUTPUT_TOKENS")
+    if value:
+        return int(value)
+    return int(get_config("max_output_tokens", DEFAULT_MAX_OUTPUT_TOKENS))
+
+
+def desired_output_tokens(shape: str, units: float = 0) -> int:
+    """Completion size wanted for an output shape, ignoring the window.
+
+    Shape caps are further clamped to the provider's output limit.
+    """
+    spec = OUTPUT_SHAPES[shape]
+    want = int(spec.base + spec.per_unit * units)
+    return min(get_max_output_tokens(), max(spec.floor, min(spec.cap, want)))
+
+
+def adaptive_max_tokens(
+    shape: str,
+    units: float = 0,
+    prompt_tokens: int = 0,
+    context_window: Optional[int] = None,
+) -> int:
+    """
+    Pick max_tokens for a call from its expected output shape.
+
+    Args:
+        shape: Key of OUTPUT_SHAPES
+        units: Size driver of the shape (PRD tokens, feature count, ...)
+        prompt_tokens: Estimated prompt tokens
+        context_window: Window to fit in (defaults to get_context_window())
+
+    Returns:
+        max_tokens, never more than the window leaves for the completion
+    """
+    window = context_window or get_context_window()
+    available = window - prompt_tokens - WINDOW_SAFETY_MARGIN
+    return max(1, min(desired_output_tokens(shape, units), available))
+
+
+def trim_to_tokens(text: str, max_tokens: int, suffix: str = "...") -> str:
+    """
+    Cut text to at most max_tokens (estimated), keeping the beginning.
+
+    Args:
+        text: Text to trim
+        max_tokens: Token allowance
+        suffix: Appended when text was cut
+
+    Returns:
+        Text unchanged if it fits, else its longest fitting prefix plus suffix
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    allowance = max_tokens - estimate_tokens(suffix)
+    if allowance <= 0:
+        return ""
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= allowance:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + suffix
+
+
+@dataclass
+class CallBudget:
+    """Token plan of one LLM call."""
+
+    shape: str
+    prompt_tokens: int
+    max_tokens: int
+    context_window: int
+
+    @property
+    def fits(self) -> bool:
+        """Whether the prompt leaves the shape's minimum completion room."""
+        return self.max_tokens >= OUTPUT_SHAPES[self.shape].floor
+
+
+def plan_call(shape: str, messages: List[Dict[str, Any]], units: float = 0) -> CallBudget:
+    """
+    Estimate prompt tokens (calibrated by observed usage) and choose max_tokens.
+
+    Args:
+        shape: Key of OUTPUT_SHAPES
+        messages: Chat messages to be sent
+        units: Size driver of the shape
+
+    Returns:
+        CallBudget for the call
+    """
+    window = get_context_window()
+    prompt_tokens = get_usage_calibrator().calibrate(estimate_messages_tokens(messages))
+    return CallBudget(
+        shape=shape,
+        prompt_tokens=prompt_tokens,
+        max_tokens=adaptive_max_tokens(shape, units, prompt_tokens, window),
+        context_window=window,
+    )
+
+
+class UsageCalibrator:
+    """Compare prompt estimates with the provider's reported usage.
+
+    Samples accumulate per process; once enough are seen, `calibrate`
+    scales raw estimates by the observed actual/estimated ratio. When
+    QA_AGENT_TOKEN_LOG is set, each sample is also appended to that JSONL
+    file for offline analysis.
+    """
+
+    MIN_SAMPLES = 5
+    RATIO_BOUNDS = (0.5, 2.0)
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.log_path = log_path if log_path is not None else os.getenv("QA_AGENT_TOKEN_LOG")
+        self._lock = threading.Lock()
+        self._estimated = 0
+        self._actual = 0
+        self._samples = 0
+        self._completion_tokens = 0
+        self._max_tokens = 0
+
+    def record(self, budget: CallBudget, usage: Optional[Dict[str, int]]) -> None:
+        """
+        Record one call.
+
+        Args:
+            budget: Plan the call was made with
+            usage: ModelResponse.usage (ignored when the provider omits it)
+        """
+        if not usage or not usage.get("prompt_tokens"):
+            return
+        actual = int(usage["prompt_tokens"])
+        completion = int(usage.get("completion_tokens") or 0)
+        with self._lock:
+            self._estimated += budget.prompt_tokens
+            self._actual += actual
+            self._samples += 1
+            self._completion_tokens += completion
+            self._max_tokens += budget.max_tokens
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(dumps_json_line({
+                    "shape": budget.shape,
+                    "estimated_prompt_tokens": budget.prompt_tokens,
+                    "prompt_tokens": actual,
+                    "max_tokens": budget.max_tokens,
+                    "completion_tokens": completion,
+                }) + "\n")
+
+    def ratio(self) -> float:
+        """Observed actual/estimated prompt tokens (1.0 until MIN_SAMPLES calls)."""
+        with self._lock:
+            if self._samples < self.MIN_SAMPLES or not self._estimated:
+                return 1.0
+            ratio = self._actual / self._estimated
+        low, high = self.RATIO_BOUNDS
+        return min(high, max(low, ratio))
+
+    def calibrate(self, estimated: int) -> int:
+        return int(estimated * self.ratio() + 0.5)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "samples": self._samples,
+                "estimated_prompt_tokens": self._estimated,
+                "prompt_tokens": self._actual,
+                "completion_tokens": self._completion_tokens,
+                "max_tokens": self._max_tokens,
+            }
+
+
+_calibrator: Optional[UsageCalibrator] = None
+
+
+def get_usage_calibrator() -> UsageCalibrator:
+    """Process-wide calibrator."""
+    global _calibrator
+    if _calibrator is None:
+        _calibrator = UsageCalibrator()
+    return _calibrator
+
+
+def budgeted_completion(
+    model_client: Any,
+    messages: List[Dict[str, Any]],
+    shape: str,
+    units: float = 0,
+    **kwargs: Any,
+) -> Any:
+    """
+    Call `model_client.chat_completion` with an adaptive max_tokens.
+
+    Args:
+        model_client: BaseModelClient
+        messages: Chat messages
+        shape: Key of OUTPUT_SHAPES
+        units: Size driver of the shape
+        **kwargs: Passed to chat_completion (temperature, model, ...); the
+            model defaults to the shape's tier from task_model()
+
+    Returns:
+        ModelResponse
+    """
+    if kwargs.get("model") is None:
+        # Local import: model_factory imports the clients, which import this module.
+        from ..models.model_factory import task_model
+
+        model = task_model(model_client, shape)
+        if model:
+            kwargs["model"] = model
+    budget = plan_call(shape, messages, units)
+    if not budget.fits:
+        logger.warning(
+            f"Prompt for {shape} (~{budget.prompt_tokens} tokens) leaves only "
+            f"{budget.max_tokens} tokens of a {budget.context_window}-token window"
+        )
+    started = time.monotonic()
+    response = model_client.chat_completion(messages=messages, max_tokens=budget.max_tokens, **kwargs)
+    get_latency_stats().record(shape, time.monotonic() - started)
+    get_usage_calibrator().record(budget, getattr(response, "usage", None))
+    return response
@@ -0,0 +1,113 @@
+"""Minimal in-process Elasticsearch stand-in for indexer/sync tests.
+
+Implements just enough of the REST API: `_bulk`, `_settings`, `_refresh`
+and `_search` sorted by `case_id` with `search_after`.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ESStandIn:
+    """Record requests and keep documents in memory."""
+
+    def __init__(self, fail_first: int = 0):
+        self.docs = {}
+        self.settings = {"index.refresh_interval": "1s", "index.number_of_replicas": "1"}
+        self.settings_history = []
+        self.bulk_requests = 0
+        self._fail_first = fail_first
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _bulk(self, body):
+        lines = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        items = []
+        i = 0
+        with self._lock:
+            self.bulk_requests += 1
+            while i < len(lines):
+                op, meta = next(iter(lines[i].items()))
+                i += 1
+                if op == "index":
+                    if self._fail_first > 0:
+                        self._fail_first -= 1
+                        items.append({op: {"_id": meta["_id"], "status": 429, "error": {"type": "es_rejected_execution_exception"}}})
+                    else:
+                        self.docs[meta["_id"]] = lines[i]
+                        items.append({op: {"_id": meta["_id"], "status": 201}})
+                    i += 1
+                elif op == "delete":
+                    existed = self.docs.pop(meta["_id"], None) is not None
+                    items.append({op: {"_id": meta["_id"], "status": 200 if existed else 404}})
+        return {"errors": any(next(iter(it.values()))["status"] >= 300 for it in items), "items": items}
+
+    def _search(self, body):
+        size = body.get("size", 10)
+        after = (body.get("search_after") or [None])[0]
+        with self._lock:
+            ids = sorted(self.docs)
+        if after is not None:
+            ids = [i for i in ids if i > after]
+        hits = [{"_id": i, "sort": [i]} for i in ids[:size]]
+        return {"hits": {"hits": hits}}
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, payload, status=200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def do_GET(self):
+                if "/_settings" in self.path:
+                    self._reply({"test_case_index": {"settings": dict(standin.settings)}})
+                else:
+                    self._reply({}, 404)
+
+            def do_PUT(self):
+                body = json.loads(self._body() or b"{}")
+                if self.path.endswith("/_settings"):
+                    index_settings = body.get("index", {})
+                    standin.settings_history.append(index_settings)
+                    for key, value in index_settings.items():
+                        standin.settings[f"index.{key}"] = str(value)
+                self._reply({"acknowledged": True})
+
+            def do_POST(self):
+                body = self._body()
+                if self.path.startswith("/_bulk"):
+                    self._reply(standin._bulk(body))
+                elif self.path.endswith("/_search"):
+                    self._reply(standin._search(json.loads(body or b"{}")))
+                else:
+                    self._reply({"acknowledged": True})
+
+        return Handler
@@ -0,0 +1,159 @@
+"""Unit tests for batch completions and micro-batching of concurrent calls."""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.models.base import BaseModelClient, ModelResponse
+from src.models.batching import BatchingModelClient
+from src.models.g2m_client import G2MClient
+from src.utils.exceptions import ModelAPIError
+
+
+class _EchoClient(BaseModelClient):
+    """Echoes the last message; records batch sizes."""
+
+    def __init__(self, error=None):
+        self.batch_sizes = []
+        self.error = error
+        # The first batch blocks until `gate` is set, keeping the backend busy.
+        self.gate = threading.Event()
+        self.busy = threading.Event()
+
+    def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content=messages[-1]["content"], model="mock")
+
+    def multimodal_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content="", model="mock")
+
+    def batch_completion(self, messages_list, **kwargs):
+        self.batch_sizes.append(len(messages_list))
+        if len(self.batch_sizes) == 1:
+            self.busy.set()
+            self.gate.wait(5)
+        if self.error:
+            raise self.error
+        return super().batch_completion(messages_list, **kwargs)
+
+
+def _user(text):
+    return [{"role": "user", "content": text}]
+
+
+class TestBatchCompletion:
+    """Default fallback and native G2M multi-prompt requests."""
+
+    def test_default_keeps_input_order(self):
+        client = _EchoClient()
+        responses = BaseModelClient.batch_completion(client, [_user(str(i)) for i in range(5)])
+        assert [r.content for r in responses] == ["0", "1", "2", "3", "4"]
+
+    def test_g2m_sends_prompts_in_one_request(self):
+        client = G2MClient(api_key="test_key")
+        client.max_batch_size = 2
+        responses = [
+            {
+                "choices": [{"index": 1, "text": "B"}, {"index": 0, "text": "A"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 4, "total_tokens": 14},
+            },
+            {"choices": [{"index": 0, "text": "C"}]},
+        ]
+        with patch.object(client, "_make_request", side_effect=responses) as mock_request:
+            with patch.object(client, "chat_completion", return_value=ModelResponse(content="C", model="m")):
+                results = client.batch_completion([_user("问题一"), _user("问题二"), _user("问题三")], max_tokens=50)
+
+        payload = mock_request.call_args_list[0].args[1]
+        assert payload["prompt"] == ["User: 问题一", "User: 问题二"]
+        assert payload["max_tokens"] == 50
+        assert [r.content for r in results] == ["A", "B", "C"]
+        assert sum(r.usage["prompt_tokens"] for r in results[:2]) == 10
+        assert sum(r.usage["completion_tokens"] for r in results[:2]) == 4
+
+    def test_g2m_missing_choice_raises(self):
+        client = G2MClient(api_key="test_key")
+        with patch.object(client, "_make_request", return_value={"choices": [{"index": 0, "text": "A"}]}):
+            with pytest.raises(ModelAPIError, match="no choice"):
+                client.batch_completion([_user("a"), _user("b")])
+
+
+class TestBatchingModelClient:
+    """Concurrent calls with the same parameters share one batch."""
+
+    def _run(self, client, calls):
+        """Run calls concurrently while a first call keeps the backend busy."""
+        inner = client.client
+        blocker = threading.Thread(target=lambda: self._call(client, "busy", max_tokens=1))
+        blocker.start()
+        assert inner.busy.wait(5)
+        results = [None] * len(calls)
+
+        def _worker(i, kwargs):
+            try:
+                results[i] = client.chat_completion(_user(str(i)), **kwargs).content
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=_worker, args=(i, kw)) for i, kw in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        inner.gate.set()
+        blocker.join()
+        return results
+
+    @staticmethod
+    def _call(client, text, **kwargs):
+        try:
+            return client.chat_completion(_user(text), **kwargs)
+        except Exception:
+            return None
+
+    def test_concurrent_calls_are_batched(self):
+        inner = _EchoClient()
+        client = BatchingModelClient(inner, max_batch_size=4, max_wait_seconds=5)
+        results = self._run(client, [{"max_tokens": 100}] * 4)
+
+        assert results == ["0", "1", "2", "3"]
+        assert inner.batch_sizes == [1, 4]
+        assert client.stats() == {"batches": 2, "calls": 5}
+
+    def test_call_is_sent_at_once_when_idle(self):
+        inner = _EchoClient()
+        inner.gate.set()
+        client = BatchingModelClient(inner, max_batch_size=4, max_wait_seconds=5)
+        started = time.monotonic()
+        assert client.chat_completion(_user("solo")).content == "solo"
+        assert time.monotonic() - started < 1
+
+    def test_collected_calls_are_sent_when_backend_frees(self):
+        inner = _EchoClient()
+        client = BatchingModelClient(inner, max_batch_size=8, max_wait_seconds=5)
+        blocker = threading.Thread(target=lambda: self._call(client, "busy"))
+        blocker.start()
+        assert inner.busy.wait(5)
+        waiter = threading.Thread(target=lambda: self._call(client, "queued", max_tokens=1))
+        waiter.start()
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        inner.gate.set()
+        waiter.join()
+        blocker.join()
+        assert time.monotonic() - started < 1
+        assert inner.batch_sizes == [1, 1]
+
+    def test_different_parameters_are_not_mixed(self):
+        inner = _EchoClient()
+        client = BatchingModelClient(inner, max_batch_size=2, max_wait_seconds=5)
+        self._run(client, [{"max_tokens": 100}, {"max_tokens": 200}, {"max_tokens": 100}, {"max_tokens": 200}])
+        assert inner.batch_sizes[0] == 1
+        assert sorted(inner.batch_sizes[1:]) == [2, 2]
+
+    def test_batch_errors_reach_every_call(self):
+        inner = _EchoClient(error=ModelAPIError("down", status_code=503))
+        client = BatchingModelClient(inner, max_batch_size=2, max_wait_seconds=5)
+        results = self._run(client, [{}, {}])
+        assert all(isinstance(r, ModelAPIError) for r in results)
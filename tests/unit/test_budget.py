@@ -0,0 +1,234 @@
+"""Unit tests for LLM budgets, degradation and generation planning."""
+
+import pytest
+
+from src.agents import testcase_generator
+from src.agents.requirement_parser import Feature, Flow, Module, ParsedRequirement
+from src.models.base import BaseModelClient, ModelResponse
+from src.models.budget import BudgetAccountant, BudgetedModelClient, DegradeLevel, TimeBudget
+from src.utils.call_stats import LatencyStats
+from src.utils.exceptions import BudgetExceededError
+
+_RULE = {
+    "scenario_dimensions": [
+        {"dimension_id": "normal", "name": "正常"},
+        {"dimension_id": "error", "name": "异常", "applies_to_flow_types": ["exception"]},
+    ],
+    "testcase_template": {"fields": {"steps": {"strategy": "llm_generate_list"}}},
+}
+
+
+class _CountingClient(BaseModelClient):
+    def __init__(self, usage=None):
+        self.calls = 0
+        self.usage = usage
+
+    def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        self.calls += 1
+        if "生成详细的测试步骤" in messages[-1]["content"]:
+            return ModelResponse(content='["打开页面", "点击登录"]', model="mock", usage=self.usage)
+        return ModelResponse(content="登录成功", model="mock", usage=self.usage)
+
+    def multimodal_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content="", model="mock")
+
+
+def _requirement(flows: int = 3) -> ParsedRequirement:
+    feature = Feature(
+        id="f1",
+        name="账号登录",
+        flows=[
+            Flow(id="happy", name="正常登录", type="happy"),
+            Flow(id="bad_pwd", name="密码错误", type="exception", steps=["输入错误密码"]),
+            Flow(id="long_pwd", name="超长密码", type="boundary"),
+        ][:flows],
+    )
+    return ParsedRequirement(project_name="p", modules=[Module(id="m1", name="登录", features=[feature])])
+
+
+class TestBudgetAccountant:
+    """Limits, degradation levels and charging."""
+
+    def test_levels_follow_used_fraction(self):
+        accountant = BudgetAccountant(max_llm_calls=10)
+        assert accountant.level() == DegradeLevel.NORMAL
+        for _ in range(8):
+            accountant.reserve(10, 10)
+        assert accountant.level() == DegradeLevel.REUSE_STEPS
+        accountant.reserve(10, 10)
+        assert accountant.level() == DegradeLevel.TEMPLATE_EXPECTED
+        accountant.reserve(10, 10)
+        assert accountant.level() == DegradeLevel.STOP
+        with pytest.raises(BudgetExceededError) as exc:
+            accountant.reserve(10, 10)
+        assert exc.value.limit == "max_llm_calls"
+
+    def test_refuses_calls_that_would_overflow_tokens(self):
+        accountant = BudgetAccountant(max_tokens_total=1000)
+        reserved = accountant.reserve(100, 300)
+        accountant.charge(100, 50, reserved)
+        with pytest.raises(BudgetExceededError):
+            accountant.reserve(200, 800)
+        assert accountant.level() == DegradeLevel.STOP
+        assert accountant.summary()["refused_calls"] == 1
+
+    def test_in_flight_calls_count_against_tokens(self):
+        accountant = BudgetAccountant(max_tokens_total=1000)
+        first = accountant.reserve(100, 300)
+        accountant.reserve(100, 300)
+        # Nothing is charged yet, but 800 tokens are already promised.
+        with pytest.raises(BudgetExceededError):
+            accountant.reserve(100, 300)
+        accountant.charge(100, 20, first)
+        accountant.reserve(100, 300)
+        assert accountant.pending_tokens == 800
+
+    def test_client_charges_reported_usage_or_estimate(self):
+        accountant = BudgetAccountant()
+        client = BudgetedModelClient(_CountingClient(usage={"prompt_tokens": 40, "completion_tokens": 5}), accountant)
+        client.chat_completion([{"role": "user", "content": "你好"}])
+        assert (accountant.prompt_tokens, accountant.completion_tokens) == (40, 5)
+
+        accountant = BudgetAccountant()
+        client = BudgetedModelClient(_CountingClient(), accountant)
+        client.chat_completion([{"role": "user", "content": "你好"}])
+        assert accountant.prompt_tokens == 2 + 4
+        assert accountant.completion_tokens == 4
+
+
+class TestGeneratorDegradation:
+    """Generation steps down instead of failing when the budget runs out."""
+
+    def test_unlimited_budget_generates_everything(self):
+        inner = _CountingClient()
+        client = BudgetedModelClient(inner, BudgetAccountant())
+        result = testcase_generator.TestCaseGenerator(client, max_workers=1).generate_testcases(_requirement(), _RULE)
+
+        assert len(result["testcases"]) == 4
+        assert result["stopped_early"] is False
+        # Steps for the two flows without steps, expected results for all four cases.
+        assert inner.calls == 2 + 4
+
+    def test_exhausted_budget_stops_with_partial_output(self):
+        inner = _CountingClient()
+        client = BudgetedModelClient(inner, BudgetAccountant(max_llm_calls=3))
+        result = testcase_generator.TestCaseGenerator(client, max_workers=1).generate_testcases(_requirement(), _RULE)
+
+        # Case 1 uses two calls, case 2 (flow steps reused) one; then the budget is spent.
+        assert result["stopped_early"] is True
+        assert len(result["testcases"]) == 2
+        assert inner.calls == 3
+
+    def test_refused_call_falls_back_to_template(self):
+        inner = _CountingClient(usage={"prompt_tokens": 600, "completion_tokens": 100})
+        client = BudgetedModelClient(inner, BudgetAccountant(max_tokens_total=1000))
+        result = testcase_generator.TestCaseGenerator(client, max_workers=1).generate_testcases(_requirement(flows=1), _RULE)
+
+        # The steps call fits; after its reported usage the expected-result reservation does not.
+        assert inner.calls == 1
+        assert result["testcases"][0]["steps"] == ["打开页面", "点击登录"]
+        assert result["testcases"][0]["expected_result"] == "账号登录功能正常执行，达到预期效果"
+
+    def test_reuse_steps_level_skips_step_generation(self):
+        accountant = BudgetAccountant(max_llm_calls=100, reuse_steps_at=0.0)
+        inner = _CountingClient()
+        generator = testcase_generator.TestCaseGenerator(BudgetedModelClient(inner, accountant), max_workers=1)
+        result = generator.generate_testcases(_requirement(flows=1), _RULE)
+
+        assert result["testcases"][0]["steps"] == ["执行账号登录的正常登录操作"]
+        assert inner.calls == 1
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _TickingClient(_CountingClient):
+    """Each call takes one second on the fake clock."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def chat_completion(self, messages, **kwargs):
+        self.clock.now += 1.0
+        return super().chat_completion(messages, **kwargs)
+
+
+class TestTimeBudget:
+    """Deadline-aware ordering and fallbacks."""
+
+    def test_remaining_excludes_reserve(self, tmp_path):
+        clock = _FakeClock()
+        budget = TimeBudget(100, latency=LatencyStats(str(tmp_path / "l.json")), clock=clock)
+        assert budget.reserve_seconds == 10
+        clock.now = 30
+        assert budget.remaining() == 60
+        assert budget.can_afford(["expected_result"] * 12)
+        assert not budget.can_afford(["expected_result"] * 13)
+
+    def test_required_and_happy_cases_get_llm_time_first(self, tmp_path):
+        latency = LatencyStats(str(tmp_path / "l.json"))
+        latency.record("testcase_steps", 1.0)
+        latency.record("expected_result", 1.0)
+        clock = _FakeClock()
+        rule = {
+            "scenario_dimensions": [
+                {"dimension_id": "normal", "name": "正常"},
+                {"dimension_id": "must", "name": "必测", "required": True},
+            ],
+            "testcase_template": _RULE["testcase_template"],
+        }
+        budget = TimeBudget(4.5, reserve_seconds=0, latency=latency, clock=clock)
+        generator = testcase_generator.TestCaseGenerator(_TickingClient(clock), time_budget=budget, max_workers=1)
+        result = generator.generate_testcases(_requirement(flows=2), rule)
+
+        cases = result["testcases"]
+        assert [c["_metadata"]["dimension_id"] for c in cases] == ["normal", "must", "normal", "must"]
+        by_key = {(c["_metadata"]["flow_id"], c["_metadata"]["dimension_id"]): c for c in cases}
+        # Required cases run first with full LLM work (2 + 1 calls, 3s) ...
+        assert by_key[("happy", "must")]["steps"] == ["打开页面", "点击登录"]
+        assert by_key[("bad_pwd", "must")]["expected_result"] == "登录成功"
+        # ... the happy path then only fits its expected result, and nothing else fits.
+        assert by_key[("happy", "normal")]["steps"] == ["执行账号登录的正常登录操作"]
+        assert by_key[("happy", "normal")]["expected_result"] == "登录成功"
+        assert by_key[("bad_pwd", "normal")]["expected_result"] == "账号登录功能正常执行，达到预期效果"
+        assert result["degraded_cases"] == 2
+
+
+class TestGenerationPlan:
+    """Pre-run estimates mirror the generation matrix."""
+
+    def test_plan_counts_calls_without_calling_model(self, tmp_path):
+        inner = _CountingClient()
+        plan = testcase_generator.TestCaseGenerator(inner).plan_testcases(
+            _requirement(), _RULE, prd_content="# 账号登录\n\n输入账号密码登录。\n"
+        )
+
+        assert inner.calls == 0
+        assert plan.cases == 4
+        assert plan.calls == {"testcase_steps": 2, "expected_result": 4}
+        assert plan.prompt_tokens["expected_result"] > 0
+        assert plan.completion_tokens["expected_result"] == 4 * 300
+
+        latency = LatencyStats(str(tmp_path / "latency.json"))
+        latency.record("testcase_steps", 10.0)
+        latency.record("expected_result", 4.0)
+        assert plan.wall_seconds(latency, concurrency=1) == pytest.approx(2 * 10 + 4 * 4)
+        assert plan.wall_seconds(latency, concurrency=6) == pytest.approx(36 / 6)
+
+    def test_latency_stats_persist(self, tmp_path):
+        path = tmp_path / "stats" / "latency.json"
+        stats = LatencyStats(str(path))
+        assert stats.mean("expected_result") == 5.0
+        stats.record("expected_result", 2.0)
+        stats.record("expected_result", 4.0)
+        stats.save()
+
+        reloaded = LatencyStats(str(path))
+        assert reloaded.count("expected_result") == 2
+        assert reloaded.mean("expected_result") == pytest.approx(2.4)
@@ -0,0 +1,86 @@
+"""Unit tests for the CLI commands (model calls are stubbed)."""
+
+import json
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+from typer.testing import CliRunner
+
+from cli import main as cli_main
+from src.models.base import BaseModelClient, ModelResponse
+
+runner = CliRunner()
+
+PARSED = {
+    "project_name": "demo",
+    "modules": [
+        {
+            "id": "M001",
+            "name": "语音",
+            "features": [
+                {"id": "F001", "name": "唤醒", "flows": [{"id": "flow_1", "name": "正常唤醒", "type": "happy"}]}
+            ],
+        }
+    ],
+    "metadata": {},
+}
+
+RULE = {
+    "rule_id": "rule_demo",
+    "scenario_dimensions": [{"dimension_id": "D1", "name": "正常"}],
+    "testcase_template": {},
+}
+
+
+class _StubClient(BaseModelClient):
+    def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content="[]", model="stub")
+
+    def multimodal_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content="", model="stub")
+
+
+def _stub_clients(agents, provider):
+    client = _StubClient()
+    return {agent: client for agent in agents}
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def _log_to_tmp(tmp_path):
+    """Keep the commands' log files out of outputs/logs."""
+    with patch.object(cli_main, "setup_logger", partial(cli_main.setup_logger, log_dir=str(tmp_path / "logs"))):
+        yield
+
+
+class TestCliCommands:
+    """Commands run end to end with --parsed/--rule inputs."""
+
+    def test_rule_with_budget_options(self, tmp_path):
+        parsed = _write(tmp_path / "parsed.json", PARSED)
+        with patch.object(cli_main, "create_agent_clients", _stub_clients), \
+                patch.object(cli_main.RuleGenerator, "generate_rule", return_value=RULE):
+            result = runner.invoke(
+                cli_main.app,
+                ["rule", "--parsed", parsed, "--output", str(tmp_path / "out"),
+                 "--max-tokens-total", "10000", "--max-llm-calls", "5"],
+            )
+
+        assert result.exit_code == 0, result.output
+        assert list((tmp_path / "out" / "rules").glob("demo_rule_*.json"))
+
+    def test_cases_plan_from_parsed_and_rule(self, tmp_path):
+        parsed = _write(tmp_path / "parsed.json", PARSED)
+        rule = _write(tmp_path / "rule.json", RULE)
+        with patch.object(cli_main, "create_agent_clients", _stub_clients):
+            result = runner.invoke(
+                cli_main.app,
+                ["cases", "--parsed", parsed, "--rule", rule, "--plan", "--output", str(tmp_path / "out")],
+            )
+
+        assert result.exit_code == 0, result.output
@@ -0,0 +1,94 @@
+"""Unit tests for the entity codec and datetime helpers."""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src.entities import EntityCodec, db_models, format_datetime, parse_datetime
+from src.entities.db_models import DATETIME_FMT
+
+
+def _row(**overrides):
+    row = {
+        "case_id": "case_1",
+        "module": "module_a",
+        "feature": "feature_x",
+        "title": "登录",
+        "steps_path": "steps/case_1_steps.txt",
+        "expected_result_path": "expected/case_1_expected.txt",
+        "level": "P1",
+        "status": "OK",
+        "create_time": "2025-01-02 03:04:05",
+        "update_time": "2025-01-02 03:04:05",
+    }
+    row.update(overrides)
+    return row
+
+
+class TestDatetimeHelpers:
+    """Fixed-format parse/format."""
+
+    def test_round_trip(self):
+        value = parse_datetime("2025-01-02 03:04:05")
+        assert value == datetime(2025, 1, 2, 3, 4, 5)
+        assert format_datetime(value) == "2025-01-02 03:04:05"
+
+    def test_matches_strftime_for_aware_and_early_values(self):
+        values = [
+            datetime(2025, 1, 2, 3, 4, 5, 678, tzinfo=timezone.utc),
+            datetime(999, 1, 2, 3, 4, 5),
+        ]
+        for value in values:
+            assert format_datetime(value) == value.strftime(DATETIME_FMT)
+        assert parse_datetime(format_datetime(values[0])) == datetime(2025, 1, 2, 3, 4, 5)
+
+    def test_rejects_other_formats(self):
+        with pytest.raises(ValueError):
+            parse_datetime("2025-01-02T03:04:05")
+
+
+class TestEntityCodec:
+    """Validated and trusted decoding produce the same entities."""
+
+    def test_trusted_matches_validated(self):
+        validated = EntityCodec(db_models.TestCase, trusted=False).decode(_row())
+        trusted = EntityCodec(db_models.TestCase, trusted=True).decode(_row(extra_column="ignored"))
+
+        assert trusted == validated
+        assert trusted.create_time == datetime(2025, 1, 2, 3, 4, 5)
+        assert trusted.model_dump_json() == validated.model_dump_json()
+
+    def test_trusted_falls_back_to_validation_on_missing_fields(self):
+        row = _row()
+        del row["title"]
+        with pytest.raises(ValueError):
+            EntityCodec(db_models.TestCase, trusted=True).decode(row)
+
+    def test_encode_line_applies_defaults_and_serializers(self):
+        codec = EntityCodec(db_models.TestCaseIndexDocument, trusted=True)
+        doc = codec.decode_line(
+            json.dumps(
+                {
+                    "case_id": "c",
+                    "title": "t",
+                    "module_id": "m",
+                    "module_name": "m",
+                    "status": "NA",
+                    "steps": "s",
+                    "expected_result": "e",
+                    "create_time": "2025-01-02 03:04:05",
+                }
+            )
+        )
+
+        line = json.loads(codec.encode_line(doc))
+        assert line["scene_ids"] == []
+        assert line["create_time"] == "2025-01-02 03:04:05"
+
+    def test_mode_switch_from_env(self, monkeypatch):
+        monkeypatch.setenv("ENTITY_CODEC_MODE", "trusted")
+        assert EntityCodec(db_models.TestCase).trusted is True
+        monkeypatch.setenv("ENTITY_CODEC_MODE", "bogus")
+        with pytest.raises(ValueError):
+            EntityCodec(db_models.TestCase)
@@ -0,0 +1,154 @@
+"""Unit tests for adaptive concurrency control of model calls."""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from src.agents import testcase_generator
+from src.agents.requirement_parser import Feature, Flow, Module, ParsedRequirement
+from src.models.base import BaseModelClient, ModelResponse
+from src.models.concurrency import ConcurrencyGovernor, is_overload_error
+from src.utils.error_handler import safe_model_call
+from src.utils.exceptions import ModelAPIError, ModelTimeoutError
+
+
+class TestOverloadDetection:
+    """Which errors shrink the window."""
+
+    def test_rate_limits_server_errors_and_timeouts(self):
+        assert is_overload_error(ModelAPIError("busy", status_code=429))
+        assert is_overload_error(ModelAPIError("down", status_code=503))
+        assert is_overload_error(ModelTimeoutError("slow"))
+        assert not is_overload_error(ModelAPIError("bad request", status_code=400))
+        assert not is_overload_error(ModelAPIError("no status"))
+
+    def test_status_from_http_response(self):
+        response = requests.Response()
+        response.status_code = 429
+        assert is_overload_error(requests.exceptions.HTTPError("429", response=response))
+
+
+class TestConcurrencyGovernor:
+    """Additive increase, multiplicative decrease."""
+
+    def test_window_grows_while_healthy(self):
+        governor = ConcurrencyGovernor("test", min_limit=1, max_limit=3, initial=1)
+        with governor.slot():
+            pass
+        assert governor.limit == 2
+        # Roughly one slot per window's worth of successes, capped at max.
+        for _ in range(2):
+            with governor.slot():
+                pass
+        assert governor.limit == 2
+        for _ in range(10):
+            with governor.slot():
+                pass
+        assert governor.limit == 3
+
+    def test_overload_halves_once_per_window(self):
+        governor = ConcurrencyGovernor("test", min_limit=1, max_limit=8, initial=8)
+        tickets = [governor.acquire() for _ in range(4)]
+        for ticket in tickets:
+            governor.release(ticket, 0.1, overloaded=True)
+        # Four failures from the same wave count as one congestion signal.
+        assert governor.limit == 4
+        assert governor.snapshot()["overloads"] == 4
+
+        with pytest.raises(ModelAPIError):
+            with governor.slot():
+                raise ModelAPIError("rate limited", status_code=429)
+        assert governor.limit == 2
+
+    def test_other_failures_leave_window_alone(self):
+        governor = ConcurrencyGovernor("test", min_limit=1, max_limit=8, initial=2)
+        for _ in range(5):
+            with pytest.raises(ModelAPIError):
+                with governor.slot():
+                    raise ModelAPIError("bad request", status_code=400)
+
+        snapshot = governor.snapshot()
+        assert governor.limit == 2
+        assert governor.in_flight == 0
+        assert (snapshot["successes"], snapshot["failures"]) == (0, 5)
+
+    def test_rising_p95_shrinks_window(self):
+        governor = ConcurrencyGovernor("test", min_limit=1, max_limit=8, initial=8, latency_target=1.0)
+        for _ in range(9):
+            governor.release(governor.acquire(), 0.5)
+        assert governor.limit == 8
+        governor.release(governor.acquire(), 5.0)
+        assert governor.limit == 4
+
+    def test_in_flight_never_exceeds_window(self):
+        governor = ConcurrencyGovernor("test", min_limit=2, max_limit=2)
+        peak = 0
+        lock = threading.Lock()
+
+        def _work():
+            nonlocal peak
+            with governor.slot():
+                with lock:
+                    peak = max(peak, governor.in_flight)
+                time.sleep(0.01)
+
+        threads = [threading.Thread(target=_work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak == 2
+        assert governor.snapshot()["in_flight"] == 0
+
+    def test_safe_model_call_holds_slot_per_attempt(self):
+        governor = ConcurrencyGovernor("test", min_limit=1, max_limit=8, initial=4)
+        attempts = []
+
+        def _flaky():
+            attempts.append(governor.in_flight)
+            if len(attempts) == 1:
+                raise ModelAPIError("busy", status_code=429)
+            return "ok"
+
+        assert safe_model_call(_flaky, max_retries=2, retry_delay=0, governor=governor) == "ok"
+        assert attempts == [1, 1]
+        assert governor.limit == 2
+
+
+class _SlowClient(BaseModelClient):
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return ModelResponse(content="登录成功", model="mock")
+
+    def multimodal_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content="", model="mock")
+
+
+class TestParallelGeneration:
+    """Cases are generated concurrently but returned in matrix order."""
+
+    def test_workers_run_in_parallel_and_keep_order(self):
+        flows = [Flow(id=f"flow_{i}", name=f"流程{i}", type="happy", steps=["打开页面"]) for i in range(6)]
+        requirement = ParsedRequirement(
+            project_name="p",
+            modules=[Module(id="m1", name="登录", features=[Feature(id="f1", name="账号登录", flows=flows)])],
+        )
+        rule = {"scenario_dimensions": [{"dimension_id": "normal", "name": "正常"}]}
+        client = _SlowClient()
+
+        result = testcase_generator.TestCaseGenerator(client, max_workers=3).generate_testcases(requirement, rule)
+
+        assert [c["_metadata"]["flow_id"] for c in result["testcases"]] == [f"flow_{i}" for i in range(6)]
+        assert 1 < client.peak <= 3
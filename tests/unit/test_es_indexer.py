@@ -0,0 +1,54 @@
+"""Unit tests for the bulk ES indexer against a local stand-in server."""
+
+from src.storage import ESBulkIndexer
+from src.utils.file_utils import write_jsonl_file
+from tests.unit.es_standin import ESStandIn
+
+
+def _docs(n):
+    return [{"case_id": f"case_{i:03d}", "title": f"用例{i}"} for i in range(n)]
+
+
+class TestESBulkIndexer:
+    """Bulk indexing behaviour."""
+
+    def test_streams_chunks_with_case_id_as_id(self):
+        with ESStandIn() as es:
+            indexer = ESBulkIndexer(es_host=es.url, es_index="test_case_index", chunk_size=10, max_workers=3)
+            result = indexer.index_documents(iter(_docs(35)))
+
+        assert result.indexed == 35
+        assert result.failed == 0
+        assert es.bulk_requests == 4
+        assert es.docs["case_007"]["title"] == "用例7"
+
+    def test_retries_rejected_items(self):
+        with ESStandIn(fail_first=3) as es:
+            indexer = ESBulkIndexer(es_host=es.url, es_index="test_case_index", chunk_size=5, backoff=0.01)
+            result = indexer.index_documents(_docs(5))
+
+        assert result.indexed == 5
+        assert result.failed == 0
+        assert es.bulk_requests == 2
+
+    def test_bulk_load_settings_are_restored(self, tmp_path):
+        path = tmp_path / "proj_es_docs_1.jsonl"
+        write_jsonl_file(str(path), _docs(3))
+        with ESStandIn() as es:
+            indexer = ESBulkIndexer(es_host=es.url, es_index="test_case_index")
+            with indexer.bulk_load_settings():
+                assert es.settings["index.refresh_interval"] == "-1"
+                result = indexer.index_jsonl(str(path))
+
+        assert result.indexed == 3
+        assert es.settings["index.refresh_interval"] == "1s"
+        assert es.settings["index.number_of_replicas"] == "1"
+
+    def test_delete_ignores_missing_ids(self):
+        with ESStandIn() as es:
+            indexer = ESBulkIndexer(es_host=es.url, es_index="test_case_index")
+            indexer.index_documents(_docs(2))
+            result = indexer.delete_documents(["case_000", "nope"])
+
+        assert (result.deleted, result.not_found, result.failed) == (1, 1, 0)
+        assert list(es.docs) == ["case_001"]
@@ -0,0 +1,167 @@
+"""Unit tests for ESSimilarityAgent."""
+
+from unittest.mock import Mock
+
+from src.agents.es_similarity_agent import ESSimilarityAgent
+from src.utils.file_utils import write_jsonl_file
+
+
+def _write_docs(tmp_path, docs, name="proj_es_docs_20250101_000000.jsonl"):
+    write_jsonl_file(str(tmp_path / name), docs)
+
+
+def _doc(case_id, title, steps="", expected=""):
+    return {"case_id": case_id, "title": title, "steps": steps, "expected_result": expected}
+
+
+class TestLocalSearch:
+    """Local JSONL search path."""
+
+    def _agent(self, tmp_path):
+        return ESSimilarityAgent(es_host="", default_docs_dir=str(tmp_path), project_name="proj")
+
+    def test_ranks_by_similarity_and_builds_diffs(self, tmp_path):
+        _write_docs(tmp_path, [
+            _doc("c1", "登录成功", "打开页面\n输入账号", "登录成功"),
+            _doc("c2", "登录失败", "打开页面\n输入错误账号", "提示错误"),
+            _doc("c3", "退出登录", "点击退出", "回到首页"),
+        ])
+        result = self._agent(tmp_path).search_similar(case_id="c1", top_k=2)
+
+        assert [h["case_id"] for h in result["results"]] == ["c1", "c2"]
+        first = result["diffs"][0]
+        assert first["title_similarity"] == 1.0
+        assert first["steps_diff"] == []
+        assert "_field_similarity" not in result["results"][0]
+        assert "steps_diff" in result["diffs"][1]
+
+    def test_min_similarity_drops_weak_hits(self, tmp_path):
+        _write_docs(tmp_path, [
+            _doc("c1", "登录成功", "打开页面", "登录成功"),
+            _doc("c2", "完全无关的标题", "xyz", "abc"),
+        ])
+        result = self._agent(tmp_path).search_similar(case_id="c1", top_k=5, min_similarity=0.5)
+
+        assert [h["case_id"] for h in result["results"]] == ["c1"]
+        assert len(result["diffs"]) == 1
+
+    def test_no_diff_mode_keeps_similarities(self, tmp_path):
+        _write_docs(tmp_path, [_doc("c1", "登录成功", "打开页面", "登录成功")])
+        result = self._agent(tmp_path).search_similar(query_text="登录", include_diff=False)
+
+        diff = result["diffs"][0]
+        assert "title_diff" not in diff
+        assert diff["title_similarity"] > 0
+
+    def test_pruning_matches_exhaustive_ranking(self, tmp_path):
+        docs = [_doc(f"c{i}", f"标题{i % 7}号用例{i}", f"步骤{i % 3}", f"结果{i % 5}") for i in range(60)]
+        _write_docs(tmp_path, docs)
+        agent = self._agent(tmp_path)
+
+        pruned = agent.search_similar(case_id="c10", top_k=5, include_diff=False)
+        exhaustive = agent._search_local(docs, None, docs[10], top_k=len(docs))
+
+        assert [h["case_id"] for h in pruned["results"]] == [h["case_id"] for h in exhaustive[:5]]
+
+
+    def test_docs_missing_fields_are_scored_on_the_rest(self, tmp_path):
+        _write_docs(tmp_path, [
+            _doc("c1", "登录成功", "打开页面", "登录成功"),
+            {"case_id": "c2", "title": "登录成功"},
+        ])
+        result = self._agent(tmp_path).search_similar(case_id="c1", top_k=5, min_similarity=0.5)
+
+        assert [h["case_id"] for h in result["results"]] == ["c1", "c2"]
+        assert result["diffs"][1]["steps_similarity"] is None
+
+class TestESSearch:
+    """ES request shaping against a mocked client."""
+
+    def _agent(self, **kwargs):
+        agent = ESSimilarityAgent(es_host="", es_index="test_case_index", **kwargs)
+        agent.client = Mock()
+        return agent
+
+    @staticmethod
+    def _response(*hits):
+        return {"hits": {"hits": [
+            {"_id": h[0], "_score": h[1], "_source": {"case_id": h[0], "title": h[2] if len(h) > 2 else h[0]},
+             "sort": [h[1], h[0]]}
+            for h in hits
+        ]}}
+
+    def test_body_has_source_filter_highlight_and_sort(self):
+        agent = self._agent(source_excludes=["steps"], sort=["create_time"], fragment_size=120)
+        body = agent._build_search_body("登录", None)
+
+        assert body["_source"] == {"excludes": ["steps"]}
+        assert body["highlight"]["fragment_size"] == 120
+        assert body["sort"] == [{"create_time": "desc"}]
+
+    def test_field_sort_keeps_scores_for_threshold(self):
+        agent = self._agent(sort=["create_time"])
+        assert agent._build_search_body("登录", None)["track_scores"] is True
+        assert "track_scores" not in self._agent(sort=["_score"])._build_search_body("登录", None)
+
+        agent.client.search.return_value = self._response(("c1", None, "登录"), ("c2", None, "支付下单"))
+        result = agent.search_similar(query_text="登录", min_similarity=0.5)
+        assert [h["case_id"] for h in result["results"]] == ["c1"]
+
+    def test_threshold_is_text_similarity_not_relative_score(self):
+        agent = self._agent()
+        agent.client.search.return_value = self._response(("c1", 9.0, "支付下单"), ("c2", 3.0, "登录"))
+        result = agent.search_similar(query_text="登录", min_similarity=0.5)
+
+        assert [h["case_id"] for h in result["results"]] == ["c2"]
+        assert result["diffs"][0]["title_similarity"] == 1.0
+        assert result["diffs"][0]["score"] == 3.0
+
+        agent.client.search.return_value = self._response(("c1", 9.0, "支付下单"))
+        assert agent.search_similar(query_text="登录", min_similarity=0.5)["results"] == []
+
+    def test_batch_uses_one_msearch_and_mget(self):
+        agent = self._agent()
+        agent.client.msearch.return_value = {"responses": [
+            self._response(("c1", 2.0, "登录"), ("c2", 1.0, "支付下单")),
+            self._response(("c3", 4.0, "c9")),
+        ]}
+        agent.client.mget.return_value = {"docs": [{"_id": "c9", "found": True, "_source": {"title": "c9"}}]}
+
+        results = agent.search_batch(query_texts=["登录"], case_ids=["c9"], min_similarity=0.6)
+
+        agent.client.msearch.assert_called_once()
+        searches = agent.client.msearch.call_args.kwargs["searches"]
+        assert len(searches) == 4
+        assert searches[3]["query"]["more_like_this"]["like"] == [{"_id": "c9"}]
+        assert [h["case_id"] for h in results[0]["results"]] == ["c1"]
+        assert results[1]["query"] == "c9"
+
+    def test_batch_reports_per_query_errors(self):
+        agent = self._agent()
+        error = {"type": "search_phase_execution_exception", "reason": "all shards failed"}
+        agent.client.msearch.return_value = {"responses": [
+            {"error": error, "status": 400},
+            self._response(("c1", 2.0, "登录")),
+        ]}
+
+        results = agent.search_batch(query_texts=["支付", "登录"])
+
+        assert results[0]["error"] == error
+        assert results[0]["results"] == []
+        assert "error" not in results[1]
+        assert [h["case_id"] for h in results[1]["results"]] == ["c1"]
+
+    def test_search_page_returns_cursor_only_for_full_pages(self):
+        agent = self._agent()
+        agent.client.search.return_value = self._response(("c1", 2.0), ("c2", 1.0))
+
+        page = agent.search_page(query_text="登录", page_size=2)
+        body = agent.client.search.call_args.kwargs["body"]
+
+        assert body["sort"] == ["_score", {"case_id": "asc"}]
+        assert page["search_after"] == [1.0, "c2"]
+
+        agent.client.search.return_value = self._response(("c3", 0.5))
+        last = agent.search_page(query_text="登录", page_size=2, search_after=page["search_after"])
+        assert agent.client.search.call_args.kwargs["body"]["search_after"] == [1.0, "c2"]
+        assert last["search_after"] is None
@@ -0,0 +1,106 @@
+"""Unit tests for incremental RDB -> ES sync against a local stand-in server."""
+
+from src.entities import materialize_generation_outputs
+from src.entities.db_models import CaseScene, CaseSceneMapping
+from src.storage import ESBulkIndexer, ESSyncEngine, SQLiteCaseStore
+from src.storage.es_sync import merge_diff_sorted
+from tests.unit.es_standin import ESStandIn
+from tests.unit.test_sqlite_store import _generated
+
+
+def test_merge_diff_sorted_reports_both_sides():
+    diff = list(merge_diff_sorted(["a", "b", "d"], ["b", "c", "d", "e"]))
+    assert diff == [("missing", "a"), ("extra", "c"), ("extra", "e")]
+
+
+class TestESSyncEngine:
+    """Watermarks, deletes and reconciliation."""
+
+    def test_incremental_sync_advances_watermark(self, tmp_path):
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store, ESStandIn() as es:
+            store.save_bundle(materialize_generation_outputs(_generated(["c1", "c2"]), output_dir=str(tmp_path)))
+            engine = ESSyncEngine(store, ESBulkIndexer(es_host=es.url, es_index="test_case_index"))
+
+            first = engine.run_incremental()
+            assert first.upserted == 2
+            assert es.docs["c1"]["steps"] == "open page"
+            assert es.docs["c1"]["scene_names"] == ["Happy path"]
+
+            later = {**_generated(["c2"], ts="2025-03-01 00:00:00", module="module_b"), "scenes": [], "scene_mappings": []}
+            store.save_bundle(materialize_generation_outputs(later, output_dir=str(tmp_path)))
+            second = engine.run_incremental()
+            third = engine.run_incremental()
+
+        assert es.docs["c2"]["module_name"] == "module_b"
+        assert second.watermark == "2025-03-01 00:00:00"
+        # Only the boundary second is re-read once the watermark has moved past older rows.
+        assert third.upserted == 1
+
+    def test_deletes_are_propagated(self, tmp_path):
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store, ESStandIn() as es:
+            store.save_bundle(materialize_generation_outputs(_generated(["c1", "c2"]), output_dir=str(tmp_path)))
+            engine = ESSyncEngine(store, ESBulkIndexer(es_host=es.url, es_index="test_case_index"))
+            engine.run_incremental()
+            store.delete_cases(["c1"])
+            report = engine.run_incremental()
+            again = engine.run_incremental()
+
+        assert report.deleted == 1
+        assert list(es.docs) == ["c2"]
+        # The boundary second is re-read, but an already deleted doc is not counted again.
+        assert again.deleted == 0
+
+    def test_reconcile_repairs_drift(self, tmp_path):
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store, ESStandIn() as es:
+            store.save_bundle(materialize_generation_outputs(_generated(["c1", "c2"]), output_dir=str(tmp_path)))
+            es.docs["stale"] = {"case_id": "stale"}
+            engine = ESSyncEngine(store, ESBulkIndexer(es_host=es.url, es_index="test_case_index"), batch_size=1)
+            report = engine.reconcile()
+
+        assert report.missing_in_es == 2
+        assert report.extra_in_es == 1
+        assert sorted(es.docs) == ["c1", "c2"]
+
+    def test_delete_time_does_not_move_data_watermark(self, tmp_path):
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store, ESStandIn() as es:
+            store.save_bundle(materialize_generation_outputs(_generated(["c1", "c2"]), output_dir=str(tmp_path)))
+            engine = ESSyncEngine(store, ESBulkIndexer(es_host=es.url, es_index="test_case_index"))
+            engine.run_incremental()
+            # Tombstones use the local clock, far ahead of the data's update_time.
+            store.delete_cases(["c1"])
+            deleted = engine.run_incremental()
+            late = _generated(["c3"], ts="2025-03-01 00:00:00")
+            store.save_bundle(materialize_generation_outputs(late, output_dir=str(tmp_path)))
+            report = engine.run_incremental()
+
+        assert deleted.deleted == 1
+        assert report.upserted >= 1
+        assert sorted(es.docs) == ["c2", "c3"]
+
+    def test_full_sync_is_due_on_fresh_database(self, tmp_path):
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store, ESStandIn() as es:
+            engine = ESSyncEngine(store, ESBulkIndexer(es_host=es.url, es_index="test_case_index"))
+            assert engine._full_sync_due(24)
+            engine.run_full()
+            assert not engine._full_sync_due(24)
+
+    def test_scene_rename_and_mapping_change_refresh_docs(self, tmp_path):
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store, ESStandIn() as es:
+            store.save_bundle(materialize_generation_outputs(_generated(["c1", "c2"]), output_dir=str(tmp_path)))
+            engine = ESSyncEngine(store, ESBulkIndexer(es_host=es.url, es_index="test_case_index", max_retries=0))
+            engine.run_incremental()
+
+            # Older than the data watermark: only the touch records can surface these changes.
+            old = "2025-01-01 00:00:00"
+            store.upsert_scenes([
+                CaseScene(scene_id="scene_1", scene_name="Renamed", create_time=old),
+                CaseScene(scene_id="scene_2", scene_name="Other", create_time=old),
+            ])
+            store.upsert_scene_mappings([
+                CaseSceneMapping(mapping_id="map_c2", scene_id="scene_2", case_id="c2", create_time=old),
+            ])
+            report = engine.run_incremental()
+
+        assert report.upserted == 2
+        assert es.docs["c1"]["scene_names"] == ["Renamed"]
+        assert es.docs["c2"]["scene_ids"] == ["scene_2"]
@@ -0,0 +1,93 @@
+"""Unit tests for URI loading, HTTP caching and size limits."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.exceptions import FileOperationError
+from src.utils.file_loader import HTTPCache, load_content_from_uri, load_multiple_prds
+
+
+class _DocServer:
+    """Serve in-memory documents with an ETag, answering conditional GETs with 304."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match")))
+                body = server.docs.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                etag = f'"{len(body)}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/markdown")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    def url(self, path):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class TestFileLoader:
+    """Loading PRDs from files and URLs."""
+
+    def test_conditional_get_uses_cache(self, tmp_path):
+        cache = HTTPCache(str(tmp_path / "cache"))
+        with _DocServer({"/prd.md": "# 需求文档"}) as server:
+            first = load_content_from_uri(server.url("/prd.md"), cache=cache)
+            second = load_content_from_uri(server.url("/prd.md"), cache=cache)
+
+        assert first == second == "# 需求文档"
+        assert server.requests[0][1] is None
+        assert server.requests[1][1] is not None
+
+    def test_max_bytes_is_enforced(self, tmp_path):
+        local = tmp_path / "big.md"
+        local.write_text("x" * 100, encoding="utf-8")
+        with pytest.raises(FileOperationError, match="too large"):
+            load_content_from_uri(str(local), max_bytes=10)
+
+        with _DocServer({"/big.md": "y" * 100}) as server:
+            with pytest.raises(FileOperationError):
+                load_content_from_uri(server.url("/big.md"), max_bytes=10, cache=HTTPCache(str(tmp_path / "c")))
+
+    def test_load_multiple_prds_keeps_order_and_reports_errors(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("QA_AGENT_HTTP_CACHE_DIR", str(tmp_path / "cache"))
+        local = tmp_path / "local_prd.md"
+        local.write_text("local", encoding="utf-8")
+        with _DocServer({"/a.md": "A", "/b.md": "B"}) as server:
+            prds = load_multiple_prds([server.url("/a.md"), str(local), server.url("/b.md")])
+            with pytest.raises(FileOperationError, match="1 PRD"):
+                load_multiple_prds([server.url("/a.md"), server.url("/missing.md")])
+
+        assert [p["content"] for p in prds] == ["A", "local", "B"]
+        assert [p["name"] for p in prds] == ["a", "local_prd", "b"]
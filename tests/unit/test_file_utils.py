@@ -2,6 +2,7 @@
 
 import pytest
 import json
+import importlib.util
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
@@ -13,6 +14,9 @@ from src.utils.file_utils import (
     read_jsonl_file,
     write_jsonl_file,
     generate_output_filename,
+    iter_jsonl,
+    count_jsonl,
+    JsonlWriter,
 )
 
 
@@ -55,6 +59,37 @@ class TestFileUtils:
 
             assert read_records == records
 
+    @pytest.mark.parametrize("suffix", [
+        "jsonl",
+        "jsonl.gz",
+        pytest.param("jsonl.zst", marks=pytest.mark.skipif(
+            importlib.util.find_spec("zstandard") is None, reason="zstandard not installed"
+        )),
+    ])
+    def test_jsonl_streaming_and_compression(self, suffix):
+        """Test streaming writer/reader round trip, including compressed files."""
+        with TemporaryDirectory() as tmpdir:
+            file_path = str(Path(tmpdir) / f"test.{suffix}")
+
+            with JsonlWriter(file_path, batch_size=3) as writer:
+                writer.write_many({"id": i, "name": "用例"} for i in range(10))
+                writer.write_line('{"id": 10}')
+            with JsonlWriter(file_path, mode="a") as writer:
+                writer.write({"id": 11})
+
+            assert writer.count == 1
+            assert [r["id"] for r in iter_jsonl(file_path)] == list(range(12))
+            assert count_jsonl(file_path) == 12
+            assert read_jsonl_file(file_path)[0]["name"] == "用例"
+
+    def test_count_jsonl_skips_blank_lines(self):
+        """Test record counting ignores blank lines."""
+        with TemporaryDirectory() as tmpdir:
+            file_path = Path(tmpdir) / "test.jsonl"
+            file_path.write_text('{"a": 1}\n\n{"a": 2}\n  \n', encoding="utf-8")
+
+            assert count_jsonl(str(file_path)) == 2
+
     def test_generate_output_filename(self):
         """Test filename generation."""
         # Without timestamp
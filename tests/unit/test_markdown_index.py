@@ -0,0 +1,89 @@
+"""Unit tests for the markdown section index."""
+
+from src.utils.markdown_index import MarkdownIndex, get_markdown_index
+from src.utils.token_estimator import estimate_tokens
+
+PRD = """前言说明
+
+# 登录模块
+
+登录相关需求。
+
+## 账号登录
+
+输入账号和密码后点击登录。
+
+```bash
+# 不是标题
+```
+
+## 扫码登录
+
+使用手机扫码。
+
+# 支付模块
+
+支付需求。
+"""
+
+
+class TestMarkdownIndex:
+    """Heading tree, offsets, chunking and diffs."""
+
+    def test_builds_heading_tree_and_skips_fenced_code(self):
+        index = MarkdownIndex(PRD)
+
+        titles = [s.title for s in index.headings()]
+        assert titles == ["登录模块", "账号登录", "扫码登录", "支付模块"]
+        login = index.find("登录模块")[0]
+        assert [index.sections[i].title for i in login.children] == ["账号登录", "扫码登录"]
+        assert index.get(("登录模块", "扫码登录")).level == 2
+        assert index.body(index.root) == "前言说明\n\n"
+
+    def test_sections_slice_the_source(self):
+        index = MarkdownIndex(PRD)
+        encoded = PRD.encode("utf-8")
+
+        account = index.find("账号")[0]
+        text = index.text(account)
+        assert text.startswith("## 账号登录\n")
+        assert "# 不是标题" in text
+        assert not text.endswith("使用手机扫码。\n")
+        assert encoded[account.byte_start:account.byte_end].decode("utf-8") == text
+        assert index.text(index.find("登录模块")[0]).rstrip().endswith("使用手机扫码。")
+        assert account.tokens == estimate_tokens(text)
+
+    def test_chunks_cover_document_within_budget(self):
+        index = MarkdownIndex(PRD)
+
+        chunks = index.chunks(max_tokens=20)
+        assert chunks[0].start == 0
+        assert chunks[-1].end == len(PRD)
+        for previous, current in zip(chunks, chunks[1:]):
+            assert previous.end == current.start
+        assert all(chunk.tokens <= 20 for chunk in chunks)
+
+    def test_oversized_section_is_split_at_paragraphs(self):
+        content = "# 大章节\n\n" + "\n\n".join("段落内容" * 5 for _ in range(4)) + "\n"
+        chunks = MarkdownIndex(content).chunks(max_tokens=25)
+
+        assert len(chunks) > 1
+        assert "".join(content[c.start:c.end] for c in chunks) == content
+
+    def test_diff_reports_changed_added_and_removed(self):
+        old = MarkdownIndex(PRD)
+        new = MarkdownIndex(
+            PRD.replace("使用手机扫码。", "使用手机App扫码。").replace("# 支付模块\n\n支付需求。\n", "# 退款模块\n")
+        )
+
+        diff = old.diff(new)
+        assert ("登录模块", "扫码登录") in diff["changed"]
+        assert ("登录模块",) in diff["changed"]
+        assert ("登录模块", "账号登录") not in diff["changed"]
+        assert diff["added"] == [("退款模块",)]
+        assert diff["removed"] == [("支付模块",)]
+
+    def test_index_is_cached_by_content(self):
+        first = get_markdown_index(PRD)
+        assert get_markdown_index(str(PRD)) is first
+        assert get_markdown_index(PRD + "\n") is not first
@@ -1,7 +1,14 @@
 import json
 from pathlib import Path
 
-from src.entities import DATETIME_FMT, materialize_generation_outputs
+from src.entities import (
+    DATETIME_FMT,
+    BundleSink,
+    FanoutSink,
+    JsonlSink,
+    materialize_generation_outputs,
+    stream_materialize,
+)
 
 
 def test_materialize_generation_outputs_creates_files_and_entities(tmp_path):
@@ -89,3 +96,35 @@ def test_materialize_generation_outputs_creates_files_and_entities(tmp_path):
     scene_entity = bundle.scenes[0]
     assert scene_entity.scene_desc_path.endswith("scene_1.md")
     assert Path(scene_entity.scene_desc_path).exists()
+
+
+def test_stream_materialize_writes_sinks_in_input_order(tmp_path):
+    def raw_cases():
+        for i in range(50):
+            yield {
+                "case_id": f"case_{i:02d}",
+                "module": "module_a",
+                "feature": "feature_x",
+                "title": f"title {i}",
+                "steps": [f"step {i}"],
+                "expected_result": "ok",
+                "level": "P2",
+            }
+
+    paths = {"test_cases": str(tmp_path / "db.jsonl"), "index_docs": str(tmp_path / "es.jsonl")}
+    collected = BundleSink()
+    stats = stream_materialize(
+        raw_cases(),
+        FanoutSink(JsonlSink(paths), collected),
+        scene_mappings=[{"mapping_id": "m1", "scene_id": "scene_1", "case_id": "case_03"}],
+        output_dir=str(tmp_path / "out"),
+        max_workers=3,
+        max_pending=4,
+    )
+
+    assert stats.test_cases == 50
+    assert [case.case_id for case in collected.bundle.test_cases] == [f"case_{i:02d}" for i in range(50)]
+    es_lines = [json.loads(line) for line in Path(paths["index_docs"]).read_text(encoding="utf-8").splitlines()]
+    assert len(es_lines) == 50
+    assert es_lines[3]["scene_ids"] == ["scene_1"]
+    assert (tmp_path / "out" / "steps" / "case_49_steps.txt").read_text(encoding="utf-8") == "step 49"
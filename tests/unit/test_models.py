@@ -7,8 +7,12 @@ from unittest.mock import Mock, patch
 
 from src.models.doubao_client import DoubaoClient
 from src.models.g2m_client import G2MClient
-from src.models.model_factory import ModelFactory, get_default_client
+from src.models.ollama_client import OllamaClient
+from src.models.openai_compat_client import OpenAICompatClient
+from src.models import model_factory
+from src.models.model_factory import ModelFactory, create_agent_clients, get_default_client
 from src.models.base import ModelResponse
+from src.models.router import RoutingModelClient
 
 
 class TestDoubaoClient:
@@ -90,6 +94,128 @@ class TestG2MClient:
         assert "Assistant: Hi there" in prompt
 
 
+class TestOllamaClient:
+    """Test Ollama client."""
+
+    @staticmethod
+    def _response(body):
+        response = Mock()
+        response.json.return_value = body
+        return response
+
+    def test_chat_uses_native_api_and_maps_options(self):
+        """Chat goes to /api/chat with num_predict, keep_alive and usage from eval counts."""
+        body = {"message": {"role": "assistant", "content": "好的"}, "done": True, "prompt_eval_count": 12, "eval_count": 3}
+        with patch.dict(os.environ, {"OLLAMA_KEEP_ALIVE": "1h"}):
+            client = OllamaClient(host="http://ollama:11434", default_model="qwen")
+        with patch("src.models.ollama_client.requests.post", return_value=self._response(body)) as mock_post:
+            res = client.chat_completion([{"role": "user", "content": "你好"}], temperature=0.1, max_tokens=64, seed=7)
+
+        url = mock_post.call_args.args[0]
+        payload = mock_post.call_args.kwargs["json"]
+        assert url == "http://ollama:11434/api/chat"
+        assert payload["messages"] == [{"role": "user", "content": "你好"}]
+        assert payload["keep_alive"] == "1h"
+        assert payload["options"] == {"temperature": 0.1, "num_predict": 64, "seed": 7}
+        assert res.content == "好的"
+        assert res.usage == {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+
+    def test_streamed_chunks_are_joined(self):
+        """NDJSON chunks are concatenated and usage is read from the final chunk."""
+        chunks = [{"message": {"content": "你"}}, {"message": {"content": "好"}, "done": True, "eval_count": 2}]
+        client = OllamaClient(default_model="qwen")
+        with patch.object(client, "_post", return_value={"_ndjson_parsed": chunks}):
+            res = client.chat_completion([{"role": "user", "content": "hi"}])
+        assert res.content == "你好"
+        assert res.usage["completion_tokens"] == 2
+
+    def test_preload_and_images(self):
+        """Preload sends an empty chat; data-URL images are passed as base64."""
+        client = OllamaClient(default_model="llava")
+        client.num_ctx = 8192
+        with patch.object(client, "_post", return_value={"message": {"content": "图"}}) as mock_post:
+            assert client.preload() is True
+            client.multimodal_completion(
+                [{"role": "user", "content": [
+                    {"type": "text", "text": "描述"},
+                    {"type": "image_url", "image_url": {"url": "data:image/png;base64,QUJD"}},
+                ]}]
+            )
+
+        preload_payload = mock_post.call_args_list[0].args[1]
+        assert preload_payload["messages"] == []
+        assert preload_payload["options"] == {"num_ctx": 8192}
+        message = mock_post.call_args_list[1].args[1]["messages"][0]
+        assert message == {"role": "user", "content": "描述", "images": ["QUJD"]}
+        # Same context size on every call so the model is not reloaded.
+        assert mock_post.call_args_list[1].args[1]["options"]["num_ctx"] == 8192
+
+
+class TestOpenAICompatClient:
+    """Test OpenAI-compatible client."""
+
+    def test_init_without_base_url(self):
+        """Missing base URL raises error."""
+        with patch.dict(os.environ, {}, clear=True):
+            with pytest.raises(ValueError, match="OPENAI_COMPAT_BASE_URL"):
+                OpenAICompatClient()
+
+    def test_env_config_and_pool(self):
+        """Base URL, model, headers and pool size are configurable."""
+        env = {"OPENAI_COMPAT_BASE_URL": "http://vllm:8000/v1", "OPENAI_COMPAT_MODEL": "qwen"}
+        with patch.dict(os.environ, env, clear=True):
+            with patch("src.models.openai_compat_client.OpenAI") as mock_openai:
+                client = OpenAICompatClient(headers={"X-Team": "qa"}, pool_size=4)
+
+        kwargs = mock_openai.call_args.kwargs
+        assert client.default_model == "qwen"
+        assert kwargs["base_url"] == "http://vllm:8000/v1"
+        assert kwargs["default_headers"] == {"X-Team": "qa"}
+        assert kwargs["max_retries"] == 0
+
+    def test_structured_output(self):
+        """json_schema becomes a json_schema response_format."""
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"ok": true}'))], usage=None)
+        with patch("src.models.openai_compat_client.OpenAI") as mock_openai:
+            mock_openai.return_value.chat.completions.create.return_value = response
+            client = OpenAICompatClient(base_url="http://vllm:8000/v1", default_model="qwen")
+            res = client.chat_completion([{"role": "user", "content": "hi"}], json_schema=ModelResponse)
+
+        params = mock_openai.return_value.chat.completions.create.call_args.kwargs
+        assert params["response_format"]["type"] == "json_schema"
+        assert params["response_format"]["json_schema"]["name"] == "ModelResponse"
+        assert res.content == '{"ok": true}'
+
+    def test_streaming_joins_deltas(self):
+        """Streamed deltas are joined and usage is read from the final chunk."""
+        chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="你"))], usage=None),
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="好"))], usage=None),
+            SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=3, completion_tokens=2, total_tokens=5)),
+        ]
+        deltas = []
+        with patch("src.models.openai_compat_client.OpenAI") as mock_openai:
+            mock_openai.return_value.chat.completions.create.return_value = iter(chunks)
+            client = OpenAICompatClient(base_url="http://vllm:8000/v1", default_model="qwen")
+            res = client.chat_completion([{"role": "user", "content": "hi"}], on_delta=deltas.append)
+
+        params = mock_openai.return_value.chat.completions.create.call_args.kwargs
+        assert params["stream"] is True
+        assert params["stream_options"] == {"include_usage": True}
+        assert deltas == ["你", "好"]
+        assert res.content == "你好"
+        assert res.usage == {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}
+
+    def test_model_defaults_to_server_model(self):
+        """Without a configured model the first listed server model is used."""
+        with patch.dict(os.environ, {}, clear=True):
+            with patch("src.models.openai_compat_client.OpenAI") as mock_openai:
+                mock_openai.return_value.models.list.return_value = [SimpleNamespace(id="served-model")]
+                client = OpenAICompatClient(base_url="http://vllm:8000/v1")
+                assert client._resolve_model(None) == "served-model"
+                assert client._resolve_model("other") == "other"
+
+
 class TestModelFactory:
     """Test model factory."""
 
@@ -117,7 +243,63 @@ class TestModelFactory:
             client = ModelFactory.create_client(provider="auto")
             assert isinstance(client, G2MClient)
 
+    def test_create_openai_compat_client(self):
+        """Test creating OpenAI-compatible client."""
+        with patch.dict(os.environ, {"OPENAI_COMPAT_BASE_URL": "http://localhost:8000/v1"}, clear=True):
+            assert isinstance(ModelFactory.create_client(provider="openai_compat"), OpenAICompatClient)
+            assert isinstance(ModelFactory.create_client(provider="auto"), OpenAICompatClient)
+
     def test_invalid_provider(self):
         """Test invalid provider raises error."""
         with pytest.raises(ValueError, match="Invalid provider"):
             ModelFactory.create_client(provider="invalid")
+
+    def test_router_uses_configured_backends(self):
+        """Router wraps every backend whose credentials are present."""
+        with patch.dict(os.environ, {"ARK_API_KEY": "k1", "G2M_API_KEY": "k2"}, clear=True):
+            client = ModelFactory.create_client(provider="router")
+        assert isinstance(client, RoutingModelClient)
+        assert list(client.backends) == ["doubao", "g2m"]
+        assert client.hedge is True
+
+    def test_router_without_backends(self):
+        """Router needs at least one configured backend."""
+        with patch.dict(os.environ, {}, clear=True):
+            with pytest.raises(ValueError, match="No model backends"):
+                ModelFactory.create_client(provider="router")
+
+
+class TestModelTiers:
+    """Per-agent clients and per-task models from global.model_tiers."""
+
+    def test_agents_get_tiered_clients(self, monkeypatch):
+        tiers = {
+            "requirement_parser": {"provider": "doubao", "model": "big"},
+            "rule_generator": {"provider": "doubao", "model": "big"},
+        }
+        monkeypatch.setattr(model_factory, "get_config", lambda key, default=None: tiers)
+        with patch.dict(os.environ, {"ARK_API_KEY": "k1", "G2M_API_KEY": "k2"}, clear=True):
+            clients = create_agent_clients(["requirement_parser", "rule_generator", "testcase_generator"], "g2m")
+
+        assert clients["requirement_parser"] is clients["rule_generator"]
+        assert clients["requirement_parser"].default_model == "big"
+        assert isinstance(clients["testcase_generator"], G2MClient)
+
+    def test_task_model_applies_to_matching_provider(self, monkeypatch):
+        tiers = {"expected_result": {"provider": "doubao", "model": "small"}}
+        monkeypatch.setattr(model_factory, "get_config", lambda key, default=None: tiers)
+        doubao = DoubaoClient(api_key="k")
+        with patch.dict(os.environ, {"G2M_API_KEY": "k"}):
+            g2m = G2MClient()
+
+        assert model_factory.task_model(doubao, "expected_result") == "small"
+        assert model_factory.task_model(g2m, "expected_result") is None
+        assert model_factory.task_model(doubao, "testcase_steps") is None
+
+    def test_task_model_is_skipped_for_router(self, monkeypatch):
+        tiers = {"expected_result": {"model": "small"}, "testcase_steps": {"provider": "doubao", "model": "small"}}
+        monkeypatch.setattr(model_factory, "get_config", lambda key, default=None: tiers)
+        router = RoutingModelClient({"doubao": DoubaoClient(api_key="k")})
+
+        assert model_factory.task_model(router, "expected_result") is None
+        assert model_factory.task_model(router, "testcase_steps") is None
@@ -0,0 +1,110 @@
+"""Unit tests for routing across a pool of Ollama hosts."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.models.ollama_client import OllamaClient
+from src.models.ollama_pool import OllamaHostPool, prefix_key
+from src.utils.exceptions import ModelAPIError
+
+HOSTS = ["http://box1:11434", "http://box2:11434", "http://box3:11434"]
+
+
+class _Tags:
+    """Fake GET /api/tags: hosts listed in `down` fail, others serve `models`."""
+
+    def __init__(self, models=("qwen:latest",), down=()):
+        self.models = models
+        self.down = set(down)
+        self.calls = []
+
+    def __call__(self, url, timeout=None):
+        self.calls.append(url)
+        if any(url.startswith(host) for host in self.down):
+            raise ConnectionError("refused")
+        response = Mock()
+        response.json.return_value = {"models": [{"name": m} for m in self.models]}
+        return response
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _messages(preamble, question="问题"):
+    return [{"role": "system", "content": preamble}, {"role": "user", "content": question}]
+
+
+class TestOllamaHostPool:
+    """Health, stickiness and least-loaded fallback."""
+
+    def test_same_prefix_sticks_to_one_host(self):
+        pool = OllamaHostPool(HOSTS, http_get=_Tags(), prefix_chars=20)
+        key = prefix_key(_messages("PRD: 智能座舱语音助手"), 20)
+        assert key == prefix_key(_messages("PRD: 智能座舱语音助手", "另一个问题"), 20)
+
+        chosen = {pool.select("qwen", key).url for _ in range(5)}
+        assert len(chosen) == 1
+        spread = {pool.select("qwen", prefix_key(_messages(f"PRD {i}"), 20)).url for i in range(30)}
+        assert len(spread) > 1
+
+    def test_full_sticky_host_falls_back_to_least_loaded(self):
+        pool = OllamaHostPool(HOSTS, http_get=_Tags())
+        key = prefix_key(_messages("PRD"))
+        sticky = pool.select("qwen", key)
+        tickets = [sticky.governor.acquire() for _ in range(sticky.governor.limit)]
+        others = [h for h in pool.hosts if h is not sticky]
+        others[0].ewma, others[1].ewma = 5.0, 1.0
+        try:
+            assert pool.select("qwen", key) is others[1]
+        finally:
+            # Governors are process-wide; free the slots for other tests.
+            for ticket in tickets:
+                sticky.governor.release(ticket, 0.0)
+
+    def test_unhealthy_and_missing_model_hosts_are_skipped(self):
+        clock = _Clock()
+        tags = _Tags(down={HOSTS[0]})
+        pool = OllamaHostPool(HOSTS, http_get=tags, clock=clock, health_interval=30)
+        pool.hosts[2].models = {"llama3:latest"}
+        pool.hosts[2].checked_at = 0.0
+
+        assert {pool.select("qwen", prefix_key(_messages(f"PRD {i}"))).url for i in range(10)} == {HOSTS[1]}
+        assert len(tags.calls) == 2  # checked once until the interval passes
+
+        tags.down.clear()
+        clock.now = 31
+        pool.select("qwen")
+        assert pool.hosts[0].healthy
+
+    def test_connection_errors_mark_host_down(self):
+        pool = OllamaHostPool(HOSTS[:2], http_get=_Tags())
+        with pytest.raises(ModelAPIError):
+            with pool.slot("qwen", _messages("PRD")) as host:
+                raise ModelAPIError("connection refused")
+        assert not host.healthy
+        assert pool.select("qwen", prefix_key(_messages("PRD"))) is not host
+
+
+class TestPooledOllamaClient:
+    """OllamaClient spreads calls over OLLAMA_HOSTS."""
+
+    def test_calls_go_to_pool_hosts(self):
+        with patch.dict("os.environ", {"OLLAMA_HOSTS": ",".join(HOSTS[:2])}):
+            client = OllamaClient(default_model="qwen")
+        assert client.pool is not None
+        client.pool._http_get = _Tags()
+
+        response = Mock()
+        response.json.return_value = {"message": {"content": "好"}}
+        with patch("src.models.ollama_client.requests.post", return_value=response) as mock_post:
+            res = client.chat_completion(_messages("PRD"))
+
+        assert res.content == "好"
+        assert mock_post.call_args.args[0] in {f"{h}/api/chat" for h in HOSTS[:2]}
+        assert sum(h.calls for h in client.pool.hosts) == 1
@@ -0,0 +1,99 @@
+"""Unit tests for client-side RPM/TPM rate limiting."""
+
+import asyncio
+
+import pytest
+
+from src.models import rate_limiter
+from src.models.rate_limiter import RateLimiter, TokenBucket
+from src.utils.error_handler import safe_model_call
+from src.utils.exceptions import ModelAPIError
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket:
+    """Refill, debt and clamping."""
+
+    def test_waits_behind_earlier_reservations(self):
+        clock = _FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+        assert bucket.reserve(1) == 0
+        assert bucket.reserve(1) == 0
+        assert bucket.reserve(1) == 1.0
+        assert bucket.reserve(1) == 2.0
+        clock.now = 10
+        assert bucket.reserve(2) == 0
+
+    def test_oversized_request_is_clamped(self):
+        bucket = TokenBucket(rate=10.0, capacity=100, clock=_FakeClock())
+        assert bucket.reserve(500) == 0
+        assert bucket.reserve(10) == 1.0
+
+
+class TestRateLimiter:
+    """RPM and TPM budgets shared by all callers."""
+
+    def test_rpm_spaces_out_requests(self):
+        clock = _FakeClock()
+        limiter = RateLimiter("p/m", rpm=60, clock=clock, sleep=clock.sleep)
+        for _ in range(60):
+            limiter.acquire()
+        assert clock.now == 0
+        limiter.acquire()
+        limiter.acquire()
+        assert clock.now == 2.0
+
+    def test_tpm_uses_estimate_then_actual_usage(self):
+        clock = _FakeClock()
+        limiter = RateLimiter("p/m", tpm=600, clock=clock, sleep=clock.sleep)
+        limiter.acquire(500)
+        # The call used far less than reserved; the difference is returned.
+        limiter.settle(500, {"prompt_tokens": 80, "completion_tokens": 20})
+        limiter.acquire(500)
+        assert clock.now == 0
+        limiter.acquire(100)
+        assert clock.now == 10.0
+
+    def test_async_callers_share_buckets(self):
+        limiter = RateLimiter("p/m", rpm=6000)
+        limiter.acquire()
+        asyncio.run(limiter.acquire_async())
+        assert limiter.requests.reserve(0) == 0
+
+    def test_limits_from_config_and_env(self, monkeypatch):
+        conf = {"default": {"rpm": 100}, "doubao": {"tpm": 5000, "models": {"fast": {"rpm": 300}}}}
+        monkeypatch.setattr(rate_limiter, "get_config", lambda key, default=None: conf)
+        assert rate_limiter._limits_for("doubao", "fast") == {"rpm": 300, "tpm": 5000}
+        assert rate_limiter._limits_for("g2m", "x") == {"rpm": 100}
+        monkeypatch.setenv("QA_AGENT_G2M_TPM", "900")
+        assert rate_limiter._limits_for("g2m", "x") == {"rpm": 100, "tpm": 900.0}
+
+    def test_safe_model_call_waits_before_each_attempt(self):
+        clock = _FakeClock()
+        limiter = RateLimiter("p/m", rpm=60, tpm=1000, clock=clock, sleep=clock.sleep)
+        limiter.acquire(1000)
+
+        assert safe_model_call(lambda: "ok", rate_limiter=limiter, rate_tokens=100) == "ok"
+        assert clock.now == 6.0
+
+    def test_failed_attempt_returns_token_reservation(self):
+        clock = _FakeClock()
+        limiter = RateLimiter("p/m", tpm=600, clock=clock, sleep=clock.sleep)
+
+        def _fail():
+            raise ModelAPIError("bad request", status_code=400)
+
+        with pytest.raises(ModelAPIError):
+            safe_model_call(_fail, max_retries=1, rate_limiter=limiter, rate_tokens=500)
+        limiter.acquire(500)
+        assert clock.now == 0
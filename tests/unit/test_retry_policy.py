@@ -0,0 +1,137 @@
+"""Unit tests for the model-call retry policy and circuit breaker."""
+
+import random
+
+import pytest
+import requests
+
+from src.utils.error_handler import safe_model_call
+from src.utils.exceptions import CircuitOpenError, ModelAPIError, ModelTimeoutError
+from src.utils.retry_policy import CircuitBreaker, RetryPolicy, is_retryable_error, retry_after_seconds
+
+
+def _http_error(status: int, headers=None) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.exceptions.HTTPError(str(status), response=response)
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRetryPolicy:
+    """Classification and backoff."""
+
+    def test_classifies_by_status(self):
+        assert is_retryable_error(ModelAPIError("busy", status_code=429))
+        assert is_retryable_error(ModelAPIError("down", status_code=502))
+        assert is_retryable_error(ModelTimeoutError("slow"))
+        assert is_retryable_error(ModelAPIError("connection reset"))
+        assert not is_retryable_error(ModelAPIError("bad key", status_code=401))
+        assert not is_retryable_error(ValueError("bug"))
+        assert not is_retryable_error(CircuitOpenError("open"))
+
+    def test_full_jitter_backoff_is_bounded_and_exponential(self):
+        policy = RetryPolicy(max_attempts=10, base_delay=1.0, max_delay=8.0, rng=random.Random(0))
+        error = ModelAPIError("busy", status_code=503)
+        for attempt, cap in [(0, 1.0), (1, 2.0), (2, 4.0), (5, 8.0)]:
+            delays = [policy.delay(error, attempt) for _ in range(50)]
+            assert all(0 <= d <= cap for d in delays)
+            assert max(delays) > cap / 2
+
+    def test_honours_retry_after(self):
+        policy = RetryPolicy(max_retry_after=60)
+        assert policy.delay(_http_error(429, {"Retry-After": "7"}), 0) == 7.0
+        # Wrapped errors keep the header reachable through __cause__.
+        try:
+            try:
+                raise _http_error(503, {"Retry-After": "3"})
+            except requests.exceptions.HTTPError as e:
+                raise ModelAPIError("unavailable", status_code=503) from e
+        except ModelAPIError as wrapped:
+            assert retry_after_seconds(wrapped) == 3.0
+        assert policy.delay(_http_error(429, {"Retry-After": "600"}), 0) is None
+
+    def test_safe_model_call_retries_only_retryable_errors(self):
+        sleeps = []
+        calls = []
+
+        def _flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ModelAPIError("busy", status_code=429, retry_after=2)
+            return "ok"
+
+        assert safe_model_call(_flaky, policy=RetryPolicy(max_attempts=3), sleep=sleeps.append) == "ok"
+        assert sleeps == [2.0, 2.0]
+
+        calls.clear()
+
+        def _bad_request():
+            calls.append(1)
+            raise ModelAPIError("invalid", status_code=400)
+
+        with pytest.raises(ModelAPIError):
+            safe_model_call(_bad_request, policy=RetryPolicy(max_attempts=3), sleep=sleeps.append)
+        assert len(calls) == 1
+
+    def test_unexpected_errors_are_wrapped(self):
+        def _broken():
+            raise _http_error(404)
+
+        with pytest.raises(ModelAPIError) as exc:
+            safe_model_call(_broken, sleep=lambda s: None)
+        assert exc.value.status_code == 404
+
+
+class TestCircuitBreaker:
+    """Open after consecutive failures, probe after the reset window."""
+
+    def test_opens_and_fails_fast(self):
+        clock = _FakeClock()
+        breaker = CircuitBreaker("p", failure_threshold=2, reset_seconds=30, clock=clock)
+        calls = []
+
+        def _down():
+            calls.append(1)
+            raise ModelTimeoutError("down")
+
+        policy = RetryPolicy(max_attempts=5, base_delay=0)
+        with pytest.raises(CircuitOpenError):
+            safe_model_call(_down, policy=policy, breaker=breaker, sleep=lambda s: None)
+        assert len(calls) == 2
+        assert breaker.state == CircuitBreaker.OPEN
+
+        with pytest.raises(CircuitOpenError):
+            safe_model_call(lambda: "ok", policy=policy, breaker=breaker)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        clock = _FakeClock()
+        breaker = CircuitBreaker("p", failure_threshold=1, reset_seconds=10, clock=clock)
+        breaker.before_call()
+        breaker.record_failure(ModelAPIError("down", status_code=503))
+
+        clock.now = 10
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()  # only one probe at a time
+        breaker.record_failure(ModelAPIError("down", status_code=503))
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now = 20
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.before_call()
+
+    def test_client_errors_do_not_trip(self):
+        breaker = CircuitBreaker("p", failure_threshold=2)
+        for _ in range(5):
+            breaker.record_failure(ModelAPIError("invalid", status_code=400))
+        assert breaker.state == CircuitBreaker.CLOSED
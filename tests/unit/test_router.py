@@ -0,0 +1,87 @@
+"""Unit tests for multi-backend routing and hedged requests."""
+
+import threading
+
+import pytest
+
+from src.models.base import BaseModelClient, ModelResponse
+from src.models.router import RoutingModelClient
+from src.utils.exceptions import ModelAPIError
+
+
+class _Backend(BaseModelClient):
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        self.calls += 1
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return ModelResponse(content=self.name, model=self.name)
+
+    def multimodal_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return self.chat_completion(messages)
+
+
+_MESSAGES = [{"role": "user", "content": "你好"}]
+
+
+class TestRoutingModelClient:
+    """Ordering, hedging and failover."""
+
+    def test_fast_primary_is_not_hedged(self):
+        primary, secondary = _Backend("primary"), _Backend("secondary")
+        router = RoutingModelClient({"primary": primary, "secondary": secondary}, hedge_after_seconds=5)
+
+        assert router.chat_completion(_MESSAGES).content == "primary"
+        assert secondary.calls == 0
+
+    def test_slow_primary_is_hedged(self):
+        slow, fast = _Backend("slow", delay=5), _Backend("fast")
+        router = RoutingModelClient({"slow": slow, "fast": fast}, hedge_after_seconds=0.05, min_hedge_seconds=0.05)
+
+        assert router.chat_completion(_MESSAGES).content == "fast"
+        assert slow.calls == 1
+        assert router.stats()["fast"]["hedge_wins"] == 1
+        slow.release.set()
+
+    def test_primary_finishing_first_is_not_a_hedge_win(self):
+        slow, slower = _Backend("slow", delay=0.3), _Backend("slower", delay=5)
+        router = RoutingModelClient({"slow": slow, "slower": slower}, hedge_after_seconds=0.05, min_hedge_seconds=0.05)
+
+        assert router.chat_completion(_MESSAGES).content == "slow"
+        assert slower.calls == 1
+        assert router.stats()["slow"]["hedge_wins"] == 0
+        slower.release.set()
+
+    def test_fails_over_on_error(self):
+        broken = _Backend("broken", error=ModelAPIError("down", status_code=400))
+        backup = _Backend("backup")
+        router = RoutingModelClient({"broken": broken, "backup": backup}, hedge=False)
+
+        assert router.chat_completion(_MESSAGES).content == "backup"
+        assert router.stats()["broken"]["failures"] == 1
+
+    def test_all_failures_raise_last_error(self):
+        router = RoutingModelClient({"only": _Backend("only", error=ModelAPIError("down", status_code=400))})
+        with pytest.raises(ModelAPIError):
+            router.chat_completion(_MESSAGES)
+
+    def test_unhealthy_and_slow_backends_are_ranked_last(self):
+        router = RoutingModelClient({"a": _Backend("a"), "b": _Backend("b"), "c": _Backend("c")})
+        for _ in range(3):
+            router.health["a"].record_failure()
+        router.health["b"].record_success(4.0)
+        router.health["c"].record_success(1.0)
+
+        assert router.ranked_backends() == ["c", "b", "a"]
+        assert router.hedge_delay("c") == 30.0
+        for _ in range(10):
+            router.health["c"].record_success(2.0)
+        assert router.hedge_delay("c") == 2.0
@@ -0,0 +1,93 @@
+"""Unit tests for BM25 PRD section retrieval."""
+
+from src.agents.requirement_parser import Feature, Flow, Module
+from src.agents import testcase_generator
+from src.models.base import BaseModelClient, ModelResponse
+from src.utils.markdown_index import MarkdownIndex
+from src.utils.section_retriever import SectionRetriever, tokenize
+from src.utils.token_estimator import estimate_tokens
+
+PRD = """# 车载系统需求
+
+## 人脸识别
+
+摄像头检测车内乘员人脸，识别成功后加载驾驶员座椅偏好。
+
+### 无人脸场景
+
+未检测到人脸时提示乘员正对摄像头。
+
+## 语音助手
+
+唤醒词为你好小V，支持导航、音乐和空调控制。
+
+## 空调控制
+
+支持温度调节，范围16到30度。
+"""
+
+
+class _RecordingClient(BaseModelClient):
+    def __init__(self):
+        self.prompts = []
+
+    def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        return ModelResponse(content="结果符合预期", model="mock")
+
+    def multimodal_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content="", model="mock")
+
+
+class TestSectionRetriever:
+    """Ranking and budgeted selection."""
+
+    def test_tokenize_uses_words_and_cjk_bigrams(self):
+        assert tokenize("Login 人脸识别") == ["login", "人脸", "脸识", "识别"]
+
+    def test_ranks_the_matching_section_first(self):
+        retriever = SectionRetriever(MarkdownIndex(PRD))
+
+        hits = retriever.search("空调 温度调节")
+        assert hits[0].section.title == "空调控制"
+        assert retriever.search("完全无关") == []
+
+    def test_select_respects_budget_and_document_order(self):
+        retriever = SectionRetriever(MarkdownIndex(PRD))
+
+        hits = retriever.select("人脸 检测 摄像头", token_budget=80, max_sections=2)
+        assert [hit.section.title for hit in hits] == ["人脸识别", "无人脸场景"]
+        assert sum(hit.tokens for hit in hits) <= 80
+
+        context = retriever.context("人脸 检测 摄像头", token_budget=80, max_sections=2)
+        assert "[车载系统需求 > 人脸识别]\n### 无人脸场景" in context
+        assert "语音助手" not in context
+
+    def test_oversized_best_section_is_cut_to_budget(self):
+        retriever = SectionRetriever(MarkdownIndex(PRD))
+
+        hits = retriever.select("空调 温度调节", token_budget=8)
+        assert len(hits) == 1
+        assert hits[0].tokens <= 8
+        assert estimate_tokens(PRD[hits[0].start:hits[0].end]) <= 8
+
+
+class TestGeneratorPrdContext:
+    """Per-flow context replaces head truncation in case prompts."""
+
+    def test_expected_result_prompt_gets_relevant_sections(self):
+        client = _RecordingClient()
+        generator = testcase_generator.TestCaseGenerator(client)
+        module = Module(id="m1", name="舒适功能")
+        feature = Feature(id="f1", name="空调控制", description="温度调节")
+        flow = Flow(id="fl1", name="调节温度", type="happy", steps=["打开空调", "调节温度到20度"])
+        retriever = SectionRetriever(MarkdownIndex(PRD))
+
+        context = generator._retrieve_prd_context(retriever, module, feature, flow)
+        generator._generate_expected_result_with_llm(
+            feature, flow, {"name": "正常"}, flow.steps, prd_context=context
+        )
+
+        assert "范围16到30度" in client.prompts[0]
+        assert "座椅偏好" not in client.prompts[0]
+        assert generator._retrieve_prd_context(None, module, feature, flow) is None
@@ -0,0 +1,80 @@
+"""Unit tests for the es_docs segment store."""
+
+import json
+import threading
+
+from src.storage import SegmentStore
+from src.utils.file_utils import write_jsonl_file
+
+
+def _segment(tmp_path, name, docs):
+    path = tmp_path / name
+    write_jsonl_file(str(path), docs)
+    return path
+
+
+class TestSegmentStore:
+    """Manifest, multi-segment reads and compaction."""
+
+    def test_newest_version_wins_across_segments(self, tmp_path):
+        store = SegmentStore(str(tmp_path))
+        old = _segment(tmp_path, "proj_es_docs_20250101_000000.jsonl", [
+            {"case_id": "c1", "title": "old"},
+            {"case_id": "c2", "title": "only old"},
+        ])
+        new = _segment(tmp_path, "proj_es_docs_20250102_000000.jsonl", [{"case_id": "c1", "title": "new"}])
+        store.register_segment(str(old))
+        store.register_segment(str(new))
+
+        docs = {d["case_id"]: d["title"] for d in store.iter_docs()}
+        assert docs == {"c1": "new", "c2": "only old"}
+        assert store.get("c1")["title"] == "new"
+        assert store.get("c2")["title"] == "only old"
+        assert store.get("missing") is None
+
+    def test_bootstraps_manifest_from_existing_files(self, tmp_path):
+        _segment(tmp_path, "a_es_docs_1.jsonl", [{"case_id": "x"}])
+        _segment(tmp_path, "b_es_docs_1.jsonl", [{"case_id": "y"}])
+
+        assert [d["case_id"] for d in SegmentStore(str(tmp_path), project_name="b").iter_docs()] == ["y"]
+        assert len(SegmentStore(str(tmp_path)).segments()) == 2
+
+    def test_compact_merges_and_removes_old_segments(self, tmp_path):
+        store = SegmentStore(str(tmp_path), project_name="proj")
+        for i, title in enumerate(["v1", "v2", "v3"]):
+            path = _segment(tmp_path, f"proj_es_docs_2025010{i}_000000.jsonl", [{"case_id": "c1", "title": title}])
+            store.register_segment(str(path))
+
+        written = store.compact()
+
+        assert len(written) == 1
+        assert written[0]["records"] == 1
+        assert [s["file"] for s in store.segments()] == [written[0]["file"]]
+        assert sorted(p.name for p in tmp_path.glob("*.jsonl")) == [written[0]["file"]]
+        assert store.get("c1")["title"] == "v3"
+
+    def test_unregistered_files_are_still_searched(self, tmp_path):
+        store = SegmentStore(str(tmp_path))
+        store.register_segment(str(_segment(tmp_path, "proj_es_docs_2.jsonl", [{"case_id": "new"}])))
+        _segment(tmp_path, "proj_es_docs_1.jsonl", [{"case_id": "copied"}])
+
+        assert sorted(d["case_id"] for d in store.iter_docs()) == ["copied", "new"]
+
+    def test_kept_compacted_segments_stay_out_of_searches(self, tmp_path):
+        store = SegmentStore(str(tmp_path), project_name="proj")
+        for i, title in enumerate(["v1", "v2"]):
+            store.register_segment(str(_segment(tmp_path, f"proj_es_docs_{i}.jsonl", [{"case_id": "c1", "title": title}])))
+
+        written = store.compact(keep_old=True)
+        assert [s["file"] for s in store.segments()] == [written[0]["file"]]
+
+    def test_concurrent_registrations_are_not_lost(self, tmp_path):
+        paths = [_segment(tmp_path, f"proj_es_docs_{i:02d}.jsonl", [{"case_id": f"c{i}"}]) for i in range(8)]
+        threads = [threading.Thread(target=SegmentStore(str(tmp_path)).register_segment, args=(str(p),)) for p in paths]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(tmp_path / "es_docs_manifest.json", encoding="utf-8") as f:
+            assert len(json.load(f)["segments"]) == 8
@@ -0,0 +1,110 @@
+"""Unit tests for single-flight request coalescing."""
+
+import threading
+import time
+
+from src.models.base import BaseModelClient, ModelResponse
+from src.models.budget import BudgetAccountant, BudgetedModelClient
+from src.models.single_flight import SingleFlightModelClient, request_key
+from src.utils.exceptions import ModelAPIError
+
+
+class _GatedClient(BaseModelClient):
+    """Blocks every call until released, counting calls."""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.error = error
+
+    def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return ModelResponse(content=f"回复{self.calls}", model="mock")
+
+    def multimodal_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content="", model="mock")
+
+
+def _run_concurrently(client, messages_list):
+    results = [None] * len(messages_list)
+
+    def _worker(i, messages):
+        try:
+            results[i] = client.chat_completion(messages).content
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=_worker, args=(i, m)) for i, m in enumerate(messages_list)]
+    threads[0].start()
+    return threads, results
+
+
+class TestSingleFlight:
+    """Identical in-flight requests share one call."""
+
+    def test_identical_requests_share_one_call(self):
+        inner = _GatedClient()
+        client = SingleFlightModelClient(inner)
+        messages = [{"role": "user", "content": "生成步骤"}]
+        threads, results = _run_concurrently(client, [messages] * 4)
+        inner.started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while client.stats()["coalesced"] < 3:
+            time.sleep(0.001)
+        inner.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert inner.calls == 1
+        assert results == ["回复1"] * 4
+
+        # Nothing is cached after the call completes.
+        client.chat_completion(messages)
+        assert inner.calls == 2
+
+    def test_errors_are_shared(self):
+        inner = _GatedClient(error=ModelAPIError("down", status_code=503))
+        client = SingleFlightModelClient(inner)
+        messages = [{"role": "user", "content": "生成步骤"}]
+        threads, results = _run_concurrently(client, [messages] * 2)
+        inner.started.wait(5)
+        threads[1].start()
+        while client.stats()["coalesced"] < 1:
+            time.sleep(0.001)
+        inner.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert inner.calls == 1
+        assert all(isinstance(r, ModelAPIError) for r in results)
+
+    def test_key_covers_model_and_params(self):
+        messages = [{"role": "user", "content": "a"}]
+        base = request_key("chat_completion", messages, model=None, temperature=0.5)
+        assert base == request_key("chat_completion", [{"content": "a", "role": "user"}], temperature=0.5, model=None)
+        assert base != request_key("chat_completion", messages, model="other", temperature=0.5)
+        assert base != request_key("chat_completion", messages, model=None, temperature=0.7)
+
+    def test_coalesced_calls_are_not_charged(self):
+        inner = _GatedClient()
+        accountant = BudgetAccountant(max_llm_calls=10)
+        client = SingleFlightModelClient(BudgetedModelClient(inner, accountant))
+        assert client.accountant is accountant
+        messages = [{"role": "user", "content": "生成步骤"}]
+        threads, _ = _run_concurrently(client, [messages] * 3)
+        inner.started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while client.stats()["coalesced"] < 2:
+            time.sleep(0.001)
+        inner.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert accountant.calls == 1
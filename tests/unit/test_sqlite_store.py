@@ -0,0 +1,81 @@
+"""Unit tests for the SQLite relational store."""
+
+from src.entities import materialize_generation_outputs, stream_materialize
+from src.storage import SQLiteCaseStore
+
+
+def _generated(case_ids, ts="2025-01-02 03:04:05", module="module_a"):
+    return {
+        "testcases": [
+            {
+                "case_id": case_id,
+                "project_name": "proj",
+                "module": module,
+                "feature": "feature_x",
+                "title": f"标题 {case_id}",
+                "steps": ["open page"],
+                "expected_result": "ok",
+                "level": "P1",
+                "create_time": ts,
+                "update_time": ts,
+            }
+            for case_id in case_ids
+        ],
+        "scenes": [{"scene_id": "scene_1", "scene_name": "Happy path", "create_time": ts}],
+        "scene_mappings": [
+            {"mapping_id": f"map_{case_id}", "scene_id": "scene_1", "case_id": case_id, "create_time": ts}
+            for case_id in case_ids
+        ],
+        "relations": [],
+    }
+
+
+class TestSQLiteCaseStore:
+    """Schema, upserts and change tracking."""
+
+    def test_save_bundle_round_trip(self, tmp_path):
+        bundle = materialize_generation_outputs(_generated(["c2", "c1"]), output_dir=str(tmp_path / "out"))
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store:
+            counts = store.save_bundle(bundle)
+            assert counts["test_cases"] == 2
+            assert store.get_case("c1").title == "标题 c1"
+            assert list(store.iter_case_ids()) == ["c1", "c2"]
+            assert [c.case_id for c in store.query_cases(module="module_a")] == ["c1", "c2"]
+            assert store.scenes_for_cases(["c1"]) == {"c1": [("scene_1", "Happy path")]}
+            assert store.cases_for_scene("scene_1") == ["c1", "c2"]
+
+    def test_upsert_replaces_existing_rows(self, tmp_path):
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store:
+            store.save_bundle(materialize_generation_outputs(_generated(["c1"]), output_dir=str(tmp_path)))
+            later = _generated(["c1"], ts="2025-02-01 00:00:00", module="module_b")
+            store.save_bundle(materialize_generation_outputs(later, output_dir=str(tmp_path)))
+
+            assert store.count_cases() == 1
+            assert store.get_case("c1").module == "module_b"
+            assert list(store.changed_case_ids("2025-01-15 00:00:00")) == ["c1"]
+            assert store.max_change_time() == "2025-02-01 00:00:00"
+
+    def test_delete_records_tombstone(self, tmp_path):
+        with SQLiteCaseStore(str(tmp_path / "cases.db")) as store:
+            store.save_bundle(materialize_generation_outputs(_generated(["c1", "c2"]), output_dir=str(tmp_path)))
+            assert store.delete_cases(["c1"]) == 1
+
+            assert store.get_case("c1") is None
+            assert store.deleted_case_ids(None) == ["c1"]
+            assert store.scenes_for_cases(["c1"]) == {}
+            # The cascaded mapping delete marks the case as touched too.
+            assert store.touched_case_ids(None) == ["c1"]
+            assert store.max_local_time() is not None
+
+    def test_sink_upserts_streamed_entities(self, tmp_path):
+        generated = _generated([f"c{i}" for i in range(5)])
+        with SQLiteCaseStore(str(tmp_path / "cases.db"), batch_size=2) as store:
+            stream_materialize(
+                generated["testcases"],
+                store.sink(),
+                scenes=generated["scenes"],
+                scene_mappings=generated["scene_mappings"],
+                output_dir=str(tmp_path / "out"),
+            )
+            assert store.count_cases() == 5
+            assert store.cases_for_scene("scene_1") == [f"c{i}" for i in range(5)]
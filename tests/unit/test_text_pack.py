@@ -0,0 +1,90 @@
+"""Unit tests for the packed text store and pack-mode materialization."""
+
+from src.entities import materialize_generation_outputs
+from src.storage import PackReader, TextPackStore, read_text_uri
+from src.storage.text_pack import parse_pack_uri
+
+
+class TestTextPackStore:
+    """Append, dedupe and random-access reads."""
+
+    def test_put_dedupes_identical_text(self, tmp_path):
+        with TextPackStore(str(tmp_path / "packs")) as store:
+            first = store.put("登录成功")
+            second = store.put("登录成功")
+            other = store.put("打开页面")
+
+        assert first == second
+        assert first != other
+        assert first.startswith("pack://segment_00001.pack#")
+        assert read_text_uri(first, str(tmp_path / "packs")) == "登录成功"
+        assert read_text_uri(other, str(tmp_path / "packs")) == "打开页面"
+
+    def test_reopen_resumes_index_and_segment(self, tmp_path):
+        with TextPackStore(str(tmp_path / "packs")) as store:
+            uri = store.put("a" * 10)
+        with TextPackStore(str(tmp_path / "packs")) as store:
+            assert store.put("a" * 10) == uri
+            later = store.put("b")
+
+        assert parse_pack_uri(later) == ("segment_00001.pack", 10, 1)
+
+    def test_rolls_segments_and_remaps_grown_files(self, tmp_path):
+        reader = PackReader(str(tmp_path / "packs"))
+        store = TextPackStore(str(tmp_path / "packs"), max_segment_bytes=8)
+        first = store.put("12345678")
+        store.flush()
+        assert reader.read(first) == "12345678"
+        second = store.put("abc")
+        store.close()
+
+        assert parse_pack_uri(second)[0] == "segment_00002.pack"
+        assert reader.read(second) == "abc"
+        reader.close()
+
+    def test_uris_resolve_against_configured_root(self, tmp_path, monkeypatch):
+        root = tmp_path / "packs"
+        with TextPackStore(str(root)) as store:
+            uri = store.put("登录成功")
+        monkeypatch.chdir(tmp_path / "packs")
+        monkeypatch.setenv("QA_AGENT_PACK_ROOT", str(root))
+        assert read_text_uri(uri) == "登录成功"
+
+    def test_legacy_path_entries_are_rekeyed_to_segment_names(self, tmp_path):
+        root = tmp_path / "packs"
+        with TextPackStore(str(root)) as store:
+            uri = store.put("abc")
+        index = root / "pack_index.jsonl"
+        index.write_text(index.read_text().replace("pack://", f"pack://{root.as_posix()}/"))
+
+        with TextPackStore(str(root)) as store:
+            assert store.put("abc") == uri
+        assert PackReader(str(tmp_path / "elsewhere")).read(f"pack://{root.as_posix()}/{uri[7:]}") == "abc"
+
+
+def test_materialize_pack_mode_writes_no_per_case_files(tmp_path):
+    generated = {
+        "testcases": [
+            {
+                "case_id": f"case_{i}",
+                "module": "module_a",
+                "feature": "feature_x",
+                "title": f"title {i}",
+                "steps": ["open page", f"step {i}"],
+                "expected_result": "login success",
+                "level": "P1",
+            }
+            for i in range(3)
+        ],
+        "scenes": [],
+        "scene_mappings": [],
+        "relations": [],
+    }
+
+    packs = str(tmp_path / "packs")
+    bundle = materialize_generation_outputs(generated, output_dir=str(tmp_path), storage_mode="pack", pack_dir=packs)
+
+    assert not (tmp_path / "steps").exists()
+    assert len({case.expected_result_path for case in bundle.test_cases}) == 1
+    assert read_text_uri(bundle.test_cases[2].steps_path, packs) == "open page\nstep 2"
+    assert bundle.index_docs[0].expected_result == "login success"
@@ -0,0 +1,135 @@
+"""Unit tests for token estimation and per-call budgeting."""
+
+import json
+
+from src.agents.requirement_parser import RequirementParser
+from src.models.base import BaseModelClient, ModelResponse
+from src.utils.token_estimator import (
+    CallBudget,
+    UsageCalibrator,
+    adaptive_max_tokens,
+    estimate_messages_tokens,
+    estimate_tokens,
+    trim_to_tokens,
+)
+
+_PARSED = {
+    "modules": [
+        {
+            "id": "login",
+            "name": "登录模块",
+            "features": [{"id": "pwd", "name": "账号登录", "flows": [{"id": "{flow}", "name": "流程", "type": "happy"}]}],
+        }
+    ],
+    "metadata": {},
+}
+
+
+class _ParseClient(BaseModelClient):
+    def __init__(self):
+        self.calls = []
+
+    def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        self.calls.append(max_tokens)
+        body = json.dumps(_PARSED, ensure_ascii=False).replace("{flow}", f"flow_{len(self.calls)}")
+        return ModelResponse(content=f"```json\n{body}\n```", model="mock")
+
+    def multimodal_completion(self, messages, model=None, temperature=0.7, max_tokens=None, **kwargs):
+        return ModelResponse(content="", model="mock")
+
+
+class TestTokenEstimator:
+    """Character-class token estimates."""
+
+    def test_cjk_counts_per_character(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("登录成功") == 4
+        assert estimate_tokens("abcdefgh") == 2
+
+    def test_whitespace_runs_collapse(self):
+        assert estimate_tokens("ab    cd") == estimate_tokens("ab cd")
+
+    def test_messages_include_overhead(self):
+        messages = [{"role": "system", "content": "登录"}, {"role": "user", "content": "abcd"}]
+        assert estimate_messages_tokens(messages) == 2 + 1 + 2 * 4
+
+
+class TestCallBudget:
+    """Adaptive max_tokens, trimming and calibration."""
+
+    def test_max_tokens_follows_shape_and_window(self):
+        assert adaptive_max_tokens("expected_result", context_window=32768) == 300
+        assert adaptive_max_tokens("walkthrough_rule", units=5, context_window=32768) == 3500
+        assert adaptive_max_tokens("walkthrough_rule", units=100, context_window=32768) == 8000
+        assert adaptive_max_tokens("parsed_requirement", units=1000, prompt_tokens=3000, context_window=4096) == 840
+
+    def test_max_tokens_respects_output_limit(self, monkeypatch):
+        monkeypatch.setenv("QA_AGENT_MAX_OUTPUT_TOKENS", "4096")
+        assert adaptive_max_tokens("walkthrough_rule", units=100, context_window=32768) == 4096
+        assert adaptive_max_tokens("expected_result", context_window=32768) == 300
+
+    def test_trim_to_tokens_keeps_prefix(self):
+        text = "需求" * 100
+        trimmed = trim_to_tokens(text, 50)
+        assert estimate_tokens(trimmed) <= 50
+        assert trimmed.endswith("...")
+        assert text.startswith(trimmed[:-3])
+        assert trim_to_tokens("短文本", 50) == "短文本"
+
+    def test_calibrator_scales_after_enough_samples(self, tmp_path):
+        log_path = tmp_path / "tokens.jsonl"
+        calibrator = UsageCalibrator(log_path=str(log_path))
+        budget = CallBudget("expected_result", prompt_tokens=100, max_tokens=300, context_window=32768)
+
+        calibrator.record(budget, None)
+        for _ in range(UsageCalibrator.MIN_SAMPLES - 1):
+            calibrator.record(budget, {"prompt_tokens": 120, "completion_tokens": 80})
+        assert calibrator.calibrate(100) == 100
+        calibrator.record(budget, {"prompt_tokens": 120, "completion_tokens": 80})
+
+        assert calibrator.calibrate(100) == 120
+        assert calibrator.summary()["samples"] == UsageCalibrator.MIN_SAMPLES
+        assert len(log_path.read_text(encoding="utf-8").splitlines()) == UsageCalibrator.MIN_SAMPLES
+
+
+class TestParserWindow:
+    """PRDs larger than the window are parsed in section-aligned parts."""
+
+    def test_small_prd_is_one_call(self, monkeypatch):
+        monkeypatch.setenv("QA_AGENT_CONTEXT_WINDOW", "32768")
+        client = _ParseClient()
+
+        result = RequirementParser(client).parse("# 登录模块\n\n账号登录。\n", project_name="p")
+        assert len(client.calls) == 1
+        assert client.calls[0] == 2000
+        assert result.modules[0].features[0].flows[0].id == "flow_1"
+
+    def test_large_prd_is_split_and_merged(self, monkeypatch):
+        monkeypatch.setenv("QA_AGENT_CONTEXT_WINDOW", "4096")
+        client = _ParseClient()
+        prd = "".join(f"# 章节{i}\n\n" + "需求描述内容。" * 200 + "\n\n" for i in range(6))
+
+        result = RequirementParser(client).parse(prd, project_name="p")
+        assert len(client.calls) > 1
+        assert all(max_tokens <= 4096 for max_tokens in client.calls)
+        assert len(result.modules) == 1
+        flows = result.modules[0].features[0].flows
+        assert [flow.id for flow in flows] == [f"flow_{i}" for i in range(1, len(client.calls) + 1)]
+        assert result.metadata["parse_parts"] == len(client.calls)
+
+    def test_merge_rekeys_colliding_ids(self):
+        flow = {"id": "flow_1", "name": "流程", "type": "happy"}
+        first = {"modules": [{"id": "module_1", "name": "登录", "features": [
+            {"id": "feature_1", "name": "账号登录", "flows": [flow]},
+        ]}]}
+        second = {"modules": [
+            {"id": "module_1", "name": "支付", "features": [{"id": "feature_1", "name": "下单", "flows": [flow]}]},
+            {"id": "module_1", "name": "登录", "features": [{"id": "feature_1", "name": "账号登录", "flows": [flow]}]},
+        ]}
+
+        merged = RequirementParser._merge_parsed_parts([first, second])
+        modules = {m["id"]: m for m in merged["modules"]}
+        assert sorted(modules) == ["module_1", "module_1_p2"]
+        assert modules["module_1_p2"]["name"] == "支付"
+        login_flows = modules["module_1"]["features"][0]["flows"]
+        assert [f["id"] for f in login_flows] == ["flow_1", "flow_1_p2"]